@@ -23,8 +23,30 @@ export interface EmailResponse {
   in_reply_to?: string | null;
   references?: string | null;
   is_thread?: boolean;
+  // Server-side plain-text preview
+  preview?: string | null;
 }
 
+// Fields accepted by the ?fields= projection on the email endpoints
+export type EmailField =
+  | keyof EmailResponse
+  | "from"
+  | "to";
+
+// EmailResponse key a projected field maps to ("from"/"to" are aliases)
+export type EmailFieldKey<F extends EmailField> = F extends "from"
+  ? "from_address"
+  : F extends "to"
+    ? "to_addresses"
+    : F;
+
+// Email as returned for ?fields=: only the requested fields are present.
+// Without fields (F defaults to every key) this is the full EmailResponse.
+export type ProjectedEmail<F extends EmailField = keyof EmailResponse> = Pick<
+  EmailResponse,
+  EmailFieldKey<F>
+>;
+
 export interface FolderResponse {
   name: string;
   flags: string[];
@@ -56,14 +78,15 @@ export interface SuggestLabelResponse {
   reason: string;
 }
 
-// Fetch emails from a Gmail account
-export const getEmails = async (
+// Fetch emails from a Gmail account (only `fields` of each, when given)
+export const getEmails = async <F extends EmailField = keyof EmailResponse>(
   accountId: string,
   folder: string = "INBOX",
   limit: number = 50,
   offset: number = 0,
-  sinceDate?: string
-): Promise<EmailResponse[]> => {
+  sinceDate?: string,
+  fields?: F[]
+): Promise<ProjectedEmail<F>[]> => {
   const params = new URLSearchParams({
     folder,
     limit: limit.toString(),
@@ -72,24 +95,47 @@ export const getEmails = async (
   if (sinceDate) {
     params.append("since_date", sinceDate);
   }
-  return await get<EmailResponse[]>(
+  if (fields?.length) {
+    params.append("fields", fields.join(","));
+  }
+  return await get<ProjectedEmail<F>[]>(
     `/api/gmail/accounts/${accountId}/emails?${params.toString()}`
   );
 };
 
-// Search emails
-export const searchEmails = async (
+// Fetch one email by UID, e.g. the body of a card listed without it
+export const getEmail = async <F extends EmailField = keyof EmailResponse>(
+  accountId: string,
+  uid: number,
+  folder: string = "INBOX",
+  fields?: F[]
+): Promise<ProjectedEmail<F>> => {
+  const params = new URLSearchParams({ folder });
+  if (fields?.length) {
+    params.append("fields", fields.join(","));
+  }
+  return await get<ProjectedEmail<F>>(
+    `/api/gmail/accounts/${accountId}/emails/${uid}?${params.toString()}`
+  );
+};
+
+// Search emails (only `fields` of each, when given)
+export const searchEmails = async <F extends EmailField = keyof EmailResponse>(
   accountId: string,
   query: string,
   folder: string = "INBOX",
-  limit: number = 50
-): Promise<EmailResponse[]> => {
+  limit: number = 50,
+  fields?: F[]
+): Promise<ProjectedEmail<F>[]> => {
   const params = new URLSearchParams({
     query,
     folder,
     limit: limit.toString(),
   });
-  return await get<EmailResponse[]>(
+  if (fields?.length) {
+    params.append("fields", fields.join(","));
+  }
+  return await get<ProjectedEmail<F>[]>(
     `/api/gmail/accounts/${accountId}/search?${params.toString()}`
   );
 };
@@ -1,20 +1,38 @@
-from fastapi import Depends, HTTPException, status
+from uuid import UUID
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.api.utils.jwt import verify_token
-from app.models.user import User
+from app.config import settings
 from app.repository.user_repository import UserRepository
+from app.repository.gmail_account_repository import GmailAccountRepository
+from app.enums.gmail import GmailAccountStatus
+from app.services.workers.account_cache import account_cache, CachedAccount
+from app.services.workers.token_refresher import token_refresher
+from app.services.workers.mailbox_sync_scheduler import mailbox_sync_scheduler
+from app.services.workers.auth_cache import auth_cache, CurrentUser
+from app.services.workers.redis_label_cache import RedisLabelCache
+import logging
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
+) -> CurrentUser:
     """
     Dependency to get the current authenticated user from JWT token
     Used for protected routes
+    
+    Verified tokens are cached (until `exp` at the latest), so repeat requests
+    with the same token skip JWT verification and the User query.
     """
     token = credentials.credentials
     
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached[1]
+    
     # Verify token
     payload = verify_token(token)
     if not payload:
@@ -40,4 +58,70 @@ async def get_current_user(
             detail="User not found",
         )
     
-    return user
\ No newline at end of file
+    current_user = CurrentUser.from_user(user)
+    auth_cache.set(token, payload, current_user)
+    return current_user
+
+
+async def get_valid_gmail_account(
+    account_id: UUID,
+    current_user: CurrentUser
+) -> CachedAccount:
+    """
+    Resolve a Gmail account owned by the current user, refreshing its token if needed.
+    
+    Served from the account cache while the cached account is active and its
+    token still valid, so the hot path makes no database query; the database
+    is read on a cache miss, for any other status, or when the token needs a
+    refresh. Each hit counts as activity for the account's adaptive background
+    sync interval.
+    """
+    cached = await account_cache.get(str(account_id))
+    if cached is not None and cached.status == GmailAccountStatus.ACTIVE and not cached.needs_refresh:
+        if cached.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        await mailbox_sync_scheduler.record_activity(str(account_id))
+        return cached
+    
+    account = await GmailAccountRepository.get_gmail_account_by_id(account_id)
+    
+    if not account:
+        raise HTTPException(status_code=404, detail="Gmail account not found")
+    
+    if account.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    await mailbox_sync_scheduler.record_activity(str(account_id))
+    
+    # Check if token needs refresh
+    if account.is_expired or account.needs_refresh:
+        refresh_token = account.get_refresh_token
+        if not refresh_token:
+            raise HTTPException(
+                status_code=400,
+                detail="Token expired and no refresh token available"
+            )
+        
+        # Single-flight: concurrent requests (and the Celery task) share one Google call
+        try:
+            return await token_refresher.refresh(account)
+        except Exception as e:
+            logger.error(f"Failed to refresh token: {e}")
+            raise HTTPException(status_code=500, detail="Failed to refresh token")
+    
+    return await account_cache.set(account)
+
+
+def get_label_cache(request: Request) -> RedisLabelCache:
+    """Label cache over the app's pooled async Redis client (opened in the lifespan)"""
+    return RedisLabelCache(getattr(request.app.state, "redis", None))
+
+
+def require_internal_client(request: Request):
+    """
+    Dependency for internal-only endpoints (e.g. /metrics): 404 unless
+    METRICS_ENABLED and the caller's address is in METRICS_ALLOWED_IPS
+    """
+    client_ip = request.client.host if request.client else None
+    if not settings.METRICS_ENABLED or client_ip not in settings.METRICS_ALLOWED_IPS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
@@ -5,10 +5,8 @@ from typing import Optional, List
 from datetime import datetime, timedelta, timezone
 import logging
 import secrets
-import httpx
 
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_user, CurrentUser
 from app.services.default.gmail_oauth_service import gmail_oauth_service
 from app.repository.gmail_account_repository import GmailAccountRepository
 from app.config import settings
@@ -34,41 +32,9 @@ class GmailAccountsResponse(BaseModel):
     """Response for listing user's Gmail accounts"""
     accounts: List[GmailAccountResponse]
 
-async def get_user_email_from_token(access_token: str) -> Optional[str]:
-    """
-    Get user's email address from Google OAuth access token
-    Uses Google's userinfo API
-    
-    Args:
-        access_token: OAuth access token from Google
-        
-    Returns:
-        User's email address or None if failed
-    """
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            
-            if response.status_code == 200:
-                userinfo = response.json()
-                email = userinfo.get("email")
-                logger.info(f"Successfully retrieved email from token: {email}")
-                return email
-            else:
-                logger.error(f"Failed to get userinfo: {response.status_code} - {response.text}")
-                return None
-                
-    except Exception as e:
-        logger.error(f"Error getting user email from token: {e}")
-        return None
-
-
 @router.get("/connect", response_model=ConnectGmailResponse)
 async def connect_gmail_account(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Initiate Gmail OAuth flow
@@ -178,7 +144,7 @@ async def gmail_oauth_callback(
         
         # Step 2: Exchange code for tokens using OAuth service
         logger.info("Exchanging authorization code for tokens...")
-        token_data = gmail_oauth_service.exchange_tokens(code)
+        token_data = await gmail_oauth_service.exchange_tokens_async(code)
         
         access_token = token_data.get("access_token")
         refresh_token = token_data.get("refresh_token")
@@ -189,9 +155,9 @@ async def gmail_oauth_callback(
         if not refresh_token:
             logger.warning("No refresh token received - user may need to re-authenticate")
         
-        # Step 3: Get user's email from access token using helper function
+        # Step 3: Get user's email from access token
         logger.info("Fetching user email from Google userinfo API...")
-        email_address = await get_user_email_from_token(access_token)
+        email_address = await gmail_oauth_service.get_user_email(access_token)
         
         if not email_address:
             raise ValueError("Failed to get user email from token")
@@ -273,7 +239,7 @@ async def gmail_oauth_callback(
 
 @router.get("/accounts", response_model=GmailAccountsResponse)
 async def get_user_gmail_accounts(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get all connected Gmail accounts for the current user
@@ -1,8 +1,7 @@
 from uuid import UUID
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_user, CurrentUser
 from app.services import google_auth_service 
 from app.api.utils.jwt import create_token, TokenType
 from app.repository.user_repository import UserRepository
@@ -207,7 +206,7 @@ async def refresh_access_token(request_data: RefreshTokenRequest):
         )
 
 @router.get("/me", response_model=UserProfileResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: CurrentUser = Depends(get_current_user)):
     """
     Get current authenticated user's profile
     Requires: Bearer token in Authorization header
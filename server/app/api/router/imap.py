@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, AsyncIterator
 from uuid import UUID
 
-from app.api.deps import get_current_user
-from app.models.user import User
-from app.models.gmail_account import GmailAccount
-from app.repository.gmail_account_repository import GmailAccountRepository
+from app.api.deps import get_current_user, CurrentUser, get_valid_gmail_account, get_label_cache
 from app.services.default.imap_service import GmailImapService
-from app.services.default.gmail_oauth_service import gmail_oauth_service
+from app.services.default.gmail_rest_service import gmail_rest_service
 from app.services.workers.redis_label_cache import RedisLabelCache
+from app.services.workers.mailbox_state_cache import mailbox_state_cache
+from app.services.workers.mailbox_store import mailbox_store, StoredPage
+from app.services.workers.folder_cache import folder_cache
+from app.tasks.mailbox_sync import request_mailbox_sync
+from app.services.workers.account_cache import CachedAccount
+from app.api.utils.response_encoding import (
+    encode_response,
+    accepts_ndjson,
+    response_kind,
+    ndjson_line,
+    NDJSON_MEDIA_TYPE,
+)
+from app.api.utils.etag import make_etag, etag_matches, not_modified, set_etag
+from app.api.utils.metrics import metrics
+from app.config import settings
 import logging
 
 
@@ -37,6 +50,7 @@ class EmailResponse(BaseModel):
     in_reply_to: Optional[str] = None
     references: Optional[str] = None
     is_thread: bool = False  # Computed field indicating if email is part of a thread
+    preview: Optional[str] = None  # Server-side plain-text preview for list cards
 
 # Add these response models after EmailResponse
 class CreateLabelRequest(BaseModel):
@@ -51,100 +65,298 @@ class LabelResponse(BaseModel):
     message_list_visibility: str
     type: str
 
+# Bulk operations (sent to the Gmail REST API in batches)
+class BatchCreateLabelsRequest(BaseModel):
+    labels: List[CreateLabelRequest] = Field(..., min_length=1, max_length=500)
 
+class BatchLabelError(BaseModel):
+    name: str
+    error: str
 
-# Helper function to get account and refresh token if needed
-async def get_valid_gmail_account(
-    account_id: UUID,
-    current_user: User
-) -> GmailAccount:
-    """Get Gmail account and refresh token if expired"""
-    account = await GmailAccountRepository.get_gmail_account_by_id(account_id)
-    
-    if not account:
-        raise HTTPException(status_code=404, detail="Gmail account not found")
+class BatchCreateLabelsResponse(BaseModel):
+    created: List[LabelResponse]
+    errors: List[BatchLabelError]
+
+class BatchModifyRequest(BaseModel):
+    uids: List[int] = Field(..., min_length=1, max_length=5000)
+    folder: str = 'INBOX'
+    add_labels: List[str] = []  # Label names (or system label ids like STARRED)
+    remove_labels: List[str] = []
+
+class BatchDeleteRequest(BaseModel):
+    uids: List[int] = Field(..., min_length=1, max_length=5000)
+    folder: str = 'INBOX'
+
+
+
+# Field projection for email list endpoints
+# Short aliases accepted in ?fields= (e.g. fields=uid,subject,from,date,labels,preview)
+EMAIL_FIELD_ALIASES = {
+    "from": "from_address",
+    "to": "to_addresses",
+}
+EMAIL_FIELDS = set(EmailResponse.model_fields)
+
+
+def parse_email_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse the ?fields= projection into EmailResponse field names (None = all fields)"""
+    if not fields:
+        return None
     
-    if account.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    selected: Dict[str, None] = {}
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        name = EMAIL_FIELD_ALIASES.get(name, name)
+        if name not in EMAIL_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown email field: {name}")
+        selected[name] = None
     
-    # Check if token needs refresh
-    if account.is_expired or account.needs_refresh:
-        refresh_token = account.get_refresh_token
-        if not refresh_token:
-            raise HTTPException(
-                status_code=400,
-                detail="Token expired and no refresh token available"
-            )
+    return list(selected) or None
+
+
+def email_to_dict(e, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Build the (optionally projected) response dict for an EmailMessage.
+    Matches the EmailResponse schema; encoded directly without re-validation.
+    """
+    data = {
+        "uid": e.uid,
+        "subject": e.subject,
+        "from_address": e.from_address,
+        "to_addresses": e.to_addresses,
+        "date": e.date,
+        "body_text": e.body_text,
+        "body_html": e.body_html,
+        "labels": e.labels,
+        "attachments": e.attachments,
+        "message_id": e.message_id,
+        "in_reply_to": e.in_reply_to,
+        "references": e.references,
+        "is_thread": bool(e.in_reply_to or e.references),
+        "preview": e.preview,
+    }
+    if fields is None:
+        return data
+    return {name: data[name] for name in fields}
+
+
+async def stream_email_page(
+    imap_service: GmailImapService,
+    uids: List[int],
+    total: int,
+    offset: int,
+    fields: Optional[List[str]] = None
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON body for a streamed page: one email per line as soon as its UID
+    chunk is parsed, then a trailing {"cursor": ...} record.
+    Send it with ImapStreamingResponse, which disconnects imap_service.
+    """
+    try:
+        async for emails in imap_service.iter_emails_by_uid(uids, settings.EMAIL_STREAM_CHUNK_SIZE):
+            for e in emails:
+                yield ndjson_line(email_to_dict(e, fields))
         
-        # Refresh token
+        next_offset = offset + len(uids)
+        yield ndjson_line({
+            "cursor": {
+                "offset": next_offset,
+                "has_more": next_offset < total,
+                "last_uid": uids[-1] if uids else None,
+            }
+        })
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        logger.error(f"Failed while streaming emails: {e}")
+        yield ndjson_line({"error": str(e)})
+
+
+class ImapStreamingResponse(StreamingResponse):
+    """
+    NDJSON response that owns an IMAP connection and disconnects it however
+    the response ends, including when the client goes away before the body
+    generator has started (its finally would never run then).
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], imap_service: GmailImapService):
+        super().__init__(content, media_type=NDJSON_MEDIA_TYPE)
+        self.imap_service = imap_service
+
+    async def __call__(self, scope, receive, send):
         try:
-            token_data = gmail_oauth_service.refresh_auth_access_token(refresh_token)
-            # Update account with new token
-            from datetime import datetime, timedelta, timezone
-            expires_in = token_data.get('expires_in', 3600)  # Now always in SECONDS
-            token_expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-            
-            account.meta['access_token'] = token_data['access_token']
-            account.token_expiry = token_expiry
-            await account.save()
-        except Exception as e:
-            logger.error(f"Failed to refresh token: {e}")
-            raise HTTPException(status_code=500, detail="Failed to refresh token")
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.imap_service.disconnect()
+
+
+def cached_not_modified(request: Request, account_id: UUID, folder: str, *parts) -> Optional[str]:
+    """
+    ETag for a revalidation answerable from the cached mailbox state alone
+    (no IMAP connection), or None when the request must go to IMAP.
+    """
+    if not request.headers.get("if-none-match"):
+        return None
+    
+    state = mailbox_state_cache.get_state(str(account_id), folder)
+    if state is None:
+        return None
     
-    return account
+    etag = make_etag(state, *parts)
+    if not etag_matches(request, etag):
+        return None
+    
+    metrics.incr("etag.not_modified_cached")
+    return etag
+
+
+async def mailbox_etag(
+    imap_service: GmailImapService,
+    account_id: UUID,
+    folder: str,
+    *parts
+) -> str:
+    """Refresh the folder state with one STATUS command and derive the response ETag"""
+    state = await imap_service.get_folder_state(folder)
+    mailbox_state_cache.set_state(str(account_id), folder, state)
+    return make_etag(state, *parts)
+
+
+async def mailbox_changed(account_id: UUID):
+    """The API changed the mailbox: drop cached state and resync the stored copy"""
+    mailbox_state_cache.invalidate(str(account_id))
+    await mailbox_store.mark_stale(str(account_id))
+    await request_mailbox_sync(str(account_id), force=True)
+
+
+async def read_synced_page(account_id: UUID, folder: str, offset: int, limit: int) -> Optional[StoredPage]:
+    """
+    Page of pre-synced emails from the mailbox store, or None (and a sync is
+    requested when the page is one the background sync keeps warm).
+    """
+    page = await mailbox_store.get_page(str(account_id), folder, offset, limit)
+    if page is not None:
+        metrics.incr("mailbox_store.hits")
+        return page
+    
+    metrics.incr("mailbox_store.misses")
+    if folder in settings.MAILBOX_SYNC_FOLDERS and offset + limit <= settings.MAILBOX_SYNC_WINDOW:
+        await request_mailbox_sync(str(account_id))
+    return None
+
+
+async def stream_synced_page(
+    page: StoredPage,
+    offset: int,
+    fields: Optional[List[str]] = None
+) -> AsyncIterator[bytes]:
+    """NDJSON body for a page read from the mailbox store (same records as stream_email_page)"""
+    for e in page.emails:
+        yield ndjson_line(email_to_dict(e, fields))
+    
+    next_offset = offset + len(page.emails)
+    yield ndjson_line({
+        "cursor": {
+            "offset": next_offset,
+            "has_more": next_offset < page.total,
+            "last_uid": page.emails[-1].uid if page.emails else None,
+        }
+    })
+
+
+def label_data_to_response(label_data: Dict[str, Any]) -> LabelResponse:
+    """Build a LabelResponse from a Gmail label resource"""
+    return LabelResponse(
+        id=label_data.get("id", ""),
+        name=label_data.get("name", ""),
+        label_list_visibility=label_data.get("labelListVisibility", ""),
+        message_list_visibility=label_data.get("messageListVisibility", ""),
+        type=label_data.get("type", "user")
+    )
+
+
+async def resolve_label_ids(access_token: str, names: List[str]) -> List[str]:
+    """Map label names (case-insensitive) or label ids to Gmail label ids"""
+    if not names:
+        return []
+    
+    labels = await gmail_rest_service.list_labels(access_token)
+    by_name = {label["name"].lower(): label["id"] for label in labels}
+    ids = {label["id"] for label in labels}
+    
+    resolved = []
+    for name in names:
+        label_id = name if name in ids else by_name.get(name.lower())
+        if label_id is None:
+            raise HTTPException(status_code=400, detail=f"Unknown label: {name}")
+        resolved.append(label_id)
+    return resolved
+
+
+async def get_gmail_message_ids(account: CachedAccount, uids: List[int], folder: str) -> List[str]:
+    """Look up Gmail REST message ids for IMAP UIDs (one IMAP FETCH)"""
+    imap_service = GmailImapService()
+    try:
+        await imap_service.connect(account.access_token, account.email_address)
+        id_map = await imap_service.get_gmail_message_ids(uids, folder)
+    finally:
+        await imap_service.disconnect()
+    return [id_map[uid] for uid in uids if uid in id_map]
+
 
 @router.get("/accounts/{account_id}/folders", response_model=List[FolderResponse])
 async def list_folders(
+    request: Request,
     account_id: UUID = Path(..., description="Gmail account ID"),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    redis_cache: RedisLabelCache = Depends(get_label_cache)
 ):
-    """List all folders/labels for a Gmail account"""
+    """
+    List all folders/labels for a Gmail account.
+    Answers If-None-Match with 304 while the folder list is unchanged.
+    """
     account = await get_valid_gmail_account(account_id, current_user)
+    kind = response_kind(request)
     
-    imap_service = GmailImapService()
-    redis_cache = RedisLabelCache()
+    version = mailbox_state_cache.get_folders_version(str(account_id))
+    if version is not None:
+        etag = make_etag("folders", version, kind)
+        if etag_matches(request, etag):
+            metrics.incr("etag.not_modified_cached")
+            return not_modified(etag)
+    
+    if not account.access_token:
+        raise HTTPException(status_code=400, detail="No access token available")
+    
+    # Read-through: kept warm by the background mailbox sync, listed via IMAP on a miss
     try:
-        access_token = account.get_access_token
-        if not access_token:
-            raise HTTPException(status_code=400, detail="No access token available")
-        
-        await imap_service.connect(access_token, account.email_address)
-        folders = await imap_service.list_folders()
-
-        # Extract folder/label names
-        folder_names = [f.name for f in folders]
-
-        try:
-            success = redis_cache.set_labels(str(account_id), folder_names)
-            print(f"Success: {success}")
-            if success:
-                logger.info(f"✅ Successfully cached {len(folder_names)} labels for account {account_id}")
-                logger.info(f"📋 Cached labels: {folder_names}")
-            else:
-                logger.warning(f"⚠️ set_labels returned False for account {account_id}")
-        except Exception as e:
-            logger.error(f"Failed to set labels in Redis: {e}")
-        
-        return [FolderResponse(name=f.name, flags=f.flags) for f in folders]
-        
+        folder_list = await folder_cache.get_folders(account, redis_cache)
     except Exception as e:
         logger.error(f"Failed to list folders: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await imap_service.disconnect()
+    
+    version = make_etag(folder_list)
+    mailbox_state_cache.set_folders_version(str(account_id), version)
+    etag = make_etag("folders", version, kind)
+    if etag_matches(request, etag):
+        metrics.incr("etag.not_modified")
+        return not_modified(etag)
+    return set_etag(encode_response(request, folder_list), etag)
 
 @router.post("/accounts/{account_id}/labels", response_model=LabelResponse)
 async def create_label(
     account_id: UUID = Path(..., description="Gmail account ID"),
     request: CreateLabelRequest = ...,
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    redis_cache: RedisLabelCache = Depends(get_label_cache)
 ):
     """Create a new label in Gmail"""
     account = await get_valid_gmail_account(account_id, current_user)
     
     gmail_api_service = GmailImapService()
     try:
-        access_token = account.get_access_token
+        access_token = account.access_token
         if not access_token:
             raise HTTPException(status_code=400, detail="No access token available")
         
@@ -155,18 +367,12 @@ async def create_label(
             message_list_visibility=request.message_list_visibility
         )
         
-        # Invalidate Redis cache so new label appears in next fetch
-        redis_cache = RedisLabelCache()
-        redis_cache.invalidate(str(account_id))
-        logger.info(f"Invalidated label cache for account {account_id} after creating label")
-        
-        return LabelResponse(
-            id=label_data.get("id", ""),
-            name=label_data.get("name", ""),
-            label_list_visibility=label_data.get("labelListVisibility", ""),
-            message_list_visibility=label_data.get("messageListVisibility", ""),
-            type=label_data.get("type", "user")
-        )
+        # Add to the cached labels in place so the new label appears in the next fetch
+        await redis_cache.add_label(str(account_id), label_data.get("name") or request.name)
+        await mailbox_changed(account_id)
+        logger.info(f"Added label to cache for account {account_id} after creating it")
+        
+        return label_data_to_response(label_data)
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -175,105 +381,303 @@ async def create_label(
         raise HTTPException(status_code=500, detail="Failed to create label")
 
 
+@router.post("/accounts/{account_id}/labels/batch", response_model=BatchCreateLabelsResponse)
+async def create_labels(
+    account_id: UUID = Path(..., description="Gmail account ID"),
+    request: BatchCreateLabelsRequest = ...,
+    current_user: CurrentUser = Depends(get_current_user),
+    redis_cache: RedisLabelCache = Depends(get_label_cache)
+):
+    """Create several labels with batched Gmail API requests"""
+    account = await get_valid_gmail_account(account_id, current_user)
+    
+    try:
+        if not account.access_token:
+            raise HTTPException(status_code=400, detail="No access token available")
+        
+        results = await gmail_rest_service.create_labels(
+            account.access_token,
+            [
+                {
+                    "name": label.name,
+                    "labelListVisibility": label.label_list_visibility,
+                    "messageListVisibility": label.message_list_visibility
+                }
+                for label in request.labels
+            ]
+        )
+        
+        created, errors = [], []
+        for label, result in zip(request.labels, results):
+            if result.ok:
+                created.append(label_data_to_response(result.body))
+            else:
+                message = result.body.get("error", {}).get("message") if isinstance(result.body, dict) else None
+                errors.append(BatchLabelError(name=label.name, error=message or f"HTTP {result.status}"))
+        
+        if created:
+            await redis_cache.add_labels(str(account_id), [label.name for label in created])
+            await mailbox_changed(account_id)
+        
+        return BatchCreateLabelsResponse(created=created, errors=errors)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating labels: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create labels")
+
+
+@router.post("/accounts/{account_id}/emails/batch-modify")
+async def batch_modify_labels(
+    account_id: UUID = Path(..., description="Gmail account ID"),
+    request: BatchModifyRequest = ...,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Add/remove labels on many emails with messages.batchModify"""
+    account = await get_valid_gmail_account(account_id, current_user)
+    
+    if not request.add_labels and not request.remove_labels:
+        raise HTTPException(status_code=400, detail="No labels to add or remove")
+    
+    try:
+        if not account.access_token:
+            raise HTTPException(status_code=400, detail="No access token available")
+        
+        add_label_ids = await resolve_label_ids(account.access_token, request.add_labels)
+        remove_label_ids = await resolve_label_ids(account.access_token, request.remove_labels)
+        message_ids = await get_gmail_message_ids(account, request.uids, request.folder)
+        
+        await gmail_rest_service.batch_modify(
+            account.access_token, message_ids, add_label_ids, remove_label_ids
+        )
+        await mailbox_changed(account_id)
+        
+        return {"message": "Labels updated successfully", "modified": len(message_ids)}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to batch modify labels: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/accounts/{account_id}/emails/batch-delete")
+async def batch_delete_emails(
+    account_id: UUID = Path(..., description="Gmail account ID"),
+    request: BatchDeleteRequest = ...,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Permanently delete many emails with messages.batchDelete"""
+    account = await get_valid_gmail_account(account_id, current_user)
+    
+    try:
+        if not account.access_token:
+            raise HTTPException(status_code=400, detail="No access token available")
+        
+        message_ids = await get_gmail_message_ids(account, request.uids, request.folder)
+        await gmail_rest_service.batch_delete(account.access_token, message_ids)
+        await mailbox_changed(account_id)
+        
+        return {"message": "Emails deleted successfully", "deleted": len(message_ids)}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to batch delete emails: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/accounts/{account_id}/emails", response_model=List[EmailResponse])
 async def get_emails(
+    request: Request,
     account_id: UUID = Path(..., description="Gmail account ID"),
     folder: str = Query('INBOX', description="Folder to fetch from"),
     limit: int = Query(50, ge=1, le=200, description="Number of emails to fetch"),
     offset: int = Query(0, ge=0, description="Number of emails to skip"),
     since_date: Optional[str] = Query(None, description="Fetch emails since date (YYYY-MM-DD)"),
-    current_user: User = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. uid,subject,from,date,labels,preview"),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Fetch emails from a Gmail account.
+    Pass ?fields= to return only the listed fields (list cards don't need bodies).
+    With Accept: application/x-ndjson the page is streamed one email per line,
+    followed by a {"cursor": ...} record.
+    Answers If-None-Match with 304 after a single STATUS check (or from the
+    cached mailbox state) when the folder is unchanged.
     """
+    selected_fields = parse_email_fields(fields)
     account = await get_valid_gmail_account(account_id, current_user)
+    etag_parts = ("emails", folder, offset, limit, since_date, selected_fields, response_kind(request))
+    
+    etag = cached_not_modified(request, account_id, folder, *etag_parts)
+    if etag:
+        return not_modified(etag)
+    
+    # Pre-synced page (same ETag as the STATUS-derived one below)
+    page = await read_synced_page(account_id, folder, offset, limit) if since_date is None else None
+    if page is not None:
+        etag = make_etag(page.state, *etag_parts)
+        if etag_matches(request, etag):
+            metrics.incr("etag.not_modified_cached")
+            return not_modified(etag)
+        if accepts_ndjson(request):
+            return set_etag(StreamingResponse(
+                stream_synced_page(page, offset, selected_fields),
+                media_type=NDJSON_MEDIA_TYPE,
+            ), etag)
+        return set_etag(encode_response(request, [email_to_dict(e, selected_fields) for e in page.emails]), etag)
     
     imap_service = GmailImapService()
+    streaming = False
     
     try:
-        access_token = account.get_access_token
+        access_token = account.access_token
         if not access_token:
             raise HTTPException(status_code=400, detail="No access token available")
         
         fetch_limit = limit + offset
         await imap_service.connect(access_token, account.email_address)
+        
+        etag = await mailbox_etag(imap_service, account_id, folder, *etag_parts)
+        if etag_matches(request, etag):
+            metrics.incr("etag.not_modified")
+            return not_modified(etag)
+        
+        if accepts_ndjson(request):
+            uids = await imap_service.get_email_uids(folder, since_date)
+            page = uids[offset:offset + limit]
+            response = ImapStreamingResponse(
+                stream_email_page(imap_service, page, len(uids), offset, selected_fields),
+                imap_service,
+            )
+            streaming = True
+            return set_etag(response, etag)
+        
         emails = await imap_service.fetch_emails(folder, fetch_limit, since_date)
 
         # Apply offset
         emails = emails[offset:offset+limit]
         
-        # Return emails
-        return [
-            EmailResponse(
-                uid=e.uid,
-                subject=e.subject,
-                from_address=e.from_address,
-                to_addresses=e.to_addresses,
-                date=e.date,
-                body_text=e.body_text,
-                body_html=e.body_html,
-                labels=e.labels,
-                attachments=e.attachments,
-                message_id=e.message_id,
-                in_reply_to=e.in_reply_to,
-                references=e.references,
-                is_thread=bool(e.in_reply_to or e.references),
-            )
-            for e in emails
-        ]
+        # Server-built dicts are encoded directly (no response-model re-validation);
+        # projected pages only carry the requested fields
+        return set_etag(encode_response(request, [email_to_dict(e, selected_fields) for e in emails]), etag)
         
     except Exception as e:
         logger.error(f"Failed to fetch emails: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        await imap_service.disconnect()
+        # A streamed response owns the connection from here and disconnects it itself
+        if not streaming:
+            await imap_service.disconnect()
 
 
 @router.get("/accounts/{account_id}/search", response_model=List[EmailResponse])
 async def search_emails(
+    request: Request,
     account_id: UUID = Path(..., description="Gmail account ID"),
     query: str = Query(..., description="Gmail search query"),
     folder: str = Query('INBOX', description="Folder to search in"),
     limit: int = Query(50, ge=1, le=200),
-    current_user: User = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. uid,subject,from,date,labels,preview"),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Search emails using Gmail search syntax"""
+    """
+    Search emails using Gmail search syntax.
+    Supports ?fields= projection, Accept: application/x-ndjson streaming and
+    If-None-Match revalidation against the searched folder's state.
+    """
+    selected_fields = parse_email_fields(fields)
     account = await get_valid_gmail_account(account_id, current_user)
+    etag_parts = ("search", folder, query, limit, selected_fields, response_kind(request))
+    
+    etag = cached_not_modified(request, account_id, folder, *etag_parts)
+    if etag:
+        return not_modified(etag)
     
     imap_service = GmailImapService()
+    streaming = False
     try:
-        access_token = account.get_access_token
+        access_token = account.access_token
         if not access_token:
             raise HTTPException(status_code=400, detail="No access token available")
         
         await imap_service.connect(access_token, account.email_address)
-        emails = await imap_service.search_emails(query, folder, limit)
         
-        return [
-            EmailResponse(
-                uid=e.uid,
-                subject=e.subject,
-                from_address=e.from_address,
-                to_addresses=e.to_addresses,
-                date=e.date,
-                body_text=e.body_text,
-                body_html=e.body_html,
-                labels=e.labels,
-                attachments=e.attachments,
-                message_id=e.message_id,
-                in_reply_to=e.in_reply_to,
-                references=e.references,
-                is_thread=bool(e.in_reply_to or e.references),  # True if part of thread
+        etag = await mailbox_etag(imap_service, account_id, folder, *etag_parts)
+        if etag_matches(request, etag):
+            metrics.incr("etag.not_modified")
+            return not_modified(etag)
+        
+        if accepts_ndjson(request):
+            uids = await imap_service.search_email_uids(query, folder)
+            response = ImapStreamingResponse(
+                stream_email_page(imap_service, uids[:limit], len(uids), 0, selected_fields),
+                imap_service,
             )
-            for e in emails
-        ]
+            streaming = True
+            return set_etag(response, etag)
+        
+        emails = await imap_service.search_emails(query, folder, limit)
+        
+        return set_etag(encode_response(request, [email_to_dict(e, selected_fields) for e in emails]), etag)
         
     except Exception as e:
         logger.error(f"Failed to search emails: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if not streaming:
+            await imap_service.disconnect()
+
+@router.get("/accounts/{account_id}/emails/{uid}", response_model=EmailResponse)
+async def get_email(
+    request: Request,
+    account_id: UUID = Path(..., description="Gmail account ID"),
+    uid: int = Path(..., description="Email UID"),
+    folder: str = Query('INBOX', description="Folder the email is in"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. body_text,body_html"),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Fetch one email by UID, e.g. the body of a card listed with ?fields= and
+    no body. Served from the mailbox store when its folder copy is fresh.
+    Doesn't mark the email read.
+    """
+    selected_fields = parse_email_fields(fields)
+    account = await get_valid_gmail_account(account_id, current_user)
+    
+    stored = await mailbox_store.get_message(str(account_id), folder, uid)
+    if stored is not None:
+        metrics.incr("mailbox_store.hits")
+        return encode_response(request, email_to_dict(stored, selected_fields))
+    
+    imap_service = GmailImapService()
+    try:
+        access_token = account.access_token
+        if not access_token:
+            raise HTTPException(status_code=400, detail="No access token available")
+        
+        await imap_service.connect(access_token, account.email_address)
+        email_message = await imap_service.fetch_email(uid, folder)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to fetch email {uid}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
     finally:
         await imap_service.disconnect()
+    
+    if email_message is None:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return encode_response(request, email_to_dict(email_message, selected_fields))
+
 
 @router.post("/accounts/{account_id}/emails/{uid}/labels/{label}")
 async def add_label_to_email(
@@ -281,16 +685,17 @@ async def add_label_to_email(
     uid: int = Path(...),
     label: str = Path(...),
     folder: str = Query('INBOX'),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Add label to an email"""
     account = await get_valid_gmail_account(account_id, current_user)
     
     imap_service = GmailImapService()
     try:
-        access_token = account.get_access_token
+        access_token = account.access_token
         await imap_service.connect(access_token, account.email_address)
         success = await imap_service.add_label(uid, label, folder)
+        await mailbox_changed(account_id)
         
         if not success:
             raise HTTPException(status_code=400, detail="Failed to add label")
@@ -309,16 +714,17 @@ async def remove_label_from_email(
     uid: int = Path(...),
     label: str = Path(...),
     folder: str = Query('INBOX'),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Remove label from an email"""
     account = await get_valid_gmail_account(account_id, current_user)
     
     imap_service = GmailImapService()
     try:
-        access_token = account.get_access_token
+        access_token = account.access_token
         await imap_service.connect(access_token, account.email_address)
         success = await imap_service.remove_label(uid, label, folder)
+        await mailbox_changed(account_id)
         
         if not success:
             raise HTTPException(status_code=400, detail="Failed to remove label")
@@ -336,16 +742,17 @@ async def delete_email(
     account_id: UUID = Path(...),
     uid: int = Path(...),
     folder: str = Query('INBOX'),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Delete an email"""
     account = await get_valid_gmail_account(account_id, current_user)
     
     imap_service = GmailImapService()
     try:
-        access_token = account.get_access_token
+        access_token = account.access_token
         await imap_service.connect(access_token, account.email_address)
         success = await imap_service.delete_email(uid, folder)
+        await mailbox_changed(account_id)
         
         if not success:
             raise HTTPException(status_code=400, detail="Failed to delete email")
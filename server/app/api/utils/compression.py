@@ -0,0 +1,292 @@
+"""
+Response compression middleware.
+Negotiates zstd / brotli / gzip from Accept-Encoding, compresses buffered
+responses above a size threshold (off the event loop when they are large) and
+compresses streamed responses chunk by chunk, flushing after every chunk so
+NDJSON records still reach the client as they are produced.
+"""
+
+import time
+import zlib
+import logging
+from typing import Callable, Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.utils.etag import add_vary
+from app.api.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Optional codecs: gzip is always available, the others only when installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content types worth compressing (HTML-heavy JSON/MessagePack/NDJSON lists)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "application/x-msgpack",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+
+class _Compressor:
+    """Incremental compressor for one response"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits=31: gzip container
+            self._obj = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away"""
+        if self.encoding == "zstd":
+            return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Terminate the compressed stream"""
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def available_encodings() -> List[str]:
+    """Supported encodings in server preference order"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best encoding the client accepts.
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+
+    Returns:
+        "zstd", "br" or "gzip", or None to send the body as is
+    """
+    if not accept_encoding:
+        return None
+
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_body(encoding: str, body: bytes) -> bytes:
+    """One-shot compression of a buffered body"""
+    if encoding == "zstd":
+        # Single frame with the content size in its header
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses for clients that accept it.
+
+    - Buffered responses below COMPRESSION_MIN_SIZE are sent unchanged
+    - Bodies of COMPRESSION_THREAD_MIN_SIZE or more are compressed in a worker
+      thread so the event loop keeps serving other requests
+    - Streaming responses are compressed incrementally with a flush per chunk
+    - Compression ratio and CPU time are recorded per route on /metrics
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+        thread_minimum_size: int = settings.COMPRESSION_THREAD_MIN_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_minimum_size = thread_minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Wraps `send` for one request and compresses the response it sees"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding: str):
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_time = 0.0
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self._send(message)
+            else:
+                # Held until the first body chunk shows whether this is a stream
+                self.start_message = message
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body:
+                await self._send_buffered(start, body)
+                return
+            await self._start_stream(start)
+
+        await self._send_stream_chunk(body, more_body)
+
+    # ------------------------------------------------------------------
+    # Buffered responses
+    # ------------------------------------------------------------------
+
+    async def _send_buffered(self, start: Message, body: bytes):
+        if len(body) < self.middleware.minimum_size:
+            self.passthrough = True
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        if len(body) >= self.middleware.thread_minimum_size:
+            compressed = await anyio.to_thread.run_sync(self._timed, compress_body, self.encoding, body)
+        else:
+            compressed = self._timed(compress_body, self.encoding, body)
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        add_vary(headers, "Accept-Encoding")
+
+        self.bytes_in = len(body)
+        self.bytes_out = len(compressed)
+        self._record()
+
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    # ------------------------------------------------------------------
+    # Streaming responses
+    # ------------------------------------------------------------------
+
+    async def _start_stream(self, start: Message):
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        add_vary(headers, "Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+
+        self.compressor = _Compressor(self.encoding)
+        await self._send(start)
+
+    async def _send_stream_chunk(self, body: bytes, more_body: bool):
+        self.bytes_in += len(body)
+        # Streamed chunks are one page slice each; small enough to compress inline
+        data = self._timed(self.compressor.chunk, body) if body else b""
+        if not more_body:
+            data += self._timed(self.compressor.finish)
+            self.bytes_out += len(data)
+            self._record()
+        else:
+            self.bytes_out += len(data)
+
+        if data or not more_body:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _timed(self, func: Callable[..., bytes], *args) -> bytes:
+        """Run a compression step and add its CPU time (of whichever thread runs it)"""
+        started = time.thread_time()
+        try:
+            return func(*args)
+        finally:
+            self.cpu_time += time.thread_time() - started
+
+    def _record(self):
+        route = self.scope.get("route")
+        name = getattr(route, "path", None) or "unmatched"
+        prefix = f"compression.{self.encoding}.{name}"
+
+        metrics.incr(f"{prefix}.bytes_in", self.bytes_in)
+        metrics.incr(f"{prefix}.bytes_out", self.bytes_out)
+        metrics.observe(f"{prefix}.cpu_ms", self.cpu_time * 1000)
+        if self.bytes_out:
+            metrics.observe(f"{prefix}.ratio", self.bytes_in / self.bytes_out)
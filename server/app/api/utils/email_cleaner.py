@@ -1,15 +1,44 @@
 import re
 import html
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Iterable
+from dataclasses import dataclass
+from email.header import decode_header
+from email.message import Message
 from email.utils import parseaddr, parsedate_to_datetime
 from datetime import datetime, timezone
 import logging
+from app.api.utils.html_sanitizer import sanitize_html
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 class EmailCleaner:
     """Utility class for cleaning and sanitizing email data"""
     
+    @staticmethod
+    def decode_header_value(header: Any) -> str:
+        """
+        Decode RFC 2047 encoded words in an email header.
+        Headers without '=?' can't contain encoded words and are returned as-is.
+        """
+        if not header:
+            return ''
+        
+        if isinstance(header, str) and '=?' not in header:
+            return header
+        
+        try:
+            decoded_parts = decode_header(header)
+            decoded_str = ''
+            for part, encoding in decoded_parts:
+                if isinstance(part, bytes):
+                    decoded_str += part.decode(encoding or 'utf-8', errors='ignore')
+                else:
+                    decoded_str += part
+            return decoded_str
+        except Exception:
+            return str(header)
+    
     @staticmethod
     def clean_subject(subject: str) -> str:
         """Clean email subject"""
@@ -89,31 +118,21 @@ class EmailCleaner:
         return body_text.strip()
     
     @staticmethod
-    def clean_body_html(body_html: Optional[str]) -> Optional[str]:
-        """Clean HTML email body - basic sanitization"""
+    def clean_body_html(body_html: Optional[str], max_chars: Optional[int] = None) -> Optional[str]:
+        """
+        Clean HTML email body - basic sanitization.
+
+        Runs the single-pass streaming sanitizer: scripts, event handlers,
+        javascript: URLs and inline data images are stripped and whitespace
+        is collapsed while the HTML is tokenized.
+        """
         if not body_html:
             return None
         
-        # Decode HTML entities
-        body_html = html.unescape(body_html)
-        
-        # Remove dangerous scripts and event handlers
-        # Remove script tags
-        body_html = re.sub(r'<script[^>]*>.*?</script>', '', body_html, flags=re.IGNORECASE | re.DOTALL)
-        
-        # Remove event handlers (onclick, onerror, etc.)
-        body_html = re.sub(r'\s*on\w+\s*=\s*["\'][^"\']*["\']', '', body_html, flags=re.IGNORECASE)
-        
-        # Remove javascript: URLs
-        body_html = re.sub(r'javascript:', '', body_html, flags=re.IGNORECASE)
-        
-        # Remove data: URLs that could be dangerous
-        body_html = re.sub(r'data:image/[^;]+;base64[^"\'>\s]+', '', body_html, flags=re.IGNORECASE)
+        if max_chars is None:
+            max_chars = settings.HTML_SANITIZER_MAX_CHARS
         
-        # Normalize whitespace in HTML
-        body_html = re.sub(r'\s+', ' ', body_html)
-        
-        return body_html.strip()
+        return sanitize_html(body_html, max_chars=max_chars)
     
     @staticmethod
     def clean_date(date_str: str) -> str:
@@ -239,6 +258,15 @@ class EmailCleaner:
         
         return filename.strip()
     
+    @staticmethod
+    def clean_headers_batch(messages: Iterable[Message]) -> List["CleanedHeaders"]:
+        """
+        Clean Subject/From/To/Date for a whole fetch page at once.
+        See HeaderBatchCleaner for the per-value memoisation.
+        """
+        batch = HeaderBatchCleaner()
+        return [batch.clean(msg) for msg in messages]
+    
     @staticmethod
     def clean_email_preview(body_text: Optional[str], body_html: Optional[str], max_length: int = 200) -> str:
         """Create a clean preview text from email body"""
@@ -261,3 +289,66 @@ class EmailCleaner:
             preview = preview[:max_length].rsplit(' ', 1)[0] + '...'
         
         return preview
+
+
+@dataclass
+class CleanedHeaders:
+    """Cleaned Subject/From/To/Date of one message"""
+    subject: str
+    from_address: str
+    to_addresses: List[str]
+    date: str
+
+
+class HeaderBatchCleaner:
+    """
+    Cleans headers for one fetch page.
+
+    Senders, list addresses and recipients repeat heavily within a page, so
+    each distinct raw header value is decoded and parsed only once. Plain
+    ASCII headers skip RFC 2047 decoding entirely (see decode_header_value).
+    """
+    
+    def __init__(self):
+        self._subjects: Dict[str, str] = {}
+        self._addresses: Dict[str, str] = {}
+        self._dates: Dict[str, str] = {}
+    
+    def subject(self, raw_subject: Any) -> str:
+        """Decoded and cleaned subject"""
+        if not isinstance(raw_subject, str):
+            return EmailCleaner.clean_subject(EmailCleaner.decode_header_value(raw_subject))
+        
+        subject = self._subjects.get(raw_subject)
+        if subject is None:
+            subject = EmailCleaner.clean_subject(EmailCleaner.decode_header_value(raw_subject))
+            self._subjects[raw_subject] = subject
+        return subject
+    
+    def address(self, raw_address: Any) -> str:
+        """Decoded bare email address"""
+        if not isinstance(raw_address, str):
+            return EmailCleaner.extract_email_address(EmailCleaner.decode_header_value(raw_address))
+        
+        address = self._addresses.get(raw_address)
+        if address is None:
+            address = EmailCleaner.extract_email_address(EmailCleaner.decode_header_value(raw_address))
+            self._addresses[raw_address] = address
+        return address
+    
+    def date(self, raw_date: str) -> str:
+        """Date as an ISO string"""
+        date = self._dates.get(raw_date)
+        if date is None:
+            date = EmailCleaner.clean_date(raw_date)
+            self._dates[raw_date] = date
+        return date
+    
+    def clean(self, msg: Message) -> CleanedHeaders:
+        """Clean the headers of one parsed message"""
+        return CleanedHeaders(
+            subject=self.subject(msg.get('Subject', '')),
+            from_address=self.address(msg.get('From', '')),
+            to_addresses=[self.address(addr) for addr in msg.get_all('To', [])],
+            date=self.date(msg.get('Date', '')),
+        )
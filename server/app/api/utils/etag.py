@@ -0,0 +1,74 @@
+"""
+ETag helpers for conditional GETs on folder and email list endpoints.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import MutableHeaders
+
+# Clients may keep the response but must revalidate it before reuse
+CACHE_CONTROL = "private, no-cache"
+
+# Representation is negotiated on format (JSON / MessagePack / NDJSON) and
+# compression, so one ETag only ever validates within these request headers
+VARY = ("Accept", "Accept-Encoding")
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from the parts that determine a response
+    (mailbox state, page cursor, projection, encoding, ...).
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag (weak comparison)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    
+    if if_none_match.strip() == "*":
+        return True
+    
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def add_vary(headers: MutableHeaders, *fields: str):
+    """Merge fields into the Vary header (no duplicates)"""
+    values = [v.strip() for v in headers.get("vary", "").split(",") if v.strip()]
+    present = {v.lower() for v in values}
+    for field in fields:
+        if field.lower() not in present:
+            values.append(field)
+            present.add(field.lower())
+    if values:
+        headers["Vary"] = ", ".join(values)
+
+
+def not_modified(etag: str) -> Response:
+    """304 response carrying the current ETag"""
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": ", ".join(VARY)},
+    )
+
+
+def set_etag(response: Response, etag: Optional[str]) -> Response:
+    """Attach ETag, revalidation and Vary headers to a response (buffered or streamed)"""
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        add_vary(response.headers, *VARY)
+    return response
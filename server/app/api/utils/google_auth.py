@@ -1,8 +1,7 @@
-from google.auth.transport import requests
-from google.oauth2 import id_token
 from google.auth.exceptions import GoogleAuthError
 from typing import Optional, Dict, Any
 from app.config import settings
+from app.services.workers.google_cert_cache import google_cert_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,7 +13,7 @@ async def verify_google_token(token: str) -> Optional[Dict[str, Any]]:
     Best Practices:
     1. Uses Google's official library (most secure)
     2. Automatic audience validation
-    3. Local signature verification (efficient)
+    3. Local signature verification against cached Google certificates (efficient)
     4. Proper error handling and logging
     
     Args:
@@ -24,9 +23,8 @@ async def verify_google_token(token: str) -> Optional[Dict[str, Any]]:
         User information if valid, None if invalid
     """
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            requests.Request(), 
+        idinfo = await google_cert_cache.verify_oauth2_token(
+            token,
             settings.GOOGLE_CLIENT_ID,
             clock_skew_in_seconds=10  # Allow 10 seconds clock skew
         )
@@ -0,0 +1,223 @@
+"""
+Streaming HTML sanitizer for email bodies.
+Tokenizes the HTML in one left-to-right pass and emits the cleaned markup
+into a single output buffer.
+"""
+
+import html
+import re
+import sys
+import logging
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Start tags, end tags, comment openers and <!...>/<?...> declarations.
+# Attribute values are read like HTML5 does: a quote only opens a value right
+# after '=' (and must be closed, or the '<' is left as text), an unquoted value
+# runs to whitespace or '>', so '>' inside quotes doesn't end the tag and a
+# quote inside an unquoted value can't hide markup. Possessive, so no backtracking.
+_TOKEN = re.compile(
+    r'<(?:(/?)([a-zA-Z][^\s/>]*)'
+    r'((?:[^>=]++|=\s*+(?:"[^"]*+"|\'[^\']*+\'|[^\s>"\'][^\s>]*+|(?=[\s>])))*+)>'
+    r'|!--|[!?][^>]*>)'
+)
+
+# Cheap pre-check on the attribute section of a tag; only tags that hit this
+# are parsed and re-rendered, everything else is copied verbatim
+_SUSPICIOUS_ATTRS = re.compile(
+    r'(?:^|[\s/"\'])on\w*\s*=|srcdoc|script\s*:|data\s*:\s*image/|expression\s*\(|&(?:#|colon|tab|newline)',
+    re.IGNORECASE,
+)
+
+_ATTR = re.compile(r'([^\s"\'>/=]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+_SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+
+# Characters browsers ignore inside a URL scheme ("java\tscript:" still runs)
+_URL_NOISE = re.compile(r'[\x00-\x20]+')
+
+# Attributes that carry URLs
+URL_ATTRIBUTES = {
+    "href", "src", "action", "formaction", "background",
+    "poster", "cite", "longdesc", "lowsrc", "dynsrc", "xlink:href",
+}
+
+# Text is collapsed in slices of this size so the output limit is honoured
+# without collapsing the rest of a huge text run
+_TEXT_SLICE = 64 * 1024
+
+
+def _is_unsafe_value(name: str, value: str) -> bool:
+    """Check an (entity-decoded) attribute value for script and inline image payloads"""
+    normalized = _URL_NOISE.sub("", value).lower()
+    if "javascript:" in normalized or "vbscript:" in normalized:
+        return True
+    if name in URL_ATTRIBUTES and normalized.startswith("data:image/"):
+        return True
+    if name == "style" and "expression(" in normalized:
+        return True
+    return False
+
+
+def _render_tag(tag: str, attrs: str, self_closing: bool) -> str:
+    """Re-render a start tag without event handlers and unsafe URLs"""
+    parts = ["<", tag.lower()]
+    for attr in _ATTR.finditer(attrs):
+        name = attr.group(1).lower()
+        raw_value = attr.group(2)
+
+        # Event handlers (onclick, onerror, ...) and inline documents (<iframe srcdoc>)
+        if name.startswith("on") or name == "srcdoc":
+            continue
+
+        if raw_value is None:
+            parts.append(f" {name}")
+            continue
+
+        if raw_value[:1] in ('"', "'"):
+            raw_value = raw_value[1:-1]
+        value = html.unescape(raw_value)
+        if _is_unsafe_value(name, value):
+            continue
+
+        parts.append(f' {name}="{html.escape(value, quote=True)}"')
+    parts.append(" />" if self_closing else ">")
+    return "".join(parts)
+
+
+def _emit_text(
+    body_html: str,
+    start: int,
+    end: int,
+    emit: Callable[[str], None],
+    size: int,
+    limit: int,
+    pending_space: bool,
+) -> Tuple[bool, int]:
+    """Collapse whitespace in body_html[start:end] and emit it, slice by slice"""
+    while start < end and size < limit:
+        stop = end if end - start <= _TEXT_SLICE else start + _TEXT_SLICE
+        text = body_html[start:stop]
+        if text[0].isspace():
+            pending_space = True
+        words = text.split()
+        if words:
+            chunk = " ".join(words)
+            if "<" in chunk:
+                # Stray '<' that didn't form a tag
+                chunk = chunk.replace("<", "&lt;")
+            if pending_space and size:
+                chunk = " " + chunk
+            if size + len(chunk) > limit:
+                chunk = chunk[:limit - size]
+            emit(chunk)
+            size += len(chunk)
+            pending_space = text[-1].isspace()
+        start = stop
+    return pending_space, size
+
+
+def sanitize_html(body_html: str, max_chars: Optional[int] = None) -> str:
+    """
+    Sanitize an HTML email body in a single pass.
+
+    Drops <script> elements, comments, on* event handlers, srcdoc, javascript:/vbscript:
+    URLs and inline data: images, and collapses whitespace runs in text, while
+    walking the input once. Tokenizing stops as soon as the output reaches
+    max_chars; the result is joined into one buffer at the end.
+
+    Args:
+        body_html: Raw decoded HTML body
+        max_chars: Stop once the cleaned output reaches this many characters
+
+    Returns:
+        Cleaned HTML
+    """
+    out: List[str] = []
+    emit = out.append
+    size = 0
+    limit = max_chars if max_chars is not None else sys.maxsize
+    pending_space = False
+
+    pos = 0
+    length = len(body_html)
+
+    while pos < length and size < limit:
+        # Restarted after every skipped region so a token can never straddle it
+        restart = None
+        for match in _TOKEN.finditer(body_html, pos):
+            text_end = match.start()
+            if text_end > pos:
+                if text_end - pos > _TEXT_SLICE or size + text_end - pos >= limit:
+                    pending_space, size = _emit_text(body_html, pos, text_end, emit, size, limit, pending_space)
+                    if size >= limit:
+                        break
+                else:
+                    # Inlined fast path of _emit_text for short text runs
+                    text = body_html[pos:text_end]
+                    if text[0].isspace():
+                        pending_space = True
+                    words = text.split()
+                    if words:
+                        if pending_space and size:
+                            emit(" ")
+                            size += 1
+                        chunk = " ".join(words)
+                        if "<" in chunk:
+                            chunk = chunk.replace("<", "&lt;")
+                        emit(chunk)
+                        size += len(chunk)
+                        pending_space = text[-1].isspace()
+
+            closing, tag, attrs = match.groups()
+            pos = match.end()
+
+            if tag is None:
+                # Comment or declaration: skip it
+                if match.group(0) == "<!--":
+                    end = body_html.find("-->", pos)
+                    restart = length if end < 0 else end + 3
+                    break
+                continue
+
+            if len(tag) == 6 and tag.lower() == "script":
+                # Script element: skip its content up to the closing tag
+                if not closing:
+                    script_end = _SCRIPT_END.search(body_html, pos)
+                    restart = script_end.end() if script_end else length
+                    break
+                continue
+
+            if attrs and not closing and _SUSPICIOUS_ATTRS.search(attrs):
+                stripped = attrs.rstrip()
+                if stripped.endswith("/"):
+                    chunk = _render_tag(tag, stripped[:-1], self_closing=True)
+                else:
+                    chunk = _render_tag(tag, attrs, self_closing=False)
+            else:
+                chunk = match.group(0)
+
+            space = 1 if pending_space and size else 0
+            if size + space + len(chunk) > limit:
+                # Never emit half a tag
+                size = limit
+                break
+            if space:
+                emit(" ")
+            pending_space = False
+            emit(chunk)
+            size += space + len(chunk)
+        else:
+            # No more tokens: the rest is text
+            if pos < length:
+                pending_space, size = _emit_text(body_html, pos, length, emit, size, limit, pending_space)
+            break
+
+        if restart is None:
+            break
+        pos = restart
+
+    if size >= limit:
+        logger.debug(f"HTML sanitizer stopped at output limit ({max_chars} chars)")
+
+    return "".join(out)
@@ -0,0 +1,115 @@
+"""
+Shared async HTTP client with connection pooling and retries.
+Used by the services that call Google APIs so keep-alive connections (and
+their TLS sessions) are reused instead of opening a client per call.
+"""
+
+import asyncio
+import random
+import logging
+from typing import Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; other errors (e.g. invalid_grant, 404) fail immediately
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PooledHttpClient:
+    """
+    Lazily created, process-wide httpx.AsyncClient.
+
+    The client is bound to the event loop it was created on, so it is
+    recreated when used from another loop (e.g. a Celery task's asyncio.run),
+    and the old one is closed rather than left holding its connections.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        retries: int = 2,
+        backoff: float = 0.25,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=60,
+        )
+        # Custom transport (e.g. a stand-in server in tests); None for the network
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set[asyncio.Task] = set()
+
+    def get(self) -> httpx.AsyncClient:
+        """Shared client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._close_stale(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout), limits=self.limits, transport=self.transport
+            )
+            self._loop = loop
+        return self._client
+
+    def _close_stale(self, client: httpx.AsyncClient, client_loop: Optional[asyncio.AbstractEventLoop]):
+        """Close a client created on another event loop, on that loop while it still runs"""
+        if client_loop is not None and client_loop.is_running() and not client_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+            return
+        # Its loop is stopped or gone: close from here, best effort
+        task = asyncio.get_running_loop().create_task(self._aclose_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _aclose_quietly(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug(f"Could not cleanly close HTTP client from a previous event loop: {e}")
+
+    async def aclose(self):
+        """Close the shared client (app shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    async def backoff_sleep(self, attempt: int):
+        """Exponential backoff with jitter before retry number `attempt` (0-based)"""
+        await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying 429/5xx responses and network errors.
+
+        Args:
+            retries: Override the client's retry count (0 for non-idempotent requests)
+
+        Returns:
+            The last response (which may still be an error response)
+        """
+        client = self.get()
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == retries:
+                    return response
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying")
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"{method} {url} failed ({e!r}), retrying")
+
+            await self.backoff_sleep(attempt)
@@ -0,0 +1,78 @@
+"""
+In-process metrics registry.
+Counters, timings and gauges exposed as a JSON snapshot on /metrics.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Any
+
+
+class MetricsRegistry:
+    """
+    Minimal thread-safe metrics registry.
+
+    - Counters: monotonically increasing numbers (hits, bytes saved, ...)
+    - Observations: count/sum/max of a measured value (durations, ratios, ...)
+    - Gauges: callables evaluated when a snapshot is taken
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation of a measured value"""
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                self._observations[name] = {"count": 1, "sum": value, "max": value}
+            else:
+                stats["count"] += 1
+                stats["sum"] += value
+                if value > stats["max"]:
+                    stats["max"] = value
+
+    def register_gauge(self, name: str, func: Callable[[], Any]) -> None:
+        """Register a callable evaluated on every snapshot"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def get(self, name: str) -> float:
+        """Current value of a counter"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as a JSON-serialisable dict"""
+        with self._lock:
+            counters = dict(self._counters)
+            observations = {
+                name: {**stats, "avg": stats["sum"] / stats["count"]}
+                for name, stats in self._observations.items()
+            }
+            gauges = dict(self._gauges)
+
+        gauge_values = {}
+        for name, func in gauges.items():
+            try:
+                gauge_values[name] = func()
+            except Exception as e:
+                gauge_values[name] = f"error: {e}"
+
+        return {
+            "counters": counters,
+            "observations": observations,
+            "gauges": gauge_values,
+        }
+
+
+# Singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,105 @@
+"""
+Fast response encoding for list endpoints.
+Encodes plain dicts built by the server with orjson, or with MessagePack when
+the client asks for it via the Accept header, skipping FastAPI's
+response-model re-validation and jsonable_encoder pass.
+"""
+
+from typing import Any, Dict, Iterable
+
+import msgpack
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Ranges that the default JSON encoding satisfies
+JSON_MEDIA_RANGES = ("application/json", "application/*", "*/*")
+
+
+class MsgPackResponse(Response):
+    """MessagePack-encoded response"""
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def accept_qualities(accept: str) -> Dict[str, float]:
+    """
+    Parse an Accept header into {media range: q}.
+    Ranges are lowercased; a range listed twice keeps its highest q, and
+    entries with a malformed q are ignored.
+    """
+    qualities: Dict[str, float] = {}
+    for entry in accept.split(","):
+        media_range, *params = entry.split(";")
+        media_range = media_range.strip().lower()
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value.strip()), 0.0), 1.0)
+                except ValueError:
+                    q = -1.0
+        if q >= 0:
+            qualities[media_range] = max(q, qualities.get(media_range, 0.0))
+    return qualities
+
+
+def _prefers(request: Request, media_types: Iterable[str]) -> bool:
+    """
+    Whether the client explicitly accepts one of media_types (q > 0) at least
+    as much as JSON. Wildcards only ever count for JSON, the default.
+    """
+    qualities = accept_qualities(request.headers.get("accept", ""))
+    q = max((qualities.get(media_type, 0.0) for media_type in media_types), default=0.0)
+    return q > 0 and q >= max(qualities.get(media_range, 0.0) for media_range in JSON_MEDIA_RANGES)
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """Check whether the client asked for MessagePack (and didn't rank it below JSON)"""
+    return _prefers(request, MSGPACK_MEDIA_TYPES)
+
+
+def accepts_ndjson(request: Request) -> bool:
+    """Check whether the client asked for a newline-delimited JSON stream (and didn't rank it below JSON)"""
+    return _prefers(request, (NDJSON_MEDIA_TYPE,))
+
+
+def response_kind(request: Request) -> str:
+    """Negotiated encoding of a list response (part of its ETag)"""
+    if accepts_ndjson(request):
+        return "ndjson"
+    if accepts_msgpack(request):
+        return "msgpack"
+    return "json"
+
+
+def ndjson_line(content: Any) -> bytes:
+    """Encode one NDJSON record"""
+    return orjson.dumps(content) + b"\n"
+
+
+def encode_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Encode server-built data without re-validating it.
+
+    Args:
+        request: Incoming request (its Accept header picks the encoding)
+        content: JSON-compatible data (dicts/lists/str/int/bool/None)
+        status_code: HTTP status code
+
+    Returns:
+        MsgPackResponse for Accept: application/msgpack, ORJSONResponse otherwise
+    """
+    if accepts_msgpack(request):
+        response = MsgPackResponse(content=content, status_code=status_code)
+    else:
+        response = ORJSONResponse(content=content, status_code=status_code)
+    response.headers["Vary"] = "Accept"
+    return response
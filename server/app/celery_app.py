@@ -11,7 +11,7 @@ celery_app = Celery(
     "capstone_project_label",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["app.tasks.token_refresh"]  # Include task modules
+    include=["app.tasks.token_refresh", "app.tasks.mailbox_sync"]  # Include task modules
 )
 
 # Celery configuration
@@ -24,12 +24,36 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Mailbox syncs: interactive and periodic work on separate queues
+    task_routes={
+        "app.tasks.mailbox_sync.sync_mailbox": {"queue": settings.MAILBOX_SYNC_PERIODIC_QUEUE},
+    },
+    # Take one task at a time so re-queued syncs interleave fairly across workers
+    worker_prefetch_multiplier=1,
 )
 
 # Celery Beat schedule configuration
 celery_app.conf.beat_schedule = {
-    "refresh-gmail-tokens": {
-        "task": "app.tasks.token_refresh.refresh_expiring_gmail_tokens",
-        "schedule": 10.0,  # Run every 10 minutes
+    # Pops due accounts from the Redis refresh schedule (no DB query)
+    "dispatch-gmail-token-refreshes": {
+        "task": "app.tasks.token_refresh.dispatch_token_refreshes",
+        "schedule": settings.TOKEN_REFRESH_DISPATCH_INTERVAL,  # Every 10 seconds
+        "options": {"expires": settings.TOKEN_REFRESH_DISPATCH_INTERVAL},
+    },
+    # Reconciles the refresh schedule with the accounts table
+    "sync-gmail-token-refresh-schedule": {
+        "task": "app.tasks.token_refresh.sync_token_refresh_schedule",
+        "schedule": settings.TOKEN_REFRESH_SYNC_INTERVAL,  # Every hour
+    },
+    # Queues syncs of accounts whose adaptive sync time has come
+    "dispatch-mailbox-syncs": {
+        "task": "app.tasks.mailbox_sync.dispatch_mailbox_syncs",
+        "schedule": settings.MAILBOX_SYNC_DISPATCH_INTERVAL,  # Every 10 seconds
+        "options": {"expires": settings.MAILBOX_SYNC_DISPATCH_INTERVAL},
+    },
+    # Reconciles the mailbox sync schedule with the accounts table
+    "reconcile-mailbox-sync-schedule": {
+        "task": "app.tasks.mailbox_sync.reconcile_mailbox_sync_schedule",
+        "schedule": settings.MAILBOX_SYNC_RECONCILE_INTERVAL,  # Every hour
     },
 }
\ No newline at end of file
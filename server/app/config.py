@@ -19,6 +19,10 @@ class Settings(BaseModel):
     # Redis Configuration
     REDIS_URL: str = os.environ.get("REDIS_URL")
     REDIS_CACHE_URL: str = os.environ.get("REDIS_CACHE_URL")
+    # Process-wide async client for REDIS_CACHE_URL: pool size (callers wait for a free
+    # connection beyond it) and per-command socket timeout
+    REDIS_POOL_MAX_CONNECTIONS: int = int(os.environ.get("REDIS_POOL_MAX_CONNECTIONS", "50"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "2"))
 
 
     #LangChain Configuration
@@ -40,6 +44,28 @@ class Settings(BaseModel):
     GOOGLE_CLIENT_SECRET: str = os.environ.get("GOOGLE_CLIENT_SECRET")
 
     GMAIL_REDIRECT_URI: str = os.environ.get("GMAIL_REDIRECT_URI")
+
+    # Google OAuth endpoints (overridable to point at a local fake token server)
+    GOOGLE_AUTH_URI: str = os.environ.get("GOOGLE_AUTH_URI", "https://accounts.google.com/o/oauth2/auth")
+    GOOGLE_TOKEN_URI: str = os.environ.get("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+    GOOGLE_USERINFO_URI: str = os.environ.get("GOOGLE_USERINFO_URI", "https://www.googleapis.com/oauth2/v2/userinfo")
+
+    # Gmail REST API (overridable to point at a local stand-in server); sub-requests per /batch call (max 100)
+    GMAIL_API_BASE_URL: str = os.environ.get("GMAIL_API_BASE_URL", "https://gmail.googleapis.com")
+    GMAIL_API_TIMEOUT: float = float(os.environ.get("GMAIL_API_TIMEOUT", "30"))
+    GMAIL_API_RETRIES: int = int(os.environ.get("GMAIL_API_RETRIES", "2"))
+    GMAIL_BATCH_SIZE: int = int(os.environ.get("GMAIL_BATCH_SIZE", "50"))
+
+    # Google ID-token signing certificates: refreshed this many seconds before max-age runs out;
+    # neither the background refresh nor an unknown key id refreshes more than once per MIN_REFRESH_INTERVAL
+    GOOGLE_CERTS_URI: str = os.environ.get("GOOGLE_CERTS_URI", "https://www.googleapis.com/oauth2/v1/certs")
+    GOOGLE_CERTS_REFRESH_MARGIN: int = int(os.environ.get("GOOGLE_CERTS_REFRESH_MARGIN", "300"))
+    GOOGLE_CERTS_MIN_REFRESH_INTERVAL: int = int(os.environ.get("GOOGLE_CERTS_MIN_REFRESH_INTERVAL", "60"))
+
+    # Shared OAuth HTTP client: per-request timeout and retries (exponential backoff) on 429/5xx/network errors
+    OAUTH_HTTP_TIMEOUT: float = float(os.environ.get("OAUTH_HTTP_TIMEOUT", "10"))
+    OAUTH_HTTP_RETRIES: int = int(os.environ.get("OAUTH_HTTP_RETRIES", "2"))
+    OAUTH_HTTP_BACKOFF: float = float(os.environ.get("OAUTH_HTTP_BACKOFF", "0.25"))
     GMAIL_SCOPES: List[str] = [
         "https://mail.google.com/",
         "openid",
@@ -52,6 +78,106 @@ class Settings(BaseModel):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 60
+
+    # Email Cleaning Configuration
+    # Cleaned HTML bodies are cut off once they reach this many characters
+    HTML_SANITIZER_MAX_CHARS: int = int(os.environ.get("HTML_SANITIZER_MAX_CHARS", "2000000"))
+
+    # Messages fetched per IMAP round trip when streaming /emails and /search as NDJSON
+    EMAIL_STREAM_CHUNK_SIZE: int = int(os.environ.get("EMAIL_STREAM_CHUNK_SIZE", "25"))
+
+    # Seconds a mailbox STATUS snapshot may answer If-None-Match without IMAP
+    MAILBOX_STATE_TTL: float = float(os.environ.get("MAILBOX_STATE_TTL", "5"))
+
+    # Background mailbox sync (Celery): folders kept warm and most recent messages stored per folder
+    MAILBOX_SYNC_ENABLED: bool = os.environ.get("MAILBOX_SYNC_ENABLED", "true").lower() == "true"
+    MAILBOX_SYNC_FOLDERS: List[str] = [
+        folder.strip() for folder in os.environ.get("MAILBOX_SYNC_FOLDERS", "INBOX").split(",") if folder.strip()
+    ]
+    MAILBOX_SYNC_WINDOW: int = int(os.environ.get("MAILBOX_SYNC_WINDOW", "200"))
+    # Messages fetched per sync run; a larger backlog is re-queued behind other accounts
+    MAILBOX_SYNC_BATCH: int = int(os.environ.get("MAILBOX_SYNC_BATCH", "100"))
+    # Bounds of each account's adaptive sync interval (follows mail arrival rate and API activity)
+    MAILBOX_SYNC_MIN_INTERVAL: float = float(os.environ.get("MAILBOX_SYNC_MIN_INTERVAL", "30"))
+    MAILBOX_SYNC_MAX_INTERVAL: float = float(os.environ.get("MAILBOX_SYNC_MAX_INTERVAL", "1800"))
+    # How often beat pops due accounts from the sync schedule, at most how many per run,
+    # and the TTL of the lease that keeps dispatcher runs from overlapping
+    MAILBOX_SYNC_DISPATCH_INTERVAL: float = float(os.environ.get("MAILBOX_SYNC_DISPATCH_INTERVAL", "10"))
+    MAILBOX_SYNC_DISPATCH_BATCH: int = int(os.environ.get("MAILBOX_SYNC_DISPATCH_BATCH", "500"))
+    MAILBOX_SYNC_DISPATCH_LEASE: int = int(os.environ.get("MAILBOX_SYNC_DISPATCH_LEASE", "60"))
+    # How often the sync schedule is reconciled with the accounts table
+    MAILBOX_SYNC_RECONCILE_INTERVAL: float = float(os.environ.get("MAILBOX_SYNC_RECONCILE_INTERVAL", "3600"))
+    # How old synced data may be when served
+    MAILBOX_SYNC_MAX_AGE: float = float(os.environ.get("MAILBOX_SYNC_MAX_AGE", "300"))
+    # Folder list cache: past MAILBOX_SYNC_MAX_AGE a listing is still served, with a
+    # background refresh, until it is FOLDER_CACHE_MAX_STALE old; a fill holds its
+    # Redis lock at most FOLDER_CACHE_LOCK_TTL seconds
+    FOLDER_CACHE_MAX_STALE: float = float(os.environ.get("FOLDER_CACHE_MAX_STALE", str(6 * 3600)))
+    FOLDER_CACHE_LOCK_TTL: int = int(os.environ.get("FOLDER_CACHE_LOCK_TTL", "30"))
+    FOLDER_CACHE_POLL_INTERVAL: float = float(os.environ.get("FOLDER_CACHE_POLL_INTERVAL", "0.2"))
+    # Per-account sync lease (renewed every third of it while the sync runs, so it
+    # only lapses when the worker dies), and how long an interactive sync request is debounced
+    MAILBOX_SYNC_LEASE: int = int(os.environ.get("MAILBOX_SYNC_LEASE", "600"))
+    MAILBOX_SYNC_REQUEST_TTL: int = int(os.environ.get("MAILBOX_SYNC_REQUEST_TTL", "30"))
+    MAILBOX_SYNC_INTERACTIVE_QUEUE: str = os.environ.get("MAILBOX_SYNC_INTERACTIVE_QUEUE", "sync.interactive")
+    MAILBOX_SYNC_PERIODIC_QUEUE: str = os.environ.get("MAILBOX_SYNC_PERIODIC_QUEUE", "sync.periodic")
+    MAILBOX_STORE_TTL: int = int(os.environ.get("MAILBOX_STORE_TTL", str(24 * 3600)))
+    # Sync worker nodes: heartbeat period, silence after which a node leaves the ring,
+    # and virtual points per node on the consistent hash ring
+    SYNC_NODE_HEARTBEAT_INTERVAL: float = float(os.environ.get("SYNC_NODE_HEARTBEAT_INTERVAL", "10"))
+    SYNC_NODE_TTL: float = float(os.environ.get("SYNC_NODE_TTL", "30"))
+    SYNC_NODE_RING_REPLICAS: int = int(os.environ.get("SYNC_NODE_RING_REPLICAS", "160"))
+
+    # Response compression: bodies below MIN_SIZE are sent as is, bodies above
+    # THREAD_MIN_SIZE are compressed in a worker thread
+    COMPRESSION_MIN_SIZE: int = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_THREAD_MIN_SIZE: int = int(os.environ.get("COMPRESSION_THREAD_MIN_SIZE", str(256 * 1024)))
+    COMPRESSION_GZIP_LEVEL: int = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_ZSTD_LEVEL: int = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3"))
+
+    # GET /metrics is internal: off unless enabled, and then answered only for these client
+    # addresses (the peer address, so behind a proxy list the proxy or scrape the app directly)
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_ALLOWED_IPS: List[str] = [
+        ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()
+    ]
+
+    # Verified-JWT / current-user cache: max tokens held and TTL (always capped by the token's exp)
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_CACHE_TTL: float = float(os.environ.get("AUTH_CACHE_TTL", "60"))
+
+    # In-process label cache in front of Redis: max accounts held and safety TTL
+    # (entries are dropped on pub/sub invalidation; the TTL only bounds a lost message)
+    LABEL_L1_MAX_ENTRIES: int = int(os.environ.get("LABEL_L1_MAX_ENTRIES", "10000"))
+    LABEL_L1_TTL: float = float(os.environ.get("LABEL_L1_TTL", "30"))
+
+    # Gmail account cache: in-process TTL and Redis tier TTL (capped by token expiry)
+    ACCOUNT_CACHE_LOCAL_TTL: float = float(os.environ.get("ACCOUNT_CACHE_LOCAL_TTL", "30"))
+    ACCOUNT_CACHE_REDIS_TTL: int = int(os.environ.get("ACCOUNT_CACHE_REDIS_TTL", "3600"))
+
+    # Single-flight token refresh: Redis lock TTL and how often waiters poll for the new token
+    TOKEN_REFRESH_LOCK_TTL: int = int(os.environ.get("TOKEN_REFRESH_LOCK_TTL", "30"))
+    TOKEN_REFRESH_POLL_INTERVAL: float = float(os.environ.get("TOKEN_REFRESH_POLL_INTERVAL", "0.1"))
+    # Celery token refresh: concurrent Google calls per run and accounts committed per DB batch
+    TOKEN_REFRESH_CONCURRENCY: int = int(os.environ.get("TOKEN_REFRESH_CONCURRENCY", "50"))
+    TOKEN_REFRESH_DB_BATCH_SIZE: int = int(os.environ.get("TOKEN_REFRESH_DB_BATCH_SIZE", "500"))
+    # Refresh schedule (Redis sorted set): refresh this long before expiry, minus up to JITTER seconds
+    TOKEN_REFRESH_LEAD_SECONDS: int = int(os.environ.get("TOKEN_REFRESH_LEAD_SECONDS", "600"))
+    TOKEN_REFRESH_JITTER_SECONDS: int = int(os.environ.get("TOKEN_REFRESH_JITTER_SECONDS", "240"))
+    # Dispatcher: beat interval, lease TTL and accounts per enqueued refresh task
+    TOKEN_REFRESH_DISPATCH_INTERVAL: float = float(os.environ.get("TOKEN_REFRESH_DISPATCH_INTERVAL", "10"))
+    TOKEN_REFRESH_DISPATCH_LEASE: int = int(os.environ.get("TOKEN_REFRESH_DISPATCH_LEASE", "60"))
+    TOKEN_REFRESH_DISPATCH_BATCH: int = int(os.environ.get("TOKEN_REFRESH_DISPATCH_BATCH", "100"))
+    # How often the schedule is reconciled with the accounts table
+    TOKEN_REFRESH_SYNC_INTERVAL: float = float(os.environ.get("TOKEN_REFRESH_SYNC_INTERVAL", "3600"))
+
+    # Cleaned body cache: in-process LRU size and optional shared Redis tier
+    BODY_CACHE_MAX_BYTES: int = int(os.environ.get("BODY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    BODY_CACHE_REDIS_ENABLED: bool = os.environ.get("BODY_CACHE_REDIS_ENABLED", "false").lower() == "true"
+    BODY_CACHE_REDIS_TTL: int = int(os.environ.get("BODY_CACHE_REDIS_TTL", str(24 * 3600)))
+    # Payloads smaller than this are cheaper to clean than to fetch from Redis
+    BODY_CACHE_REDIS_MIN_BYTES: int = int(os.environ.get("BODY_CACHE_REDIS_MIN_BYTES", str(16 * 1024)))
     # Tortoise ORM Configuration
 
 settings = Settings()
@@ -1,5 +1,6 @@
 # app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from tortoise.contrib.fastapi import register_tortoise
 import uvicorn
@@ -9,6 +10,14 @@ from app.api.router import imap
 from app.api.router import suggest_label
 # from app.api.router import langchain_test
 from app.config import settings, TORTOISE_ORM
+from app.api.deps import require_internal_client
+from app.api.utils.metrics import metrics
+from app.api.utils.compression import CompressionMiddleware
+from app.services.default.gmail_oauth_service import gmail_oauth_service
+from app.services.default.gmail_rest_service import gmail_rest_service
+from app.services.workers.google_cert_cache import google_cert_cache
+from app.services.workers.redis_pool import redis_pool
+from app.services.workers.label_l1_cache import label_l1_cache
 import logging
 
 # Configure logging to ensure INFO level logs are shown
@@ -23,8 +32,23 @@ logging.getLogger().setLevel(logging.INFO)
 logging.getLogger("app").setLevel(logging.INFO)
 logging.getLogger("app.services.workers.redis_label_cache").setLevel(logging.INFO)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown: background refreshers and shared HTTP/Redis connection pools"""
+    app.state.redis = await redis_pool.open()
+    google_cert_cache.start()
+    label_l1_cache.start(app.state.redis)
+    yield
+    await label_l1_cache.stop()
+    await google_cert_cache.stop()
+    await gmail_oauth_service.aclose()
+    await gmail_rest_service.aclose()
+    await redis_pool.close()
+
+
 # Create FastAPI application
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Label - Email Organization API with Google OAuth",
@@ -42,6 +66,9 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Response compression (zstd/brotli/gzip) for large email list payloads
+app.add_middleware(CompressionMiddleware)
+
 # ============================================================================
 # PUBLIC ROUTES (No authentication required)
 # ============================================================================
@@ -104,6 +131,12 @@ async def db_health_check():
         }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False, dependencies=[Depends(require_internal_client)])
+async def get_metrics():
+    """In-process metrics (cache hit ratios, bytes saved, ...); internal only"""
+    return metrics.snapshot()
+
+
 # ============================================================================
 # APPLICATION ENTRY POINT
 # ============================================================================
@@ -1,7 +1,19 @@
 from uuid import UUID
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Sequence
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+from tortoise.transactions import in_transaction
 from app.models.gmail_account import GmailAccount
 from app.enums.gmail import GmailAccountStatus
+from app.services.workers.account_cache import account_cache
+from app.services.workers.token_refresh_scheduler import token_refresh_scheduler
+from app.services.workers.mailbox_store import mailbox_store
+from app.services.workers.mailbox_sync_scheduler import mailbox_sync_scheduler
+
+# Fields a token refresh needs (skips created_at and other columns)
+TOKEN_REFRESH_FIELDS = ("id", "user_id", "email_address", "meta", "token_expiry", "status", "updated_at")
+
 
 class GmailAccountRepository:
 
@@ -13,21 +25,33 @@ class GmailAccountRepository:
         token_expiry: datetime
     ) -> GmailAccount:
         """Create a new Gmail account connection"""
-        return await GmailAccount.create(
+        account = await GmailAccount.create(
             user_id=user_id,
             email_address=email_address,
             meta=meta,
             token_expiry=token_expiry,
             status=GmailAccountStatus.ACTIVE
         )
+        await token_refresh_scheduler.schedule(str(account.id), token_expiry)
+        await mailbox_sync_scheduler.schedule_many([str(account.id)])
+        return account
 
     @staticmethod
-    async def get_user_gmail_accounts(user_id: UUID) -> list[GmailAccount]:
-        """Get all active Gmail accounts for a user"""
-        return await GmailAccount.filter(
+    async def get_user_gmail_accounts(user_id: UUID, fields: Sequence[str] | None = None) -> list[GmailAccount]:
+        """
+        Get all active Gmail accounts for a user
+
+        Args:
+            user_id: Owner's UUID
+            fields: Load only these fields (e.g. leave out the meta token blob)
+        """
+        query = GmailAccount.filter(
             user_id=user_id,
             status=GmailAccountStatus.ACTIVE
-        ).all()
+        ).order_by("created_at")
+        if fields:
+            query = query.only(*fields)
+        return await query
 
     @staticmethod
     async def get_gmail_account_by_id(account_id: UUID) -> GmailAccount | None:
@@ -50,8 +74,44 @@ class GmailAccountRepository:
         account.token_expiry = token_expiry
         account.status = GmailAccountStatus.ACTIVE
         await account.save()
+        await account_cache.set(account)
+        await token_refresh_scheduler.schedule(str(account.id), token_expiry)
         return account
 
+    @staticmethod
+    async def bulk_update_tokens(accounts: list[GmailAccount], batch_size: int = 500) -> None:
+        """
+        Persist refreshed tokens of many accounts in one transaction.
+
+        The accounts' meta and token_expiry must already be updated in memory.
+        """
+        if not accounts:
+            return
+        now = datetime.now(timezone.utc)
+        for account in accounts:
+            account.status = GmailAccountStatus.ACTIVE
+            account.updated_at = now
+        await GmailAccountRepository.bulk_update_fields(
+            accounts,
+            fields=["meta", "token_expiry", "status", "updated_at"],
+            batch_size=batch_size
+        )
+        await account_cache.set_many(accounts)
+        await token_refresh_scheduler.schedule_many((str(account.id), account.token_expiry) for account in accounts)
+
+    @staticmethod
+    async def bulk_update_fields(accounts: list[GmailAccount], fields: list[str], batch_size: int = 500) -> None:
+        """
+        Write only `fields` of many accounts, batch_size rows per UPDATE, in one transaction.
+
+        Works with partially loaded accounts (iter_account_batches(fields=...))
+        as long as `fields` were loaded or set.
+        """
+        if not accounts:
+            return
+        async with in_transaction():
+            await GmailAccount.bulk_update(accounts, fields=fields, batch_size=batch_size)
+
     @staticmethod
     async def mark_as_error(
         account: GmailAccount,
@@ -59,19 +119,166 @@ class GmailAccountRepository:
         """Mark account as error (needs reconnection)"""
         account.status = GmailAccountStatus.ERROR
         await account.save()
+        await account_cache.invalidate(str(account.id))
+        await token_refresh_scheduler.unschedule(str(account.id))
         return account
     
+    @staticmethod
+    async def bulk_mark_as_error(account_ids: list[UUID]) -> int:
+        """Mark many accounts as error with a single UPDATE"""
+        if not account_ids:
+            return 0
+        updated = await GmailAccount.filter(id__in=account_ids).update(status=GmailAccountStatus.ERROR)
+        await account_cache.invalidate(*[str(account_id) for account_id in account_ids])
+        await token_refresh_scheduler.unschedule(*[str(account_id) for account_id in account_ids])
+        return updated
+
     @staticmethod
     async def disconnect_gmail_account(account: GmailAccount) -> None:
         """Disconnect (delete) a Gmail account"""
         await account.delete()
+        await account_cache.invalidate(str(account.id))
+        await token_refresh_scheduler.unschedule(str(account.id))
+        await mailbox_sync_scheduler.unschedule(str(account.id))
+        await mailbox_store.delete_account(str(account.id))
     
     @staticmethod
     async def get_expiring_accounts(minutes: int = 15) -> list[GmailAccount]:
-        """Get accounts expiring within N minutes (for Celery Beat)"""
-        from datetime import timedelta
+        """
+        Get accounts expiring within N minutes (for Celery Beat)
+
+        Loads every match at once; background jobs use iter_expiring_accounts.
+        """
         threshold = datetime.now(timezone.utc) + timedelta(minutes=minutes)
         return await GmailAccount.filter(
             token_expiry__lt=threshold,
             status=GmailAccountStatus.ACTIVE
-        ).all()
\ No newline at end of file
+        ).all()
+
+    @staticmethod
+    async def get_expiring_accounts_by_ids(
+        account_ids: list[UUID],
+        minutes: int = 15,
+        fields: Sequence[str] | None = TOKEN_REFRESH_FIELDS
+    ) -> list[GmailAccount]:
+        """Get the given accounts that are active and expiring within N minutes"""
+        threshold = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+        query = GmailAccount.filter(
+            id__in=account_ids,
+            token_expiry__lt=threshold,
+            status=GmailAccountStatus.ACTIVE
+        )
+        if fields:
+            query = query.only(*fields)
+        return await query
+
+    @staticmethod
+    async def get_active_token_expiries(account_ids: list[UUID]) -> list[tuple[UUID, datetime]]:
+        """(id, token_expiry) of the given accounts that are active (for the refresh schedule)"""
+        return await GmailAccount.filter(
+            id__in=account_ids,
+            status=GmailAccountStatus.ACTIVE
+        ).values_list("id", "token_expiry")
+
+    @staticmethod
+    async def get_active_ids(account_ids: list[UUID]) -> set[UUID]:
+        """Which of the given accounts are active"""
+        return set(await GmailAccount.filter(
+            id__in=account_ids,
+            status=GmailAccountStatus.ACTIVE
+        ).values_list("id", flat=True))
+
+    # ------------------------------------------------------------------
+    # Keyset-paginated iteration (background jobs)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def _iter_keyset(
+        query: QuerySet,
+        batch_size: int,
+        fields: Sequence[str] | None,
+        as_values: bool
+    ) -> AsyncIterator[list[Any]]:
+        """
+        Page through `query` ordered by (token_expiry, id), resuming after the
+        last row of each page instead of using OFFSET.
+        """
+        if fields:
+            # The keyset columns must be loaded to resume after the last row
+            fields = list(dict.fromkeys([*fields, "token_expiry", "id"]))
+
+        last: tuple[datetime, UUID] | None = None
+        while True:
+            page = query
+            if last is not None:
+                page = page.filter(
+                    Q(token_expiry__gt=last[0]) | Q(token_expiry=last[0], id__gt=last[1])
+                )
+            page = page.order_by("token_expiry", "id").limit(batch_size)
+            if as_values:
+                rows = await (page.values(*fields) if fields else page.values())
+            else:
+                rows = await (page.only(*fields) if fields else page)
+            if not rows:
+                return
+            # Taken before yielding: callers may change token_expiry (e.g. a refresh)
+            tail = rows[-1]
+            last = (tail["token_expiry"], tail["id"]) if as_values else (tail.token_expiry, tail.id)
+            yield rows
+            if len(rows) < batch_size:
+                return
+
+    @staticmethod
+    def iter_account_batches(
+        status: GmailAccountStatus | None = GmailAccountStatus.ACTIVE,
+        expiring_within_minutes: int | None = None,
+        batch_size: int = 500,
+        fields: Sequence[str] | None = None
+    ) -> AsyncIterator[list[GmailAccount]]:
+        """
+        Iterate accounts in keyset-paginated batches ordered by (token_expiry, id).
+
+        Only one batch is in memory at a time. Partially loaded accounts
+        (`fields`) can be written back with bulk_update_fields.
+
+        Args:
+            status: Only accounts with this status (None for all)
+            expiring_within_minutes: Only accounts whose token expires within N minutes
+            batch_size: Accounts per batch
+            fields: Load only these fields (id and token_expiry are always loaded)
+        """
+        query = GmailAccount.all()
+        if status is not None:
+            query = query.filter(status=status)
+        if expiring_within_minutes is not None:
+            threshold = datetime.now(timezone.utc) + timedelta(minutes=expiring_within_minutes)
+            query = query.filter(token_expiry__lt=threshold)
+        return GmailAccountRepository._iter_keyset(query, batch_size, fields, as_values=False)
+
+    @staticmethod
+    def iter_expiring_accounts(
+        minutes: int = 15,
+        batch_size: int = 500,
+        fields: Sequence[str] | None = TOKEN_REFRESH_FIELDS
+    ) -> AsyncIterator[list[GmailAccount]]:
+        """Active accounts expiring within N minutes, in batches (for the refresh scan)"""
+        return GmailAccountRepository.iter_account_batches(
+            expiring_within_minutes=minutes,
+            batch_size=batch_size,
+            fields=fields
+        )
+
+    @staticmethod
+    def iter_account_values(
+        *fields: str,
+        status: GmailAccountStatus | None = GmailAccountStatus.ACTIVE,
+        batch_size: int = 1000
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Iterate plain dicts of `fields` in keyset-paginated batches, without
+        building model instances (e.g. iter_account_values("id", "token_expiry")).
+        """
+        query = GmailAccount.all()
+        if status is not None:
+            query = query.filter(status=status)
+        return GmailAccountRepository._iter_keyset(query, batch_size, fields, as_values=True)
@@ -12,9 +12,13 @@ class GmailOAuthServiceBase(ABC):
         pass
 
     @abstractmethod
-    def exchange_tokens(self,code:str)->Dict[str,Any]:
+    async def exchange_tokens_async(self,code:str)->Dict[str,Any]:
         pass
 
     @abstractmethod
-    def refresh_auth_access_token(self,refresh_token:str) ->Dict[str,Any]:
+    async def refresh_auth_access_token_async(self,refresh_token:str)->Dict[str,Any]:
+        pass
+
+    @abstractmethod
+    async def get_user_email(self,access_token:str)->Optional[str]:
         pass
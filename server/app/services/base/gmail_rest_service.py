@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
+
+
+@dataclass
+class BatchRequest:
+    """One sub-request of a Gmail batch call (path relative to the API root)"""
+    method: str
+    path: str
+    body: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class BatchResponse:
+    """Result of one batch sub-request"""
+    status: int
+    body: Optional[Any] = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class GmailRestServiceBase(ABC):
+    """
+    Abstract base class for the Gmail REST API client
+    Covers operations IMAP can't do (label creation) or does one message at a time
+    """
+
+    @abstractmethod
+    async def batch(self, access_token: str, requests: List[BatchRequest]) -> List[BatchResponse]:
+        """Send sub-requests through the multipart /batch endpoint; responses in request order"""
+        pass
+
+    @abstractmethod
+    async def list_labels(self, access_token: str) -> List[Dict[str, Any]]:
+        """List all labels (id, name, type, ...)"""
+        pass
+
+    @abstractmethod
+    async def create_label(
+        self,
+        access_token: str,
+        label_name: str,
+        label_list_visibility: str = "labelShow",
+        message_list_visibility: str = "show"
+    ) -> Dict[str, Any]:
+        """Create a single label"""
+        pass
+
+    @abstractmethod
+    async def create_labels(self, access_token: str, labels: List[Dict[str, str]]) -> List[BatchResponse]:
+        """Create several labels in batched requests"""
+        pass
+
+    @abstractmethod
+    async def batch_modify(
+        self,
+        access_token: str,
+        message_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None
+    ) -> None:
+        """Add/remove labels on many messages (messages.batchModify)"""
+        pass
+
+    @abstractmethod
+    async def batch_delete(self, access_token: str, message_ids: List[str]) -> None:
+        """Permanently delete many messages (messages.batchDelete)"""
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from dataclasses import dataclass
 
 @dataclass
@@ -18,6 +18,8 @@ class EmailMessage:
     message_id: Optional[str] = None
     in_reply_to: Optional[str] = None
     references: Optional[str] = None
+    # Plain-text preview of the body
+    preview: Optional[str] = None
 
 @dataclass
 class FolderInfo:
@@ -26,6 +28,14 @@ class FolderInfo:
     flags: List[str]
     delimiter: str = '/'
 
+@dataclass(frozen=True)
+class MailboxState:
+    """IMAP STATUS snapshot of a folder; changes whenever its contents change"""
+    uidvalidity: int
+    uidnext: int
+    highestmodseq: Optional[int]
+    messages: int
+
 class GmailImapServiceBase(ABC):
     """Abstract base class for Gmail IMAP operations"""
     
@@ -44,6 +54,11 @@ class GmailImapServiceBase(ABC):
         """List all folders/labels"""
         pass
     
+    @abstractmethod
+    async def get_folder_state(self, folder: str = 'INBOX') -> MailboxState:
+        """Get UIDVALIDITY/UIDNEXT/HIGHESTMODSEQ for a folder with one STATUS command"""
+        pass
+    
     @abstractmethod
     async def fetch_emails(
         self,
@@ -54,6 +69,43 @@ class GmailImapServiceBase(ABC):
         """Fetch emails from a folder"""
         pass
     
+    @abstractmethod
+    async def fetch_email(self, uid: int, folder: str = 'INBOX') -> Optional[EmailMessage]:
+        """Fetch one email by UID (None if the folder has no such message)"""
+        pass
+    
+    @abstractmethod
+    async def get_email_uids(
+        self,
+        folder: str = 'INBOX',
+        since_date: Optional[str] = None
+    ) -> List[int]:
+        """Select folder and return matching UIDs, most recent first"""
+        pass
+    
+    @abstractmethod
+    async def search_email_uids(self, query: str, folder: str = 'INBOX') -> List[int]:
+        """Select folder and return UIDs matching a search, most recent first"""
+        pass
+    
+    @abstractmethod
+    def iter_emails_by_uid(
+        self,
+        uids: List[int],
+        chunk_size: int = 25
+    ) -> AsyncIterator[List[EmailMessage]]:
+        """Fetch and parse messages of the selected folder in UID chunks"""
+        pass
+    
+    @abstractmethod
+    async def get_message_labels(
+        self,
+        uids: List[int],
+        changed_since: Optional[int] = None
+    ) -> Dict[int, List[str]]:
+        """Labels of messages in the selected folder, optionally only those changed since a MODSEQ"""
+        pass
+    
     @abstractmethod
     async def search_emails(
         self,
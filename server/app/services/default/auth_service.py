@@ -1,8 +1,7 @@
-from google.auth.transport import requests
-from google.oauth2 import id_token
 from google.auth.exceptions import GoogleAuthError
 from typing import Optional, Dict, Any
 from app.config import settings
+from app.services.workers.google_cert_cache import google_cert_cache
 from app.services.base.auth_service import AuthService
 import logging
 
@@ -22,7 +21,7 @@ class GoogleAuthService(AuthService):
         
         How it works:
         1. Google signs tokens with their private key
-        2. We verify using Google's public keys (fetched automatically)
+        2. We verify locally using Google's public keys (cached, refreshed in the background)
         3. If signature is valid, token is genuine
         
         Args:
@@ -33,9 +32,8 @@ class GoogleAuthService(AuthService):
         """
         try:
             # Verify token signature and claims automatically
-            idinfo = id_token.verify_oauth2_token(
+            idinfo = await google_cert_cache.verify_oauth2_token(
                 token,
-                requests.Request(),
                 self.client_id,
                 clock_skew_in_seconds=10
             )
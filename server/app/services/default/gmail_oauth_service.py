@@ -1,11 +1,9 @@
 from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
 from typing import Dict, Any, Optional
 from app.config import settings
 from app.services.base.gmail_oauth_service import GmailOAuthServiceBase
 import logging
-from datetime import datetime, timezone
+from app.api.utils.http_client import PooledHttpClient
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +19,16 @@ class GmailOAuthService(GmailOAuthServiceBase):
         self.client_secret = settings.GOOGLE_CLIENT_SECRET
         self.redirect_uri = settings.GMAIL_REDIRECT_URI
         self.scopes = settings.GMAIL_SCOPES
+        self.auth_uri = settings.GOOGLE_AUTH_URI
+        self.token_uri = settings.GOOGLE_TOKEN_URI
+        self.userinfo_uri = settings.GOOGLE_USERINFO_URI
+        
+        # Shared keep-alive client for async calls (retries 429/5xx with backoff)
+        self.http = PooledHttpClient(
+            timeout=settings.OAUTH_HTTP_TIMEOUT,
+            retries=settings.OAUTH_HTTP_RETRIES,
+            backoff=settings.OAUTH_HTTP_BACKOFF,
+        )
         
         if not all([self.client_id, self.client_secret, self.redirect_uri]):
             logger.warning("Gmail OAuth credentials not fully configured")
@@ -33,8 +41,8 @@ class GmailOAuthService(GmailOAuthServiceBase):
             "web": {
                 "client_id": self.client_id,
                 "client_secret": self.client_secret,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
+                "auth_uri": self.auth_uri,
+                "token_uri": self.token_uri,
                 "redirect_uris": [self.redirect_uri]
             }
         }
@@ -77,33 +85,51 @@ class GmailOAuthService(GmailOAuthServiceBase):
             logger.error(f"Failed to generate Gmail OAuth URL: {e}")
             raise ValueError(f"Failed to generate authorization URL: {str(e)}")
 
-    def exchange_tokens(self, code: str) -> Dict[str, Any]:
+    # ------------------------------------------------------------------
+    # Async token endpoint / userinfo calls over a shared HTTP client
+    # ------------------------------------------------------------------
+
+    async def aclose(self):
+        """Close the shared HTTP client (app shutdown)"""
+        await self.http.aclose()
+
+    async def _post_token_endpoint(self, data: Dict[str, str]) -> Dict[str, Any]:
         """
-        Exchange authorization code for tokens
+        POST to the token endpoint and return the parsed token response.
+        Only refresh_token grants are retried: an authorization code is single-use,
+        so resending it after Google consumed it would fail with invalid_grant.
         """
+        retries = None if data.get("grant_type") == "refresh_token" else 0
+        response = await self.http.request("POST", self.token_uri, retries=retries, data=data)
         try:
-            flow = self._create_flow()
-            
-            # Exchange code for tokens
-            flow.fetch_token(code=code)
-            credentials = flow.credentials
-            
-            # Extract token information
-            # Handle timezone-aware/naive datetime for expiry
-            expires_in_seconds = 3600  # default
-            if credentials.expiry:
-                # credentials.expiry might be naive (no timezone), make it UTC-aware
-                expiry = credentials.expiry
-                if expiry.tzinfo is None:
-                    # Naive datetime - assume UTC
-                    expiry = expiry.replace(tzinfo=timezone.utc)
-                expires_in_seconds = int((expiry - datetime.now(timezone.utc)).total_seconds())
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        
+        if response.status_code != 200:
+            error = payload.get("error", response.status_code)
+            description = payload.get("error_description", response.text[:200])
+            raise ValueError(f"{error}: {description}")
+        return payload
+
+    async def exchange_tokens_async(self, code: str) -> Dict[str, Any]:
+        """
+        Exchange authorization code for tokens without blocking the event loop
+        """
+        try:
+            payload = await self._post_token_endpoint({
+                "grant_type": "authorization_code",
+                "code": code,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "redirect_uri": self.redirect_uri,
+            })
             
             token_data = {
-                'access_token': credentials.token,
-                'refresh_token': credentials.refresh_token,
-                'expires_in': expires_in_seconds,
-                'scope': ' '.join(credentials.scopes) if credentials.scopes else '',
+                'access_token': payload['access_token'],
+                'refresh_token': payload.get('refresh_token'),
+                'expires_in': int(payload.get('expires_in', 3600)),
+                'scope': payload.get('scope', ''),
                 'token_type': 'Bearer'
             }
             
@@ -113,10 +139,10 @@ class GmailOAuthService(GmailOAuthServiceBase):
         except Exception as e:
             logger.error(f"Failed to exchange code for tokens: {e}")
             raise ValueError(f"Failed to exchange authorization code: {str(e)}")
-    
-    def refresh_auth_access_token(self, refresh_token: str) -> Dict[str, Any]:
+
+    async def refresh_auth_access_token_async(self, refresh_token: str) -> Dict[str, Any]:
         """
-        Refresh expired access token
+        Refresh expired access token without blocking the event loop
         
         Args:
             refresh_token: Refresh token from stored credentials
@@ -125,32 +151,17 @@ class GmailOAuthService(GmailOAuthServiceBase):
             Dictionary with new access token and metadata
         """
         try:
-            # Create credentials object with refresh token
-            credentials = Credentials(
-                token=None,  # Will be populated by refresh
-                refresh_token=refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
-            
-            # Refresh the token
-            credentials.refresh(Request())
-            
-            # Handle timezone-aware/naive datetime for expiry
-            expires_in_seconds = 3600  # default
-            if credentials.expiry:
-                # credentials.expiry might be naive (no timezone), make it UTC-aware
-                expiry = credentials.expiry
-                if expiry.tzinfo is None:
-                    # Naive datetime - assume UTC
-                    expiry = expiry.replace(tzinfo=timezone.utc)
-                expires_in_seconds = int((expiry - datetime.now(timezone.utc)).total_seconds())
+            payload = await self._post_token_endpoint({
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            })
             
             token_data = {
-                'access_token': credentials.token,
-                'expires_in': expires_in_seconds,
-                'scope': ' '.join(credentials.scopes) if credentials.scopes else '',
+                'access_token': payload['access_token'],
+                'expires_in': int(payload.get('expires_in', 3600)),
+                'scope': payload.get('scope', ''),
                 'token_type': 'Bearer'
             }
             
@@ -161,6 +172,32 @@ class GmailOAuthService(GmailOAuthServiceBase):
             logger.error(f"Failed to refresh access token: {e}")
             raise ValueError(f"Failed to refresh access token: {str(e)}")
 
+    async def get_user_email(self, access_token: str) -> Optional[str]:
+        """
+        Get user's email address from an access token (Google userinfo API)
+        
+        Returns:
+            User's email address or None if failed
+        """
+        try:
+            response = await self.http.request(
+                "GET",
+                self.userinfo_uri,
+                headers={"Authorization": f"Bearer {access_token}"}
+            )
+            
+            if response.status_code == 200:
+                email = response.json().get("email")
+                logger.info(f"Successfully retrieved email from token: {email}")
+                return email
+            
+            logger.error(f"Failed to get userinfo: {response.status_code} - {response.text}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error getting user email from token: {e}")
+            return None
+
 
 # Singleton instance
 gmail_oauth_service = GmailOAuthService()
\ No newline at end of file
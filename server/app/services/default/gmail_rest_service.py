@@ -0,0 +1,251 @@
+import json
+import uuid
+import re
+import logging
+from typing import List, Dict, Optional, Any
+
+import httpx
+
+from app.config import settings
+from app.api.utils.http_client import PooledHttpClient, RETRYABLE_STATUS_CODES
+from app.services.base.gmail_rest_service import (
+    GmailRestServiceBase,
+    BatchRequest,
+    BatchResponse
+)
+
+logger = logging.getLogger(__name__)
+
+# Gmail limits
+MAX_BATCH_SUB_REQUESTS = 100
+MAX_IDS_PER_BATCH_MODIFY = 1000
+
+API_ROOT = "/gmail/v1/users/me"
+
+_BLANK_LINE = re.compile(rb"\r?\n\r?\n")
+_CONTENT_ID = re.compile(rb"content-id:\s*<response-item(\d+)>", re.IGNORECASE)
+
+
+class GmailRestService(GmailRestServiceBase):
+    """
+    Gmail REST API client over a shared keep-alive connection pool.
+    Many small operations are sent through the multipart /batch endpoint.
+    """
+
+    def __init__(self):
+        self.base_url = settings.GMAIL_API_BASE_URL.rstrip("/")
+        self.batch_size = min(settings.GMAIL_BATCH_SIZE, MAX_BATCH_SUB_REQUESTS)
+        self.http = PooledHttpClient(
+            timeout=settings.GMAIL_API_TIMEOUT,
+            retries=settings.GMAIL_API_RETRIES,
+            backoff=settings.OAUTH_HTTP_BACKOFF,
+        )
+
+    async def aclose(self):
+        """Close the shared HTTP client (app shutdown)"""
+        await self.http.aclose()
+
+    @staticmethod
+    def _headers(access_token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {access_token}"}
+
+    @staticmethod
+    def _error_detail(response: httpx.Response) -> str:
+        try:
+            return response.json().get("error", {}).get("message", response.text[:200])
+        except ValueError:
+            return response.text[:200] or str(response.status_code)
+
+    async def _call(self, access_token: str, method: str, path: str, body: Optional[Dict] = None) -> Any:
+        """Single REST call; raises ValueError with Gmail's error message on failure"""
+        response = await self.http.request(
+            method,
+            f"{self.base_url}{API_ROOT}{path}",
+            headers=self._headers(access_token),
+            json=body,
+        )
+        if response.status_code >= 400:
+            raise ValueError(self._error_detail(response))
+        return response.json() if response.content else None
+
+    # ------------------------------------------------------------------
+    # Multipart batch
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_batch(requests: List[BatchRequest], boundary: str) -> bytes:
+        parts = []
+        for i, request in enumerate(requests):
+            lines = [
+                f"--{boundary}",
+                "Content-Type: application/http",
+                f"Content-ID: <item{i}>",
+                "",
+                f"{request.method} {API_ROOT}{request.path} HTTP/1.1",
+            ]
+            if request.body is not None:
+                lines += ["Content-Type: application/json", "", json.dumps(request.body)]
+            else:
+                lines += [""]
+            parts.append("\r\n".join(lines))
+        parts.append(f"--{boundary}--\r\n")
+        return "\r\n".join(parts).encode("utf-8")
+
+    @staticmethod
+    def _decode_batch(response: httpx.Response, count: int) -> List[BatchResponse]:
+        """Split a multipart/mixed batch response into per-request results"""
+        match = re.search(r'boundary="?([^";]+)"?', response.headers.get("content-type", ""))
+        if not match:
+            raise ValueError("Batch response has no multipart boundary")
+        delimiter = b"--" + match.group(1).encode()
+
+        results: List[Optional[BatchResponse]] = [None] * count
+        for position, part in enumerate(response.content.split(delimiter)[1:]):
+            if part.startswith(b"--"):
+                break
+            pieces = _BLANK_LINE.split(part.strip(b"\r\n"), maxsplit=2)
+            if len(pieces) < 2:
+                continue
+            outer_headers, inner = pieces[0], pieces[1]
+            body = pieces[2] if len(pieces) > 2 else b""
+
+            status_line = inner.split(b"\n", 1)[0]
+            status = int(status_line.split()[1])
+            content_id = _CONTENT_ID.search(outer_headers)
+            index = int(content_id.group(1)) if content_id else position
+            try:
+                parsed = json.loads(body) if body.strip() else None
+            except ValueError:
+                parsed = body.decode("utf-8", errors="replace")
+            if 0 <= index < count:
+                results[index] = BatchResponse(status=status, body=parsed)
+
+        return [result or BatchResponse(status=500, body="Missing batch sub-response") for result in results]
+
+    async def _send_batch(self, access_token: str, requests: List[BatchRequest]) -> List[BatchResponse]:
+        boundary = f"batch_{uuid.uuid4().hex}"
+        response = await self.http.request(
+            "POST",
+            f"{self.base_url}/batch/gmail/v1",
+            headers={
+                **self._headers(access_token),
+                "Content-Type": f"multipart/mixed; boundary={boundary}",
+            },
+            content=self._encode_batch(requests, boundary),
+        )
+        if response.status_code >= 400:
+            raise ValueError(f"Gmail batch request failed: {self._error_detail(response)}")
+        return self._decode_batch(response, len(requests))
+
+    async def batch(self, access_token: str, requests: List[BatchRequest]) -> List[BatchResponse]:
+        """
+        Send sub-requests through Gmail's /batch endpoint.
+
+        Requests are grouped GMAIL_BATCH_SIZE (max 100) per HTTP call; sub-requests
+        rejected with 429/5xx are retried in a later batch with backoff.
+
+        Args:
+            access_token: OAuth access token
+            requests: Sub-requests (paths relative to /gmail/v1/users/me)
+
+        Returns:
+            BatchResponse per request, in request order
+        """
+        results: List[Optional[BatchResponse]] = [None] * len(requests)
+        pending = list(range(len(requests)))
+
+        for attempt in range(self.http.retries + 1):
+            retry = []
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                responses = await self._send_batch(access_token, [requests[i] for i in chunk])
+                for i, response in zip(chunk, responses):
+                    results[i] = response
+                    if response.status in RETRYABLE_STATUS_CODES:
+                        retry.append(i)
+
+            if not retry or attempt == self.http.retries:
+                break
+            logger.warning(f"Retrying {len(retry)} rate-limited/failed Gmail batch sub-requests")
+            pending = retry
+            await self.http.backoff_sleep(attempt)
+
+        return results
+
+    # ------------------------------------------------------------------
+    # Labels
+    # ------------------------------------------------------------------
+
+    async def list_labels(self, access_token: str) -> List[Dict[str, Any]]:
+        """List all labels of the mailbox"""
+        data = await self._call(access_token, "GET", "/labels")
+        return (data or {}).get("labels", [])
+
+    async def create_label(
+        self,
+        access_token: str,
+        label_name: str,
+        label_list_visibility: str = "labelShow",
+        message_list_visibility: str = "show"
+    ) -> Dict[str, Any]:
+        """Create a new label (labels.create)"""
+        try:
+            label_data = await self._call(access_token, "POST", "/labels", {
+                "name": label_name,
+                "labelListVisibility": label_list_visibility,
+                "messageListVisibility": message_list_visibility
+            })
+            logger.info(f"Successfully created label: {label_name} (ID: {label_data.get('id')})")
+            return label_data
+        except Exception as e:
+            logger.error(f"Failed to create label '{label_name}': {e}")
+            raise ValueError(f"Failed to create label: {str(e)}")
+
+    async def create_labels(self, access_token: str, labels: List[Dict[str, str]]) -> List[BatchResponse]:
+        """
+        Create several labels with batched labels.create calls.
+
+        Args:
+            access_token: OAuth access token
+            labels: Label resources ({"name", "labelListVisibility", "messageListVisibility"})
+
+        Returns:
+            BatchResponse per label (body is the created label or Gmail's error)
+        """
+        results = await self.batch(
+            access_token,
+            [BatchRequest(method="POST", path="/labels", body=label) for label in labels]
+        )
+        created = sum(1 for result in results if result.ok)
+        logger.info(f"Created {created}/{len(labels)} labels in batch")
+        return results
+
+    # ------------------------------------------------------------------
+    # Messages
+    # ------------------------------------------------------------------
+
+    async def batch_modify(
+        self,
+        access_token: str,
+        message_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None
+    ) -> None:
+        """Add/remove labels on many messages, 1000 ids per call (messages.batchModify)"""
+        for start in range(0, len(message_ids), MAX_IDS_PER_BATCH_MODIFY):
+            await self._call(access_token, "POST", "/messages/batchModify", {
+                "ids": message_ids[start:start + MAX_IDS_PER_BATCH_MODIFY],
+                "addLabelIds": add_label_ids or [],
+                "removeLabelIds": remove_label_ids or [],
+            })
+
+    async def batch_delete(self, access_token: str, message_ids: List[str]) -> None:
+        """Permanently delete many messages, 1000 ids per call (messages.batchDelete)"""
+        for start in range(0, len(message_ids), MAX_IDS_PER_BATCH_MODIFY):
+            await self._call(access_token, "POST", "/messages/batchDelete", {
+                "ids": message_ids[start:start + MAX_IDS_PER_BATCH_MODIFY],
+            })
+
+
+# Singleton instance
+gmail_rest_service = GmailRestService()
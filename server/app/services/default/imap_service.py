@@ -1,21 +1,26 @@
 from imapclient import IMAPClient
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator
 import logging
 import email
 import base64
-from email.header import decode_header
 from app.services.base.imap_service import (
     GmailImapServiceBase,
     EmailMessage,
-    FolderInfo
+    FolderInfo,
+    MailboxState
 )
-from app.api.utils.email_cleaner import EmailCleaner
+from app.api.utils.email_cleaner import EmailCleaner, HeaderBatchCleaner
+from app.services.workers.cleaned_body_cache import cleaned_body_cache
+from app.services.default.gmail_rest_service import gmail_rest_service
 from datetime import datetime, timezone
 from dataclasses import dataclass
-import httpx
 
 logger = logging.getLogger(__name__)
 
+# Message data for listing and syncing. BODY.PEEK[] leaves \Seen alone, where
+# RFC822 (like BODY[]) would mark every fetched message as read
+FETCH_MESSAGE_ITEMS = ['BODY.PEEK[]', 'FLAGS', 'ENVELOPE', 'X-GM-LABELS']
+
 class GmailImapService(GmailImapServiceBase):
     """
     Gmail IMAP service implementation using imapclient
@@ -144,6 +149,105 @@ class GmailImapService(GmailImapServiceBase):
             logger.error(f"Failed to list folders: {e}")
             raise
     
+    async def get_folder_state(self, folder: str = 'INBOX') -> MailboxState:
+        """
+        Get folder state with a single STATUS command (no SELECT needed).
+        HIGHESTMODSEQ (CONDSTORE) also changes on flag/label updates and expunges.
+        """
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        
+        try:
+            status = self.client.folder_status(
+                folder, ['UIDVALIDITY', 'UIDNEXT', 'HIGHESTMODSEQ', 'MESSAGES']
+            )
+        except Exception as e:
+            logger.debug(f"STATUS with HIGHESTMODSEQ failed for {folder}, retrying without: {e}")
+            status = self.client.folder_status(folder, ['UIDVALIDITY', 'UIDNEXT', 'MESSAGES'])
+        
+        highestmodseq = status.get(b'HIGHESTMODSEQ')
+        return MailboxState(
+            uidvalidity=int(status.get(b'UIDVALIDITY', 0)),
+            uidnext=int(status.get(b'UIDNEXT', 0)),
+            highestmodseq=int(highestmodseq) if highestmodseq is not None else None,
+            messages=int(status.get(b'MESSAGES', 0)),
+        )
+    
+    async def get_email_uids(
+        self,
+        folder: str = 'INBOX',
+        since_date: Optional[str] = None
+    ) -> List[int]:
+        """Select folder and return matching UIDs, most recent first"""
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        
+        # Read-only: listing and syncing must not change flags
+        self.client.select_folder(folder, readonly=True)
+        
+        # Build search criteria
+        if since_date:
+            try:
+                # Validate the date format is DD-MMM-YYYY
+                # datetime is already imported at the top of the file
+                datetime.strptime(since_date, '%d-%b-%Y')
+                # Use the date directly - no conversion needed
+                search_criteria = ['SINCE', since_date]
+            except ValueError as e:
+                logger.warning(f"Invalid date format '{since_date}': {e}. Using ALL instead.")
+                search_criteria = ['ALL']
+        else:
+            search_criteria = ['ALL']
+        
+        # Search for emails
+        search_results = self.client.search(search_criteria)
+        
+        # Convert SearchIds to list if needed
+        if hasattr(search_results, '__iter__') and not isinstance(search_results, (str, bytes)):
+            uids = list(search_results)
+        else:
+            uids = search_results if isinstance(search_results, list) else []
+        
+        # Reverse to get most recent first (IMAP returns UIDs in ascending order)
+        return list(reversed(uids))
+    
+    async def search_email_uids(self, query: str, folder: str = 'INBOX') -> List[int]:
+        """Select folder and return UIDs matching a Gmail search, most recent first"""
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        
+        self.client.select_folder(folder, readonly=True)
+        
+        # Gmail supports X-GM-RAW for advanced search
+        uids = self.client.search(['X-GM-RAW', f'"{query}"'])
+        return list(reversed(list(uids)))
+    
+    async def iter_emails_by_uid(
+        self,
+        uids: List[int],
+        chunk_size: int = 25
+    ) -> AsyncIterator[List[EmailMessage]]:
+        """
+        Fetch and parse messages of the selected folder in UID chunks.
+        Each chunk is yielded (sorted by date, most recent first) as soon as
+        it is parsed, so callers can stream results before the page is done.
+        """
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        
+        header_cleaner = HeaderBatchCleaner()
+        for i in range(0, len(uids), chunk_size):
+            chunk = uids[i:i + chunk_size]
+            messages = self.client.fetch(chunk, FETCH_MESSAGE_ITEMS)
+            email_list = await self._parse_emails(messages, header_cleaner)
+            email_list.sort(key=self._date_sort_key, reverse=True)
+            yield email_list
+    
+    @staticmethod
+    def _date_sort_key(email: EmailMessage) -> datetime:
+        """Get timezone-aware UTC datetime for sorting"""
+        return EmailCleaner.parse_email_date_to_utc(email.date)
+    
     async def fetch_emails(
         self,
         folder: str = 'INBOX',
@@ -155,63 +259,24 @@ class GmailImapService(GmailImapServiceBase):
             raise ValueError("Not connected to IMAP server")
         
         try:
-            # Select folder
-            self.client.select_folder(folder)
-            
-            # Build search criteria
-            if since_date:
-                try:
-                    # Validate the date format is DD-MMM-YYYY
-                    # datetime is already imported at the top of the file
-                    datetime.strptime(since_date, '%d-%b-%Y')
-                    # Use the date directly - no conversion needed
-                    search_criteria = ['SINCE', since_date]
-                except ValueError as e:
-                    logger.warning(f"Invalid date format '{since_date}': {e}. Using ALL instead.")
-                    search_criteria = ['ALL']
-            else:
-                search_criteria = ['ALL']
-            
-            # Search for emails
-            search_results = self.client.search(search_criteria)
-            
-            # Convert SearchIds to list if needed
-            if hasattr(search_results, '__iter__') and not isinstance(search_results, (str, bytes)):
-                uids = list(search_results)
-            else:
-                uids = search_results if isinstance(search_results, list) else []
+            uids = await self.get_email_uids(folder, since_date)
             
             # If no UIDs found, return empty list
             if not uids:
                 logger.info(f"No emails found in folder {folder}")
                 return []
             
-            # Reverse to get most recent first (IMAP returns UIDs in ascending order)
-            uids = list(reversed(uids))
-            
             # Limit results to most recent emails
             if len(uids) > limit:
                 uids = uids[:limit]
             
             # Fetch emails
-            messages = self.client.fetch(uids, ['RFC822', 'FLAGS', 'ENVELOPE','X-GM-LABELS'])
+            messages = self.client.fetch(uids, FETCH_MESSAGE_ITEMS)
             
-            email_list = []
-            for uid, data in messages.items():
-                try:
-                    email_msg = self._parse_email(uid, data)
-                    email_list.append(email_msg)
-                except Exception as e:
-                    logger.error(f"Failed to parse email {uid}: {e}")
-                    continue
-            
-            # Sort by date (most recent first) to ensure correct order
-            def get_date_sort_key(email: EmailMessage) -> datetime:
-                """Get timezone-aware UTC datetime for sorting"""
-                return EmailCleaner.parse_email_date_to_utc(email.date)
+            email_list = await self._parse_emails(messages)
             
             # Sort by date (most recent first - reverse=True)
-            email_list.sort(key=get_date_sort_key, reverse=True)
+            email_list.sort(key=self._date_sort_key, reverse=True)
             
             # Ensure we only return the top limit most recent
             return email_list[:limit]
@@ -220,6 +285,20 @@ class GmailImapService(GmailImapServiceBase):
             logger.error(f"Failed to fetch emails: {e}")
             raise
     
+    async def fetch_email(self, uid: int, folder: str = 'INBOX') -> Optional[EmailMessage]:
+        """Fetch one email by UID (None if the folder has no such message)"""
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        
+        # Read-only and BODY.PEEK[]: opening a message here doesn't mark it read
+        self.client.select_folder(folder, readonly=True)
+        messages = self.client.fetch([uid], FETCH_MESSAGE_ITEMS)
+        if uid not in messages:
+            return None
+        
+        emails = await self._parse_emails(messages)
+        return emails[0] if emails else None
+    
     async def search_emails(
         self,
         query: str,
@@ -231,8 +310,8 @@ class GmailImapService(GmailImapServiceBase):
             raise ValueError("Not connected to IMAP server")
         
         try:
-            # Select folder
-            self.client.select_folder(folder)
+            # Select folder (read-only: searching must not change flags)
+            self.client.select_folder(folder, readonly=True)
             
             # Gmail supports X-GM-RAW for advanced search
             # Format: X-GM-RAW "search query"
@@ -246,16 +325,9 @@ class GmailImapService(GmailImapServiceBase):
                 uids = uids[-limit:]
             
             # Fetch emails
-            messages = self.client.fetch(uids, ['RFC822', 'FLAGS', 'ENVELOPE','X-GM-LABELS'])
+            messages = self.client.fetch(uids, FETCH_MESSAGE_ITEMS)
             
-            email_list = []
-            for uid, data in messages.items():
-                try:
-                    email_msg = self._parse_email(uid, data)
-                    email_list.append(email_msg)
-                except Exception as e:
-                    logger.error(f"Failed to parse email {uid}: {e}")
-                    continue
+            email_list = await self._parse_emails(messages)
             
             return email_list
             
@@ -315,112 +387,114 @@ class GmailImapService(GmailImapServiceBase):
         Create a new label in Gmail using REST API
         Note: IMAP doesn't support creating labels, so we use Gmail REST API
         """
-        url = "https://gmail.googleapis.com/gmail/v1/users/me/labels"
+        return await gmail_rest_service.create_label(
+            access_token,
+            label_name,
+            label_list_visibility,
+            message_list_visibility
+        )
+    
+    async def get_gmail_message_ids(self, uids: List[int], folder: str = 'INBOX') -> Dict[int, str]:
+        """
+        Map IMAP UIDs to Gmail REST message ids with one FETCH.
+        X-GM-MSGID is the decimal form of the REST API's hex message id.
+        """
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        if not uids:
+            return {}
         
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
+        self.client.select_folder(folder, readonly=True)
+        response = self.client.fetch(uids, ['X-GM-MSGID'])
+        return {
+            uid: format(int(data[b'X-GM-MSGID']), 'x')
+            for uid, data in response.items()
+            if b'X-GM-MSGID' in data
         }
+    
+    async def get_message_labels(
+        self,
+        uids: List[int],
+        changed_since: Optional[int] = None
+    ) -> Dict[int, List[str]]:
+        """
+        Current labels of messages in the selected folder with one FETCH.
         
-        payload = {
-            "name": label_name,
-            "labelListVisibility": label_list_visibility,
-            "messageListVisibility": message_list_visibility
-        }
+        Args:
+            uids: Messages to check
+            changed_since: Only return messages whose flags/labels changed after
+                this MODSEQ (CHANGEDSINCE; implicitly enables CONDSTORE)
+        """
+        if not self.client:
+            raise ValueError("Not connected to IMAP server")
+        if not uids:
+            return {}
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                label_data = response.json()
-                
-                logger.info(f"Successfully created label: {label_name} (ID: {label_data.get('id')})")
-                return label_data
-                
-        except httpx.HTTPStatusError as e:
-            error_detail = "Unknown error"
+        modifiers = [f'CHANGEDSINCE {changed_since}'] if changed_since is not None else None
+        response = self.client.fetch(uids, ['X-GM-LABELS', 'FLAGS'], modifiers=modifiers)
+        return {uid: self._extract_labels(data) for uid, data in response.items()}
+    
+    async def _parse_emails(
+        self,
+        messages: Dict,
+        header_cleaner: Optional[HeaderBatchCleaner] = None
+    ) -> List[EmailMessage]:
+        """Parse a fetched page of IMAP messages, sharing header cleaning across it"""
+        if header_cleaner is None:
+            header_cleaner = HeaderBatchCleaner()
+        email_list = []
+        for uid, data in messages.items():
             try:
-                error_response = e.response.json()
-                error_detail = error_response.get("error", {}).get("message", str(e))
-            except:
-                error_detail = str(e)
-            
-            logger.error(f"Failed to create label '{label_name}': {error_detail}")
-            raise ValueError(f"Failed to create label: {error_detail}")
-        except Exception as e:
-            logger.error(f"Unexpected error creating label '{label_name}': {e}")
-            raise ValueError(f"Failed to create label: {str(e)}")
+                email_list.append(await self._parse_email(uid, data, header_cleaner))
+            except Exception as e:
+                logger.error(f"Failed to parse email {uid}: {e}")
+                continue
+        return email_list
     
-    def _parse_email(self, uid: int, data: Dict) -> EmailMessage:
+    async def _parse_email(
+        self,
+        uid: int,
+        data: Dict,
+        header_cleaner: Optional[HeaderBatchCleaner] = None
+    ) -> EmailMessage:
         """Parse IMAP email data into EmailMessage with cleaning"""
         try:
-            # Parse RFC822 message
-            msg_data = data[b'RFC822']
+            # Parse the full message (fetched as BODY.PEEK[], returned as BODY[])
+            msg_data = data[b'BODY[]']
             msg = email.message_from_bytes(msg_data)
             
-            # Decode and clean headers
-            raw_subject = self._decode_header(msg.get('Subject', ''))
-            subject = EmailCleaner.clean_subject(raw_subject)
-            
-            raw_from = self._decode_header(msg.get('From', ''))
-            from_addr = EmailCleaner.extract_email_address(raw_from)
-            
-            raw_to = [self._decode_header(addr) for addr in msg.get_all('To', [])]
-            to_addrs = [EmailCleaner.extract_email_address(addr) for addr in raw_to]
-            
-            raw_date = msg.get('Date', '')
-            date_str = EmailCleaner.clean_date(raw_date)
+            # Decode and clean headers (memoised across the page)
+            if header_cleaner is None:
+                header_cleaner = HeaderBatchCleaner()
+            headers = header_cleaner.clean(msg)
             
             # Extract thread identification headers
             message_id = msg.get('Message-ID', '').strip() or None
             in_reply_to = msg.get('In-Reply-To', '').strip() or None
             references = msg.get('References', '').strip() or None
             
-            # Extract body
-            body_text = None
-            body_html = None
+            # Extract raw body payloads
+            text_payload = None
+            html_payload = None
             
             if msg.is_multipart():
                 for part in msg.walk():
                     content_type = part.get_content_type()
-                    if content_type == 'text/plain' and not body_text:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            body_text = payload.decode('utf-8', errors='ignore')
-                            body_text = EmailCleaner.clean_body_text(body_text)
-                    elif content_type == 'text/html' and not body_html:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            body_html = payload.decode('utf-8', errors='ignore')
-                            body_html = EmailCleaner.clean_body_html(body_html)
+                    if content_type == 'text/plain' and not text_payload:
+                        text_payload = part.get_payload(decode=True)
+                    elif content_type == 'text/html' and not html_payload:
+                        html_payload = part.get_payload(decode=True)
             else:
-                content_type = msg.get_content_type()
                 payload = msg.get_payload(decode=True)
-                if payload:
-                    decoded = payload.decode('utf-8', errors='ignore')
-                    if content_type == 'text/html':
-                        body_html = EmailCleaner.clean_body_html(decoded)
-                    else:
-                        body_text = EmailCleaner.clean_body_text(decoded)
-            
-            flags = data.get(b'FLAGS', [])
-            raw_labels = [f.decode('utf-8') for f in flags if isinstance(f, bytes)]
-            labels = EmailCleaner.filter_system_labels(raw_labels)
-
-            gmail_labels = data.get(b'X-GM-LABELS', [])
-            flags = data.get(b'FLAGS', [])
-
-            if gmail_labels:
-                raw_labels = []
-                for label in gmail_labels:
-                    if isinstance(label, bytes):
-                        raw_labels.append(label.decode('utf-8'))
-                    else:
-                        raw_labels.append(str(label))
-            else:
-                raw_labels = [f.decode('utf-8') if isinstance(f, bytes) else str(f) for f in flags]
-
-            labels = EmailCleaner.filter_system_labels(raw_labels)
+                if msg.get_content_type() == 'text/html':
+                    html_payload = payload
+                else:
+                    text_payload = payload
+            
+            # Clean bodies and build preview (memoised by payload hash)
+            cleaned = await cleaned_body_cache.get_or_clean(text_payload, html_payload)
+            
+            labels = self._extract_labels(data)
             
             # Extract and clean attachments
             attachments = []
@@ -437,36 +511,38 @@ class GmailImapService(GmailImapServiceBase):
             
             return EmailMessage(
                 uid=uid,
-                subject=subject,
-                from_address=from_addr,
-                to_addresses=to_addrs,
-                date=date_str,
-                body_text=body_text,
-                body_html=body_html,
+                subject=headers.subject,
+                from_address=headers.from_address,
+                to_addresses=headers.to_addresses,
+                date=headers.date,
+                body_text=cleaned.body_text,
+                body_html=cleaned.body_html,
                 labels=labels,
                 attachments=attachments,
                 message_id=message_id,
                 in_reply_to=in_reply_to,
                 references=references,
+                preview=cleaned.preview,
             )
             
         except Exception as e:
             logger.error(f"Failed to parse email: {e}")
             raise
     
-    def _decode_header(self, header: str) -> str:
-        """Decode email header"""
-        if not header:
-            return ''
-        
-        try:
-            decoded_parts = decode_header(header)
-            decoded_str = ''
-            for part, encoding in decoded_parts:
-                if isinstance(part, bytes):
-                    decoded_str += part.decode(encoding or 'utf-8', errors='ignore')
+    @staticmethod
+    def _extract_labels(data: Dict) -> List[str]:
+        """User-facing labels of a fetched message (X-GM-LABELS, else FLAGS)"""
+        gmail_labels = data.get(b'X-GM-LABELS', [])
+        flags = data.get(b'FLAGS', [])
+
+        if gmail_labels:
+            raw_labels = []
+            for label in gmail_labels:
+                if isinstance(label, bytes):
+                    raw_labels.append(label.decode('utf-8'))
                 else:
-                    decoded_str += part
-            return decoded_str
-        except Exception:
-            return str(header)
\ No newline at end of file
+                    raw_labels.append(str(label))
+        else:
+            raw_labels = [f.decode('utf-8') if isinstance(f, bytes) else str(f) for f in flags]
+
+        return EmailCleaner.filter_system_labels(raw_labels)
@@ -0,0 +1,198 @@
+"""
+Gmail Account Cache Service
+Caches what request handlers need from a GmailAccount (id, owner, email,
+current access token and its expiry) so account resolution doesn't hit the
+database on every request.
+In-process TTL cache with a Redis tier (Database 1) shared across workers.
+"""
+
+import json
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import redis
+
+from app.api.utils.metrics import metrics
+from app.config import settings
+from app.enums.gmail import GmailAccountStatus
+from app.models.gmail_account import GmailAccount
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedAccount:
+    """Lightweight projection of a GmailAccount (no refresh token)"""
+    id: UUID
+    user_id: UUID
+    email_address: str
+    access_token: Optional[str]
+    token_expiry: datetime
+    status: GmailAccountStatus
+
+    @property
+    def needs_refresh(self) -> bool:
+        """Check if token needs refresh (within 2 minutes of expiry)"""
+        return self.token_expiry < datetime.now(timezone.utc) + timedelta(minutes=2)
+
+    @classmethod
+    def from_account(cls, account: GmailAccount) -> "CachedAccount":
+        return cls(
+            id=account.id,
+            user_id=account.user_id,
+            email_address=account.email_address,
+            access_token=account.get_access_token,
+            token_expiry=account.token_expiry,
+            status=GmailAccountStatus(account.status),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": str(self.id),
+            "user_id": str(self.user_id),
+            "email_address": self.email_address,
+            "access_token": self.access_token,
+            "token_expiry": self.token_expiry.isoformat(),
+            "status": self.status.value,
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> "CachedAccount":
+        raw = json.loads(data)
+        return cls(
+            id=UUID(raw["id"]),
+            user_id=UUID(raw["user_id"]),
+            email_address=raw["email_address"],
+            access_token=raw["access_token"],
+            token_expiry=datetime.fromisoformat(raw["token_expiry"]),
+            status=GmailAccountStatus(raw["status"]),
+        )
+
+
+class AccountCache:
+    """
+    Two-tier cache of CachedAccount entries keyed by account id.
+
+    Written through by GmailAccountRepository whenever tokens or status change
+    (OAuth callback, on-demand refresh, Celery refresh task), so the Redis tier
+    always holds the current access token. The in-process tier has a short TTL
+    to bound staleness in other workers. The Redis tier goes through the
+    process-wide async pool.
+    """
+
+    def __init__(
+        self,
+        local_ttl: float = settings.ACCOUNT_CACHE_LOCAL_TTL,
+        redis_ttl: int = settings.ACCOUNT_CACHE_REDIS_TTL,
+    ):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._entries: Dict[str, Tuple[CachedAccount, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _redis_key(account_id: str) -> str:
+        return f"account:{account_id}"
+
+    async def get(self, account_id: str, use_local: bool = True) -> Optional[CachedAccount]:
+        """
+        Get a cached account.
+
+        Args:
+            account_id: Gmail account UUID (as string)
+            use_local: Set False to read the shared Redis tier only
+                (e.g. to pick up a token refreshed by another process)
+
+        Returns:
+            CachedAccount, or None if neither tier has it
+        """
+        if use_local:
+            with self._lock:
+                entry = self._entries.get(account_id)
+                if entry is not None:
+                    if entry[1] >= time.monotonic():
+                        metrics.incr("account_cache.hits")
+                        return entry[0]
+                    del self._entries[account_id]
+
+        if redis_pool.client is not None:
+            try:
+                cached = await redis_pool.client.get(self._redis_key(account_id))
+                if cached:
+                    account = CachedAccount.from_json(cached)
+                    self._set_local(account_id, account)
+                    metrics.incr("account_cache.hits")
+                    metrics.incr("account_cache.redis_hits")
+                    return account
+            except (redis.RedisError, ValueError, KeyError) as e:
+                logger.debug(f"Account cache Redis read failed for {account_id}: {e}")
+
+        metrics.incr("account_cache.misses")
+        return None
+
+    def _set_local(self, account_id: str, account: CachedAccount):
+        with self._lock:
+            self._entries[account_id] = (account, time.monotonic() + self.local_ttl)
+
+    async def set(self, account: GmailAccount) -> CachedAccount:
+        """
+        Cache (or replace) an account after it was loaded or written.
+
+        Args:
+            account: GmailAccount model instance
+
+        Returns:
+            The cached projection
+        """
+        return (await self.set_many([account]))[0]
+
+    async def set_many(self, accounts: Iterable[GmailAccount]) -> List[CachedAccount]:
+        """
+        Cache (or replace) several accounts; the Redis tier is written in one
+        pipelined round trip.
+
+        Returns:
+            The cached projections, in order
+        """
+        entries = [CachedAccount.from_account(account) for account in accounts]
+        for cached in entries:
+            self._set_local(str(cached.id), cached)
+
+        if redis_pool.client is not None and entries:
+            now = datetime.now(timezone.utc)
+            pipe = redis_pool.client.pipeline(transaction=False)
+            for cached in entries:
+                # Never keep an entry past its token's expiry
+                ttl = min(self.redis_ttl, int((cached.token_expiry - now).total_seconds()))
+                if ttl > 0:
+                    pipe.setex(self._redis_key(str(cached.id)), ttl, cached.to_json())
+                else:
+                    pipe.delete(self._redis_key(str(cached.id)))
+            try:
+                await pipe.execute()
+            except redis.RedisError as e:
+                logger.debug(f"Account cache Redis write failed for {len(entries)} account(s): {e}")
+
+        return entries
+
+    async def invalidate(self, *account_ids: str):
+        """Drop accounts from both tiers (status change, disconnect)"""
+        with self._lock:
+            for account_id in account_ids:
+                self._entries.pop(account_id, None)
+
+        if redis_pool.client is not None and account_ids:
+            try:
+                await redis_pool.client.delete(*[self._redis_key(account_id) for account_id in account_ids])
+            except redis.RedisError as e:
+                logger.debug(f"Account cache Redis delete failed for {len(account_ids)} account(s): {e}")
+
+
+# Singleton instance
+account_cache = AccountCache()
@@ -0,0 +1,145 @@
+"""
+Auth Cache Service
+Caches verified JWT payloads and a lightweight projection of the token's user,
+keyed by a hash of the bearer token, so authenticating a request on hot routes
+is a dictionary lookup instead of a JWT verification plus a User query.
+"""
+
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from tortoise.signals import post_save, post_delete
+
+from app.api.utils.metrics import metrics
+from app.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Lightweight projection of the authenticated User"""
+    id: UUID
+    email: str
+    name: str
+    google_id: str
+    profile_picture: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            google_id=user.google_id,
+            profile_picture=user.profile_picture,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+class AuthCache:
+    """
+    Bounded LRU of (verified payload, CurrentUser) keyed by a token hash.
+
+    An entry never outlives its token (TTL capped by `exp`) and is dropped as
+    soon as the user record is saved or deleted in this process; other
+    processes pick up changes within AUTH_CACHE_TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.AUTH_CACHE_MAX_ENTRIES,
+        ttl: float = settings.AUTH_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], CurrentUser, float]]" = OrderedDict()
+        self._keys_by_user: Dict[UUID, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        metrics.register_gauge("auth_cache.entries", lambda: len(self._entries))
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], CurrentUser]]:
+        """
+        Get the cached payload and user for a bearer token.
+
+        Returns:
+            (payload, user), or None if not cached or expired
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.incr("auth_cache.misses")
+                return None
+            payload, user, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                metrics.incr("auth_cache.misses")
+                return None
+            self._entries.move_to_end(key)
+        metrics.incr("auth_cache.hits")
+        return payload, user
+
+    def set(self, token: str, payload: Dict[str, Any], user: CurrentUser):
+        """Cache a verified token; skipped if the token is about to expire"""
+        ttl = self.ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            ttl = min(ttl, float(exp) - time.time())
+        if ttl <= 0:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (payload, user, time.monotonic() + ttl)
+            self._keys_by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: UUID):
+        """Drop every cached token of a user"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def _remove(self, key: str):
+        """Remove an entry (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[1].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[1].id]
+
+
+# Singleton instance
+auth_cache = AuthCache()
+
+
+@post_save(User)
+async def _invalidate_on_user_save(sender, instance: User, created, using_db, update_fields):
+    auth_cache.invalidate_user(instance.id)
+
+
+@post_delete(User)
+async def _invalidate_on_user_delete(sender, instance: User, using_db):
+    auth_cache.invalidate_user(instance.id)
@@ -0,0 +1,204 @@
+"""
+Cleaned Body Cache Service
+Memoises cleaned email bodies and previews by a hash of the raw decoded payload.
+In-process LRU bounded by bytes, with an optional Redis tier (Database 1).
+"""
+
+import sys
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import redis
+
+from app.api.utils.email_cleaner import EmailCleaner
+from app.api.utils.metrics import metrics
+from app.config import settings
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CleanedBody:
+    """Cleaned text body, cleaned HTML body and preview of one message"""
+    body_text: Optional[str]
+    body_html: Optional[str]
+    preview: str
+
+    @property
+    def size(self) -> int:
+        """Approximate in-memory footprint in bytes"""
+        return (
+            sys.getsizeof(self.body_text)
+            + sys.getsizeof(self.body_html)
+            + sys.getsizeof(self.preview)
+        )
+
+
+class CleanedBodyCache:
+    """
+    Content-addressed cache of cleaned email bodies.
+
+    The key is a BLAKE2b digest of the raw decoded text/plain and text/html
+    payloads, so identical bulk mail across users and folders is cleaned once.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = settings.BODY_CACHE_MAX_BYTES,
+        redis_enabled: bool = settings.BODY_CACHE_REDIS_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CleanedBody]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Shared tier on the process-wide async pool (skipped while it is not open)
+        self.redis_enabled = redis_enabled
+
+        metrics.register_gauge("body_cache.hit_ratio", self.hit_ratio)
+        metrics.register_gauge("body_cache.entries", lambda: len(self._entries))
+        metrics.register_gauge("body_cache.bytes", lambda: self._bytes)
+
+    @staticmethod
+    def _hash(text_payload: Optional[bytes], html_payload: Optional[bytes]) -> str:
+        """Fast content hash of the raw decoded payloads"""
+        digest = hashlib.blake2b(digest_size=16)
+        if text_payload:
+            digest.update(b"t")
+            digest.update(text_payload)
+        if html_payload:
+            digest.update(b"h")
+            digest.update(html_payload)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"body:clean:{key}"
+
+    # ------------------------------------------------------------------
+    # In-process LRU
+    # ------------------------------------------------------------------
+
+    def _get_local(self, key: str) -> Optional[CleanedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put_local(self, key: str, entry: CleanedBody):
+        size = entry.size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                metrics.incr("body_cache.evictions")
+
+    # ------------------------------------------------------------------
+    # Redis tier
+    # ------------------------------------------------------------------
+
+    async def _get_redis(self, key: str) -> Optional[CleanedBody]:
+        try:
+            cached = await redis_pool.client.get(self._redis_key(key))
+            if not cached:
+                return None
+            body_text, body_html, preview = json.loads(cached)
+            return CleanedBody(body_text=body_text, body_html=body_html, preview=preview)
+        except (redis.RedisError, ValueError) as e:
+            logger.debug(f"Cleaned body cache Redis read failed: {e}")
+            return None
+
+    async def _put_redis(self, key: str, entry: CleanedBody):
+        try:
+            await redis_pool.client.setex(
+                self._redis_key(key),
+                settings.BODY_CACHE_REDIS_TTL,
+                json.dumps([entry.body_text, entry.body_html, entry.preview]),
+            )
+        except redis.RedisError as e:
+            logger.debug(f"Cleaned body cache Redis write failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get_or_clean(
+        self,
+        text_payload: Optional[bytes],
+        html_payload: Optional[bytes],
+    ) -> CleanedBody:
+        """
+        Return cleaned text, HTML and preview for the raw decoded payloads.
+
+        Args:
+            text_payload: Decoded text/plain part bytes (or None)
+            html_payload: Decoded text/html part bytes (or None)
+
+        Returns:
+            CleanedBody, from cache when the same payload was cleaned before
+        """
+        raw_size = len(text_payload or b"") + len(html_payload or b"")
+        key = self._hash(text_payload, html_payload)
+
+        entry = self._get_local(key)
+        if entry is not None:
+            metrics.incr("body_cache.hits")
+            metrics.incr("body_cache.bytes_saved", raw_size)
+            return entry
+
+        # Only large bodies are worth a Redis round trip
+        use_redis = (
+            self.redis_enabled
+            and redis_pool.client is not None
+            and raw_size >= settings.BODY_CACHE_REDIS_MIN_BYTES
+        )
+        if use_redis:
+            entry = await self._get_redis(key)
+            if entry is not None:
+                metrics.incr("body_cache.hits")
+                metrics.incr("body_cache.redis_hits")
+                metrics.incr("body_cache.bytes_saved", raw_size)
+                self._put_local(key, entry)
+                return entry
+
+        metrics.incr("body_cache.misses")
+        entry = self.clean(text_payload, html_payload)
+        self._put_local(key, entry)
+        if use_redis:
+            await self._put_redis(key, entry)
+        return entry
+
+    @staticmethod
+    def clean(text_payload: Optional[bytes], html_payload: Optional[bytes]) -> CleanedBody:
+        """Decode and clean the payloads without touching the cache"""
+        body_text = None
+        body_html = None
+        if text_payload:
+            body_text = EmailCleaner.clean_body_text(text_payload.decode('utf-8', errors='ignore'))
+        if html_payload:
+            body_html = EmailCleaner.clean_body_html(html_payload.decode('utf-8', errors='ignore'))
+        preview = EmailCleaner.clean_email_preview(body_text, body_html)
+        return CleanedBody(body_text=body_text, body_html=body_html, preview=preview)
+
+    def hit_ratio(self) -> float:
+        """Share of lookups answered from either tier"""
+        hits = metrics.get("body_cache.hits")
+        total = hits + metrics.get("body_cache.misses")
+        return round(hits / total, 4) if total else 0.0
+
+
+# Singleton instance
+cleaned_body_cache = CleanedBodyCache()
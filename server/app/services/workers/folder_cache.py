@@ -0,0 +1,264 @@
+"""
+Folder Cache Service
+Read-through, stale-while-revalidate cache of an account's folder/label list,
+shared by the folders route and label suggestions. Listings live in the
+mailbox store (also written by the background sync) and every listing made
+here or by the sync refreshes the label cache as well.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import anyio
+import redis
+
+from app.api.utils.metrics import metrics
+from app.config import settings
+from app.services.default.imap_service import GmailImapService
+from app.services.workers.account_cache import CachedAccount
+from app.services.workers.mailbox_store import mailbox_store
+from app.services.workers.redis_label_cache import RedisLabelCache
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class FolderCache:
+    """
+    Folder list ([{"name", "flags"}]) per account, by age of the stored listing:
+    - up to MAILBOX_SYNC_MAX_AGE: served as is
+    - up to FOLDER_CACHE_MAX_STALE: served as is, and one background IMAP LIST
+      refreshes it (skipped while another process holds the fill lock)
+    - older or missing: listed before answering. Concurrent misses share one
+      in-flight future per process and one SET NX lock `lock:folders:{id}`
+      across processes; callers that lose the race wait for the winner's listing
+
+    The IMAP client blocks, so each listing (connect, LIST, logout) runs in a
+    worker thread and never stalls the API event loop.
+
+    Listings run in the API process without the mailbox sync lease: a LIST on
+    its own connection selects no folder and only replaces the stored listing
+    (which the sync overwrites the same way), so it cannot corrupt a sync in
+    progress; it just adds one short IMAP session next to it.
+    """
+
+    def __init__(
+        self,
+        fresh_ttl: float = settings.MAILBOX_SYNC_MAX_AGE,
+        max_stale: float = settings.FOLDER_CACHE_MAX_STALE,
+        lock_ttl: int = settings.FOLDER_CACHE_LOCK_TTL,
+    ):
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.lock_ttl = lock_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._revalidating: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _lock_key(account_id: str) -> str:
+        return f"lock:folders:{account_id}"
+
+    # ------------------------------------------------------------------
+    # Fill lock
+    # ------------------------------------------------------------------
+
+    async def _acquire_lock(self, account_id: str) -> Optional[str]:
+        """Lock token, or None if another process is listing the account's folders"""
+        token = uuid.uuid4().hex
+        if redis_pool.client is None:
+            return token
+        try:
+            if await redis_pool.client.set(self._lock_key(account_id), token, nx=True, ex=self.lock_ttl):
+                return token
+            return None
+        except redis.RedisError as e:
+            logger.warning(f"Folder list lock unavailable for {account_id}: {e}")
+            return token
+
+    async def _release_lock(self, account_id: str, token: str):
+        if redis_pool.client is None:
+            return
+        try:
+            await redis_pool.client.eval(_RELEASE_SCRIPT, 1, self._lock_key(account_id), token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release folder list lock for {account_id}: {e}")
+
+    async def _lock_held(self, account_id: str) -> bool:
+        if redis_pool.client is None:
+            return False
+        try:
+            return bool(await redis_pool.client.exists(self._lock_key(account_id)))
+        except redis.RedisError:
+            return False
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get_folders(
+        self,
+        account: CachedAccount,
+        label_cache: Optional[RedisLabelCache] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Folder list of an account, listed through IMAP only on a miss.
+
+        Args:
+            account: Account with a valid access token (used for the IMAP LIST)
+            label_cache: Label cache to refresh with new listings (request-scoped one)
+
+        Returns:
+            [{"name", "flags"}]
+        """
+        account_id = str(account.id)
+        entry = await mailbox_store.get_folder_list_entry(account_id)
+        if entry is not None:
+            folders, listed_at = entry
+            age = time.time() - listed_at
+            if age <= self.fresh_ttl:
+                metrics.incr("folder_cache.fresh")
+                return folders
+            if age <= self.max_stale:
+                metrics.incr("folder_cache.stale")
+                self._revalidate(account, label_cache)
+                return folders
+
+        metrics.incr("folder_cache.misses")
+        future = self._inflight.get(account_id)
+        if future is not None:
+            metrics.incr("folder_cache.coalesced")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[account_id] = future
+        try:
+            folders = await self._fill(account, label_cache)
+            future.set_result(folders)
+            return folders
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure isn't logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(account_id, None)
+
+    async def get_labels(self, account: CachedAccount, label_cache: RedisLabelCache) -> List[str]:
+        """
+        Label names of an account: the label cache (in-process L1, then Redis),
+        read through the folder list when it holds nothing. Never raises.
+        """
+        labels = await label_cache.get_labels(str(account.id))
+        if labels:
+            return labels
+        try:
+            return [folder["name"] for folder in await self.get_folders(account, label_cache)]
+        except Exception as e:
+            logger.warning(f"Could not list labels for account {account.id}: {e}")
+            return []
+
+    # ------------------------------------------------------------------
+    # Fills
+    # ------------------------------------------------------------------
+
+    async def put(
+        self,
+        account_id: str,
+        folders: List[Dict[str, Any]],
+        label_cache: Optional[RedisLabelCache] = None
+    ):
+        """Store a fresh listing (folders route, background sync) and its label names"""
+        if redis_pool.client is not None:
+            try:
+                await mailbox_store.set_folder_list(account_id, folders)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to store folder list for {account_id}: {e}")
+        await (label_cache or RedisLabelCache()).set_labels(account_id, [folder["name"] for folder in folders])
+
+    async def _fill(self, account: CachedAccount, label_cache: Optional[RedisLabelCache]) -> List[Dict[str, Any]]:
+        account_id = str(account.id)
+        token = await self._acquire_lock(account_id)
+        if token is None:
+            # Another process is listing: wait for its result, then list ourselves
+            metrics.incr("folder_cache.lock_waits")
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.FOLDER_CACHE_POLL_INTERVAL)
+                entry = await mailbox_store.get_folder_list_entry(account_id)
+                if entry is not None and time.time() - entry[1] <= self.fresh_ttl:
+                    return entry[0]
+                if not await self._lock_held(account_id):
+                    break
+            token = await self._acquire_lock(account_id)
+        try:
+            return await self._list(account, label_cache)
+        finally:
+            if token is not None:
+                await self._release_lock(account_id, token)
+
+    async def _list(self, account: CachedAccount, label_cache: Optional[RedisLabelCache]) -> List[Dict[str, Any]]:
+        """IMAP LIST, written through to the store and the label cache"""
+        if not account.access_token:
+            raise ValueError("No access token available")
+
+        folders = await anyio.to_thread.run_sync(_list_folders, account.access_token, account.email_address)
+        metrics.incr("folder_cache.listings")
+        await self.put(str(account.id), folders, label_cache)
+        return folders
+
+    def _revalidate(self, account: CachedAccount, label_cache: Optional[RedisLabelCache]):
+        """Refresh a stale listing in the background (at most one per account and process)"""
+        account_id = str(account.id)
+        task = self._revalidating.get(account_id)
+        if task is not None and not task.done():
+            return
+        self._revalidating[account_id] = asyncio.create_task(self._refresh(account, label_cache))
+
+    async def _refresh(self, account: CachedAccount, label_cache: Optional[RedisLabelCache]):
+        account_id = str(account.id)
+        try:
+            token = await self._acquire_lock(account_id)
+            if token is None:
+                return
+            try:
+                await self._list(account, label_cache)
+                logger.debug(f"Revalidated folder list for account {account_id}")
+            finally:
+                await self._release_lock(account_id, token)
+        except Exception as e:
+            logger.warning(f"Background folder list refresh failed for {account_id}: {e}")
+        finally:
+            self._revalidating.pop(account_id, None)
+
+
+def _list_folders(access_token: str, email_address: str) -> List[Dict[str, Any]]:
+    """Connect, LIST and log out. Blocks on IMAP: call it from a worker thread"""
+
+    async def list_folders() -> List[Dict[str, Any]]:
+        imap_service = GmailImapService()
+        try:
+            await imap_service.connect(access_token, email_address)
+            return [{"name": f.name, "flags": f.flags} for f in await imap_service.list_folders()]
+        finally:
+            await imap_service.disconnect()
+
+    # GmailImapService wraps the blocking client in coroutines; drive them on this thread's own loop
+    return asyncio.run(list_folders())
+
+
+# Singleton instance
+folder_cache = FolderCache()
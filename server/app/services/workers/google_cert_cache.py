@@ -0,0 +1,162 @@
+"""
+Google Certificate Cache Service
+Keeps Google's ID-token signing certificates in memory, honouring the
+Cache-Control max-age of the certs endpoint and refreshing them in the
+background before they expire, so ID tokens are verified locally without
+fetching certificates (or blocking the event loop) on login.
+"""
+
+import re
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+from google.auth import jwt as google_jwt
+from google.auth.exceptions import GoogleAuthError
+
+from app.api.utils.http_client import PooledHttpClient
+from app.api.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+# Used when the certs response carries no max-age
+_DEFAULT_MAX_AGE = 3600
+
+
+class GoogleCertCache:
+    """
+    In-memory cache of Google's signing certificates (kid -> PEM).
+
+    - Fetched over the shared async HTTP client; concurrent fetches coalesce
+    - A background task refreshes them GOOGLE_CERTS_REFRESH_MARGIN seconds
+      before max-age runs out, at most once per GOOGLE_CERTS_MIN_REFRESH_INTERVAL
+    - An unknown `kid` (key rotation) forces one early refresh, rate-limited
+    """
+
+    def __init__(self, certs_url: str = settings.GOOGLE_CERTS_URI):
+        self.certs_url = certs_url
+        self.http = PooledHttpClient(timeout=10, retries=2)
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_forced_refresh = 0.0
+        self._fetching: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    async def _fetch(self) -> Dict[str, str]:
+        response = await self.http.request("GET", self.certs_url)
+        response.raise_for_status()
+        certs = response.json()
+
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else _DEFAULT_MAX_AGE
+
+        self._certs = certs
+        self._expires_at = time.monotonic() + max_age
+        metrics.incr("google_certs.fetches")
+        logger.info(f"Fetched {len(certs)} Google signing certificates (max-age {max_age}s)")
+        return certs
+
+    async def refresh(self) -> Dict[str, str]:
+        """Fetch the certificates now; concurrent callers share one request"""
+        if self._fetching is None or self._fetching.done():
+            self._fetching = asyncio.create_task(self._fetch())
+        return await asyncio.shield(self._fetching)
+
+    async def get_certs(self, key_id: Optional[str] = None) -> Mapping[str, str]:
+        """
+        Current certificates, fetched only if missing, expired or lacking key_id.
+
+        Args:
+            key_id: `kid` from the token header
+        """
+        if not self._certs or time.monotonic() >= self._expires_at:
+            return await self.refresh()
+
+        if key_id and key_id not in self._certs:
+            # Google rotated its keys before our copy expired
+            now = time.monotonic()
+            if now - self._last_forced_refresh >= settings.GOOGLE_CERTS_MIN_REFRESH_INTERVAL:
+                self._last_forced_refresh = now
+                return await self.refresh()
+
+        metrics.incr("google_certs.hits")
+        return self._certs
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                if self._certs:
+                    # A max-age within the margin would give no delay at all and spin the loop
+                    delay = self._expires_at - time.monotonic() - settings.GOOGLE_CERTS_REFRESH_MARGIN
+                    await asyncio.sleep(max(delay, settings.GOOGLE_CERTS_MIN_REFRESH_INTERVAL))
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Background refresh of Google certificates failed: {e}")
+                await asyncio.sleep(60)
+
+    def start(self):
+        """Start the background refresh task (app startup)"""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the background refresh task and close the HTTP client (app shutdown)"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+        await self.http.aclose()
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    async def verify_oauth2_token(
+        self,
+        token: str,
+        audience: Optional[str],
+        clock_skew_in_seconds: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Verify a Google ID token locally against the cached certificates.
+        Drop-in for google.oauth2.id_token.verify_oauth2_token.
+
+        Raises:
+            GoogleAuthError: If the issuer is invalid
+            ValueError: If token verification fails
+        """
+        key_id = google_jwt.decode_header(token).get("kid")
+        certs = await self.get_certs(key_id)
+        idinfo = google_jwt.decode(
+            token,
+            certs=certs,
+            audience=audience,
+            clock_skew_in_seconds=clock_skew_in_seconds
+        )
+
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise GoogleAuthError(f"Wrong issuer. 'iss' should be one of the following: {list(GOOGLE_ISSUERS)}")
+        return idinfo
+
+
+# Singleton instance
+google_cert_cache = GoogleCertCache()
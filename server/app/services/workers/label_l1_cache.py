@@ -0,0 +1,167 @@
+"""
+Label L1 Cache Service
+In-process cache in front of the Redis label cache, so reading an account's
+labels on hot routes (label suggestions) is a dictionary lookup. Every write
+to the Redis label cache publishes the account on a pub/sub channel and each
+process drops its copy when the message arrives, keeping the API workers
+coherent; a short TTL bounds staleness if a message is ever lost.
+"""
+
+import time
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from app.api.utils.metrics import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "labels:invalidate"
+
+
+class LabelL1Cache:
+    """
+    Bounded LRU of account id -> (labels, lowercased name -> display name).
+
+    Only used while this process is subscribed to INVALIDATION_CHANNEL
+    (start() in the app lifespan); without the subscription every read goes
+    to Redis. Whenever the subscription is (re)established the cache is
+    cleared, since invalidations may have been missed while it was down.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.LABEL_L1_MAX_ENTRIES,
+        ttl: float = settings.LABEL_L1_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[List[str], Dict[str, str], float]]" = OrderedDict()
+        # Bumped by every invalidation; a fill that raced one is dropped
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+
+        metrics.register_gauge("label_l1.entries", lambda: len(self._entries))
+
+    @property
+    def enabled(self) -> bool:
+        return self._subscribed
+
+    @property
+    def generation(self) -> int:
+        """Token to pass to set(): read it before loading from Redis"""
+        return self._generation
+
+    def get(self, account_id: str) -> Optional[Tuple[List[str], Dict[str, str]]]:
+        """
+        Cached (labels, index) for an account.
+
+        Returns:
+            (labels, index), or None if not cached, expired or not subscribed
+        """
+        if not self._subscribed:
+            return None
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None:
+                metrics.incr("label_l1.misses")
+                return None
+            labels, index, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[account_id]
+                metrics.incr("label_l1.misses")
+                return None
+            self._entries.move_to_end(account_id)
+        metrics.incr("label_l1.hits")
+        return labels, index
+
+    def set(self, account_id: str, labels: List[str], index: Dict[str, str], generation: int):
+        """Cache labels loaded from Redis, unless an invalidation arrived since `generation`"""
+        if not self._subscribed:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[account_id] = (labels, index, time.monotonic() + self.ttl)
+            self._entries.move_to_end(account_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, account_ids: Iterable[str]):
+        """Drop cached labels of accounts (local write or invalidation message)"""
+        with self._lock:
+            self._generation += 1
+            for account_id in account_ids:
+                self._entries.pop(account_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    @staticmethod
+    def encode(account_ids: Iterable[str]) -> str:
+        """Invalidation message payload for accounts"""
+        return " ".join(account_ids)
+
+    # ------------------------------------------------------------------
+    # Subscription
+    # ------------------------------------------------------------------
+
+    async def _listen(self, client: aioredis.Redis):
+        backoff = 1
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.clear()
+                self._subscribed = True
+                backoff = 1
+                logger.info(f"Label L1 cache subscribed to {INVALIDATION_CHANNEL}")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.invalidate(message["data"].split())
+            except asyncio.CancelledError:
+                raise
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"Label invalidation subscription lost, L1 cache bypassed: {e}")
+            finally:
+                self._subscribed = False
+                self.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def start(self, client: Optional[aioredis.Redis]):
+        """Subscribe to label invalidations on the running loop (app startup)"""
+        if client is None:
+            logger.warning("Label L1 cache disabled: no Redis client")
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(client))
+
+    async def stop(self):
+        """Unsubscribe and stop using the cache (app shutdown)"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+# Singleton instance
+label_l1_cache = LabelL1Cache()
@@ -0,0 +1,71 @@
+"""
+Mailbox State Cache
+Short-lived in-process cache of IMAP folder state (STATUS) and folder-list
+versions, so conditional GETs on unchanged mailboxes can be answered without
+opening an IMAP connection.
+"""
+
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.base.imap_service import MailboxState
+
+
+class MailboxStateCache:
+    """
+    In-process TTL cache keyed by (account_id, folder).
+
+    Entries are written after every STATUS/LIST the routes perform and
+    dropped whenever the API itself changes the mailbox.
+    """
+
+    def __init__(self, ttl: float = settings.MAILBOX_STATE_TTL):
+        self.ttl = ttl
+        self._states: Dict[Tuple[str, str], Tuple[MailboxState, float]] = {}
+        self._folder_versions: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_state(self, account_id: str, folder: str) -> Optional[MailboxState]:
+        """Cached folder state, or None if missing/expired"""
+        with self._lock:
+            entry = self._states.get((account_id, folder))
+            if entry is None:
+                return None
+            state, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._states[(account_id, folder)]
+                return None
+            return state
+
+    def set_state(self, account_id: str, folder: str, state: MailboxState):
+        with self._lock:
+            self._states[(account_id, folder)] = (state, time.monotonic() + self.ttl)
+
+    def get_folders_version(self, account_id: str) -> Optional[str]:
+        """Cached content version of the folder list, or None if missing/expired"""
+        with self._lock:
+            entry = self._folder_versions.get(account_id)
+            if entry is None:
+                return None
+            version, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._folder_versions[account_id]
+                return None
+            return version
+
+    def set_folders_version(self, account_id: str, version: str):
+        with self._lock:
+            self._folder_versions[account_id] = (version, time.monotonic() + self.ttl)
+
+    def invalidate(self, account_id: str):
+        """Drop all cached state for an account (after labels/messages change)"""
+        with self._lock:
+            for key in [key for key in self._states if key[0] == account_id]:
+                del self._states[key]
+            self._folder_versions.pop(account_id, None)
+
+
+# Singleton instance
+mailbox_state_cache = MailboxStateCache()
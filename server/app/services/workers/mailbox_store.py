@@ -0,0 +1,389 @@
+"""
+Mailbox Store Service
+Server-side copy of each active account's folder list and most recent
+messages, kept warm by the Celery mailbox sync tasks (Redis Database 1), so
+list requests read pre-synced data instead of doing IMAP work inline.
+"""
+
+import json
+import time
+import uuid
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import redis
+
+from app.api.utils.email_cleaner import EmailCleaner
+from app.config import settings
+from app.services.base.imap_service import EmailMessage, MailboxState
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Delete the lease only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Push back the lease's expiry only if we still own it
+_EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# One round trip for a page read: nil unless the folder is synced, fresh
+# (synced at or after ARGV[2], not stale) and holds the first ARGV[1] messages;
+# otherwise {state, messages of the ARGV[1] highest UIDs}
+_PAGE_SCRIPT = """
+local state = redis.call("hgetall", KEYS[1])
+if #state == 0 then
+    return false
+end
+local fields = {}
+for i = 1, #state, 2 do
+    fields[state[i]] = state[i + 1]
+end
+local synced_at = tonumber(fields["synced_at"])
+if synced_at < tonumber(ARGV[2]) or tonumber(fields["stale_at"] or "0") >= synced_at then
+    return false
+end
+local needed = tonumber(ARGV[1])
+local stored = redis.call("zcard", KEYS[2])
+if needed > stored and stored < tonumber(fields["messages"]) then
+    return false
+end
+local uids = redis.call("zrevrange", KEYS[2], 0, needed - 1)
+local messages = {}
+if #uids > 0 then
+    messages = redis.call("hmget", KEYS[3], unpack(uids))
+end
+return {state, messages}
+"""
+
+# Stamp stale_at on every synced folder of an account, and age its folder list
+# to ARGV[3] (just past fresh) so it is served stale while it is revalidated
+_MARK_STALE_SCRIPT = """
+for _, folder in ipairs(redis.call("smembers", KEYS[1])) do
+    redis.call("hset", ARGV[1] .. folder, "stale_at", ARGV[2])
+end
+local listed_at = tonumber(redis.call("hget", KEYS[2], "synced_at"))
+if listed_at and listed_at > tonumber(ARGV[3]) then
+    redis.call("hset", KEYS[2], "synced_at", ARGV[3])
+end
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class SyncedFolder:
+    """Folder state as of the last completed sync"""
+    state: MailboxState
+    # When `state` was read from the server
+    synced_at: float
+    # Last time the API changed the mailbox (0 if never)
+    stale_at: float
+
+    @property
+    def stale(self) -> bool:
+        """Changed by the API after the snapshot; reads fall back to IMAP until the next sync"""
+        return self.stale_at >= self.synced_at
+
+
+@dataclass(frozen=True)
+class StoredPage:
+    """A page of emails served from the store"""
+    state: MailboxState
+    emails: List[EmailMessage]
+    total: int
+
+
+class MailboxStore:
+    """
+    Per account:
+    - `mailbox:{id}:folders`            folder list (HASH: `folders` JSON, `synced_at`)
+    - `mailbox:{id}:state:{folder}`     SyncedFolder (HASH)
+    - `mailbox:{id}:uids:{folder}`      synced UIDs (ZSET scored by UID)
+    - `mailbox:{id}:messages:{folder}`  UID -> EmailMessage JSON (HASH)
+
+    Only the MAILBOX_SYNC_WINDOW most recent messages of each synced folder are
+    kept; everything expires MAILBOX_STORE_TTL after the last sync.
+
+    Data and sync leases go through the process-wide async pool (API reads
+    are one round trip each).
+    """
+
+    def __init__(self, ttl: int = settings.MAILBOX_STORE_TTL):
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        """No sync runs without Redis"""
+        return redis_pool.client is not None
+
+    @staticmethod
+    def _key(account_id: str, kind: str, folder: Optional[str] = None) -> str:
+        return f"mailbox:{account_id}:{kind}" + (f":{folder}" if folder is not None else "")
+
+    def _folder_keys(self, account_id: str, folder: str) -> List[str]:
+        return [self._key(account_id, kind, folder) for kind in ("state", "uids", "messages")]
+
+    # ------------------------------------------------------------------
+    # Reads (API)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_folder(raw: Dict[str, str]) -> SyncedFolder:
+        return SyncedFolder(
+            state=MailboxState(
+                uidvalidity=int(raw["uidvalidity"]),
+                uidnext=int(raw["uidnext"]),
+                highestmodseq=int(raw["highestmodseq"]) if raw.get("highestmodseq") else None,
+                messages=int(raw["messages"]),
+            ),
+            synced_at=float(raw["synced_at"]),
+            stale_at=float(raw.get("stale_at") or 0),
+        )
+
+    async def get_folder_list(
+        self,
+        account_id: str,
+        max_age: float = settings.MAILBOX_SYNC_MAX_AGE
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Synced folder list ([{"name", "flags"}]), or None if missing or stale"""
+        entry = await self.get_folder_list_entry(account_id)
+        if entry is None or time.time() - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    async def get_folder_list_entry(self, account_id: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Stored folder list with the time it was listed, whatever its age"""
+        if redis_pool.client is None:
+            return None
+        try:
+            folders, synced_at = await redis_pool.client.hmget(self._key(account_id, "folders"), "folders", "synced_at")
+            if not folders or not synced_at:
+                return None
+            return json.loads(folders), float(synced_at)
+        except (redis.RedisError, ValueError, KeyError) as e:
+            logger.debug(f"Mailbox store folder read failed for {account_id}: {e}")
+            return None
+
+    async def get_folder(self, account_id: str, folder: str) -> Optional[SyncedFolder]:
+        """State of a folder as of its last completed sync"""
+        if redis_pool.client is None:
+            return None
+        try:
+            raw = await redis_pool.client.hgetall(self._key(account_id, "state", folder))
+        except redis.RedisError as e:
+            logger.debug(f"Mailbox store state read failed for {account_id}/{folder}: {e}")
+            return None
+        if not raw:
+            return None
+        return self._parse_folder(raw)
+
+    async def get_page(
+        self,
+        account_id: str,
+        folder: str,
+        offset: int,
+        limit: int,
+        max_age: float = settings.MAILBOX_SYNC_MAX_AGE
+    ) -> Optional[StoredPage]:
+        """
+        A page of the folder (most recent first, like fetch_emails), or None when
+        the store can't answer it: not synced, stale, or beyond the synced window.
+        """
+        if redis_pool.client is None:
+            return None
+        try:
+            result = await redis_pool.client.eval(
+                _PAGE_SCRIPT, 3, *self._folder_keys(account_id, folder), offset + limit, time.time() - max_age
+            )
+        except redis.RedisError as e:
+            logger.debug(f"Mailbox store page read failed for {account_id}/{folder}: {e}")
+            return None
+        if not result:
+            return None
+
+        state, raw = result
+        if any(item is None for item in raw):
+            return None
+        synced = self._parse_folder(dict(zip(state[::2], state[1::2])))
+
+        emails = [EmailMessage(**json.loads(item)) for item in raw]
+        # Same ordering as GmailImapService.fetch_emails: newest UIDs, sorted by date
+        emails.sort(key=lambda e: EmailCleaner.parse_email_date_to_utc(e.date), reverse=True)
+        return StoredPage(state=synced.state, emails=emails[offset:offset + limit], total=synced.state.messages)
+
+    async def get_message(
+        self,
+        account_id: str,
+        folder: str,
+        uid: int,
+        max_age: float = settings.MAILBOX_SYNC_MAX_AGE
+    ) -> Optional[EmailMessage]:
+        """
+        One stored message (body included), or None when the store can't answer
+        for it: folder not synced or stale, or the message outside the synced window.
+        """
+        synced = await self.get_folder(account_id, folder)
+        if synced is None or synced.stale or synced.synced_at < time.time() - max_age:
+            return None
+        try:
+            return (await self.get_messages(account_id, folder, [uid])).get(uid)
+        except redis.RedisError as e:
+            logger.debug(f"Mailbox store message read failed for {account_id}/{folder}/{uid}: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Writes (sync tasks)
+    # ------------------------------------------------------------------
+
+    async def set_folder_list(self, account_id: str, folders: List[Dict[str, Any]]):
+        key = self._key(account_id, "folders")
+        pipe = redis_pool.client.pipeline(transaction=True)
+        # Also replaces a listing stored as a plain JSON string
+        pipe.delete(key)
+        pipe.hset(key, mapping={"folders": json.dumps(folders), "synced_at": time.time()})
+        pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def get_uids(self, account_id: str, folder: str) -> Set[int]:
+        """UIDs currently stored for a folder"""
+        return {int(uid) for uid in await redis_pool.client.zrange(self._key(account_id, "uids", folder), 0, -1)}
+
+    async def get_messages(self, account_id: str, folder: str, uids: List[int]) -> Dict[int, EmailMessage]:
+        if not uids:
+            return {}
+        raw = await redis_pool.client.hmget(self._key(account_id, "messages", folder), uids)
+        return {uid: EmailMessage(**json.loads(item)) for uid, item in zip(uids, raw) if item is not None}
+
+    async def put_messages(self, account_id: str, folder: str, emails: List[EmailMessage]):
+        """Store (or replace) messages of a folder"""
+        if not emails:
+            return
+        pipe = redis_pool.client.pipeline(transaction=False)
+        pipe.hset(
+            self._key(account_id, "messages", folder),
+            mapping={str(e.uid): json.dumps(asdict(e)) for e in emails},
+        )
+        pipe.zadd(self._key(account_id, "uids", folder), {str(e.uid): e.uid for e in emails})
+        await pipe.execute()
+
+    async def remove_messages(self, account_id: str, folder: str, uids: List[int]):
+        """Drop expunged messages and messages that left the synced window"""
+        if not uids:
+            return
+        pipe = redis_pool.client.pipeline(transaction=False)
+        pipe.hdel(self._key(account_id, "messages", folder), *uids)
+        pipe.zrem(self._key(account_id, "uids", folder), *uids)
+        await pipe.execute()
+
+    async def clear_folder(self, account_id: str, folder: str):
+        """Forget a folder (UIDVALIDITY changed: stored UIDs are meaningless)"""
+        await redis_pool.client.delete(*self._folder_keys(account_id, folder))
+
+    async def save_folder_state(self, account_id: str, folder: str, state: MailboxState, snapshot_at: float):
+        """
+        Record a completed sync; the folder becomes readable unless the API
+        changed it after `snapshot_at` (when `state` was read).
+        """
+        pipe = redis_pool.client.pipeline(transaction=False)
+        pipe.hset(self._key(account_id, "state", folder), mapping={
+            "uidvalidity": state.uidvalidity,
+            "uidnext": state.uidnext,
+            "highestmodseq": state.highestmodseq if state.highestmodseq is not None else "",
+            "messages": state.messages,
+            "synced_at": snapshot_at,
+        })
+        for key in self._folder_keys(account_id, folder):
+            pipe.expire(key, self.ttl)
+        pipe.sadd(self._key(account_id, "synced_folders"), folder)
+        pipe.expire(self._key(account_id, "synced_folders"), self.ttl)
+        await pipe.execute()
+
+    async def mark_stale(self, account_id: str):
+        """
+        The API changed the mailbox: stop serving synced messages until the next
+        sync completes. The folder list is kept but no longer fresh, so it is
+        still served while one background listing refreshes it.
+        """
+        if redis_pool.client is None:
+            return
+        now = time.time()
+        try:
+            await redis_pool.client.eval(
+                _MARK_STALE_SCRIPT,
+                2,
+                self._key(account_id, "synced_folders"),
+                self._key(account_id, "folders"),
+                self._key(account_id, "state", ""),
+                now,
+                now - settings.MAILBOX_SYNC_MAX_AGE - 1,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Failed to mark mailbox store stale for {account_id}: {e}")
+
+    async def delete_account(self, account_id: str):
+        """Drop everything stored for an account (disconnect)"""
+        if redis_pool.client is None:
+            return
+        try:
+            keys = [key async for key in redis_pool.client.scan_iter(match=f"mailbox:{account_id}:*", count=100)]
+            if keys:
+                await redis_pool.client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to delete mailbox store for {account_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Coordination
+    # ------------------------------------------------------------------
+
+    async def acquire_lease(self, account_id: str, ttl: int = settings.MAILBOX_SYNC_LEASE) -> Optional[str]:
+        """
+        Take the per-account sync lease so two workers never sync one mailbox.
+
+        Returns:
+            Lease token to pass to release_lease, or None if another sync holds it
+        """
+        token = uuid.uuid4().hex
+        if await redis_pool.client.set(f"lease:mailbox_sync:{account_id}", token, nx=True, ex=ttl):
+            return token
+        return None
+
+    async def release_lease(self, account_id: str, token: str):
+        try:
+            await redis_pool.client.eval(_RELEASE_SCRIPT, 1, f"lease:mailbox_sync:{account_id}", token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release mailbox sync lease for {account_id}: {e}")
+
+    async def extend_lease(self, account_id: str, token: str, ttl: int = settings.MAILBOX_SYNC_LEASE) -> bool:
+        """
+        Renew a held lease for another `ttl` seconds.
+
+        Returns:
+            False once the lease is lost (expired, and maybe taken by another sync)
+        """
+        return bool(await redis_pool.client.eval(_EXTEND_SCRIPT, 1, f"lease:mailbox_sync:{account_id}", token, ttl))
+
+    async def claim_sync_request(self, account_id: str, ttl: int = settings.MAILBOX_SYNC_REQUEST_TTL) -> bool:
+        """
+        Debounce interactive sync requests: True for the first request in `ttl`
+        seconds, so a burst of page loads enqueues one sync.
+        """
+        if redis_pool.client is None:
+            return False
+        try:
+            return bool(await redis_pool.client.set(self._key(account_id, "sync_requested"), "1", nx=True, ex=ttl))
+        except redis.RedisError:
+            return False
+
+
+# Singleton instance
+mailbox_store = MailboxStore()
@@ -0,0 +1,235 @@
+"""
+Mailbox Sync Scheduler Service
+Keeps every active account's next background sync time in a Redis sorted set
+(Database 1). Each account's interval adapts to how often mail arrives and how
+recently its owner used the API, so IMAP load follows activity instead of the
+number of connected accounts.
+"""
+
+import math
+import time
+import random
+import logging
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import redis
+
+from app.config import settings
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_KEY = "mailbox_sync:schedule"
+
+# Atomically take up to ARGV[2] members due at or before ARGV[1], pushing
+# their next sync out to ARGV[3]
+_POP_DUE_SCRIPT = """
+local due = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[2]))
+for _, member in ipairs(due) do
+    redis.call("zadd", KEYS[1], ARGV[3], member)
+end
+return due
+"""
+
+# Arrival rate is averaged over roughly this many seconds of history
+RATE_WINDOW = 3600
+# API hits of one account are recorded at most this often per process
+ACTIVITY_DEBOUNCE = 15.0
+
+
+class MailboxSyncScheduler:
+    """
+    Sorted set of account id -> next sync time (unix seconds), plus per-account
+    activity in `mailbox:{id}:activity` (HASH):
+    - `rate`       new messages per hour (time-weighted moving average)
+    - `synced_at`  last completed sync
+    - `active_at`  last API hit
+
+    The next interval is the shorter of
+    - the expected time until the next message arrives (3600 / rate), and
+    - half the time since the owner last used the API,
+    clamped to [MAILBOX_SYNC_MIN_INTERVAL, MAILBOX_SYNC_MAX_INTERVAL].
+
+    Everything goes through the process-wide async pool, from API requests
+    and sync tasks alike.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = settings.MAILBOX_SYNC_MIN_INTERVAL,
+        max_interval: float = settings.MAILBOX_SYNC_MAX_INTERVAL,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # account id -> monotonic time of the last recorded API hit (this process)
+        self._recorded: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Background sync is off without Redis"""
+        return redis_pool.client is not None
+
+    @staticmethod
+    def _activity_key(account_id: str) -> str:
+        return f"mailbox:{account_id}:activity"
+
+    def next_interval(self, rate: float, active_at: Optional[float], now: float) -> float:
+        """
+        Seconds until an account's next sync.
+
+        Args:
+            rate: New messages per hour
+            active_at: Last API hit (unix seconds), None if unknown
+            now: Current time (unix seconds)
+        """
+        interval = 3600 / rate if rate > 0 else self.max_interval
+        if active_at is not None:
+            interval = min(interval, max(now - active_at, 0) / 2)
+        # +-10% so accounts synced together drift apart
+        interval *= random.uniform(0.9, 1.1)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    # ------------------------------------------------------------------
+    # Schedule maintenance
+    # ------------------------------------------------------------------
+
+    async def schedule_many(self, account_ids: Iterable[str], only_missing: bool = False) -> int:
+        """
+        Schedule accounts for a sync within the next MAILBOX_SYNC_MIN_INTERVAL
+        (new accounts, reconciliation).
+
+        Returns:
+            Number of accounts newly added to the schedule
+        """
+        if redis_pool.client is None:
+            return 0
+        now = time.time()
+        mapping = {str(account_id): now + random.uniform(0, self.min_interval) for account_id in account_ids}
+        if not mapping:
+            return 0
+        try:
+            return await redis_pool.client.zadd(SCHEDULE_KEY, mapping, nx=only_missing)
+        except redis.RedisError as e:
+            # The reconciliation task re-adds anything missed here
+            logger.warning(f"Failed to schedule mailbox sync for {len(mapping)} account(s): {e}")
+            return 0
+
+    async def unschedule(self, *account_ids: str):
+        """Stop syncing accounts (inactive, disconnected)"""
+        if redis_pool.client is None or not account_ids:
+            return
+        try:
+            await redis_pool.client.zrem(SCHEDULE_KEY, *[str(account_id) for account_id in account_ids])
+        except redis.RedisError as e:
+            logger.warning(f"Failed to unschedule mailbox sync for {len(account_ids)} account(s): {e}")
+
+    async def iter_scheduled_ids(self, batch_size: int = 1000) -> AsyncIterator[List[str]]:
+        """Scheduled account ids in batches (ZSCAN; used by reconciliation)"""
+        batch: List[str] = []
+        async for account_id, _ in redis_pool.client.zscan_iter(SCHEDULE_KEY, count=batch_size):
+            batch.append(account_id)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # ------------------------------------------------------------------
+    # Activity
+    # ------------------------------------------------------------------
+
+    async def record_activity(self, account_id: str):
+        """
+        Record an API hit: the account's next sync moves to within
+        MAILBOX_SYNC_MIN_INTERVAL if it was due later.
+        Debounced per process, and never fails the calling request.
+        """
+        if redis_pool.client is None:
+            return
+        now = time.monotonic()
+        last = self._recorded.get(account_id)
+        if last is not None and now - last < ACTIVITY_DEBOUNCE:
+            return
+        if len(self._recorded) > 10000:
+            self._recorded.clear()
+        self._recorded[account_id] = now
+
+        try:
+            pipe = redis_pool.client.pipeline(transaction=False)
+            pipe.hset(self._activity_key(account_id), "active_at", time.time())
+            pipe.expire(self._activity_key(account_id), settings.MAILBOX_STORE_TTL)
+            # LT: only ever brings the next sync forward
+            pipe.zadd(SCHEDULE_KEY, {account_id: time.time() + self.min_interval}, lt=True)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.debug(f"Failed to record activity for {account_id}: {e}")
+
+    async def record_sync(self, account_id: str, arrived: int) -> float:
+        """
+        Record a completed sync that found `arrived` new messages and schedule
+        the next one.
+
+        Returns:
+            Seconds until the next sync
+        """
+        now = time.time()
+        key = self._activity_key(account_id)
+        stats = await redis_pool.client.hgetall(key)
+
+        rate = float(stats.get("rate") or 0)
+        synced_at = float(stats["synced_at"]) if stats.get("synced_at") else None
+        if synced_at is not None and now > synced_at:
+            elapsed = now - synced_at
+            # Longer gaps carry more weight, so the average tracks time rather than sync count
+            weight = 1 - math.exp(-elapsed / RATE_WINDOW)
+            rate += weight * (arrived * 3600 / elapsed - rate)
+
+        active_at = float(stats["active_at"]) if stats.get("active_at") else None
+        interval = self.next_interval(rate, active_at, now)
+
+        pipe = redis_pool.client.pipeline(transaction=False)
+        pipe.hset(key, mapping={"rate": rate, "synced_at": now})
+        pipe.expire(key, settings.MAILBOX_STORE_TTL)
+        pipe.zadd(SCHEDULE_KEY, {account_id: now + interval})
+        await pipe.execute()
+        return interval
+
+    async def reschedule(self, account_id: str) -> float:
+        """Schedule the next sync from the recorded activity (failed sync)"""
+        now = time.time()
+        try:
+            stats = await redis_pool.client.hgetall(self._activity_key(account_id))
+            interval = self.next_interval(
+                float(stats.get("rate") or 0),
+                float(stats["active_at"]) if stats.get("active_at") else None,
+                now,
+            )
+            await redis_pool.client.zadd(SCHEDULE_KEY, {account_id: now + interval})
+            return interval
+        except redis.RedisError as e:
+            logger.warning(f"Failed to reschedule mailbox sync for {account_id}: {e}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    async def pop_due(self, limit: int, now: Optional[float] = None) -> List[str]:
+        """
+        Take up to `limit` accounts whose sync is due.
+
+        Popped accounts stay scheduled MAILBOX_SYNC_MAX_INTERVAL out, so a sync
+        lost with its node's queue is dispatched again (to the new owner);
+        finishing the sync reschedules them on their adaptive interval.
+        """
+        now = now if now is not None else time.time()
+        return list(await redis_pool.client.eval(
+            _POP_DUE_SCRIPT, 1, SCHEDULE_KEY, now, limit, now + self.max_interval
+        ))
+
+    async def size(self) -> int:
+        return await redis_pool.client.zcard(SCHEDULE_KEY)
+
+
+# Singleton instance
+mailbox_sync_scheduler = MailboxSyncScheduler()
@@ -5,80 +5,117 @@ Stores and retrieves email labels per account using Redis Database 1.
 """
 
 import redis
-import json
-from typing import List, Optional
-from app.config import settings
+import redis.asyncio as aioredis
+from typing import Dict, Iterable, List, Optional
+from app.services.workers.redis_pool import redis_pool
+from app.services.workers.label_l1_cache import INVALIDATION_CHANNEL, LabelL1Cache, label_l1_cache
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Add labels given as ARGV (lowercased name, display name) pairs to a cached
+# account: HSETNX on the lowercased name claims it, then SADD the display name.
+# Accounts that are not cached are left alone (a partial set would read as the
+# full list). Returns labels added, or -1 when not cached.
+_ADD_SCRIPT = """
+if redis.call("exists", KEYS[2]) == 0 then return -1 end
+local added = 0
+for i = 1, #ARGV, 2 do
+    if redis.call("hsetnx", KEYS[2], ARGV[i], ARGV[i + 1]) == 1 then
+        redis.call("sadd", KEYS[1], ARGV[i + 1])
+        added = added + 1
+    end
+end
+return added
+"""
+
+# Remove ARGV lowercased labels: resolve the display name through the index,
+# then SREM + HDEL. Returns labels removed
+_REMOVE_SCRIPT = """
+local removed = 0
+for _, lower in ipairs(ARGV) do
+    local label = redis.call("hget", KEYS[2], lower)
+    if label then
+        redis.call("hdel", KEYS[2], lower)
+        redis.call("srem", KEYS[1], label)
+        removed = removed + 1
+    end
+end
+return removed
+"""
+
 
 class RedisLabelCache:
     """
     Redis-based cache for storing email labels per account.
     Uses Redis Database 1 (separate from Celery's Database 0).
-    """
     
-    def __init__(self):
-        """
-        Initialize Redis connection for label cache (Database 1).
-        """
-        self.redis_client: Optional[redis.Redis] = None
-        self._initialize_redis()
+    Per account:
+    - `labels:account:{id}:names`  SET of label display names
+    - `labels:account:{id}:index`  HASH lowercased name -> display name
+    
+    Both keys are written together and share the TTL set by the full load
+    (set_labels); single-label updates are atomic scripts that leave it alone.
+    Membership checks are one HGET on the index, case-insensitive.
+    
+    Reads go through the in-process L1 (label_l1_cache) first; every write
+    publishes the account on INVALIDATION_CHANNEL so all processes drop it.
+    
+    Cheap to construct: it borrows connections from the process-wide async
+    pool (opened in the app lifespan / task runtime) instead of connecting.
+    """
     
-    def _initialize_redis(self) -> redis.Redis:
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None, l1: Optional[LabelL1Cache] = None):
         """
-        Create and initialize Redis client object.
-        
-        Returns:
-            Redis client instance
+        Args:
+            redis_client: Pooled async client to use (defaults to the process-wide one)
+            l1: In-process cache to read through (defaults to the process-wide one)
         """
-        try:
-            # Get Redis cache URL from config
-            redis_url = settings.REDIS_CACHE_URL
-            
-            if not redis_url:
-                raise ValueError(
-                    "REDIS_CACHE_URL not configured. "
-                    "Please set it in your .env file."
-                )
-            
-            # Create Redis client object
-            self.redis_client = redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
-            
-            # Test connection
-            self.redis_client.ping()
-            
-            logger.info(f"✓ Redis label cache connected (Database 1)")
-            return self.redis_client
-            
-        except redis.ConnectionError as e:
-            logger.error(f"Failed to connect to Redis for label cache: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Error initializing Redis for label cache: {e}")
-            raise
+        self.redis_client: Optional[aioredis.Redis] = (
+            redis_client if redis_client is not None else redis_pool.client
+        )
+        self.l1 = l1 if l1 is not None else label_l1_cache
     
-    def _get_key(self, account_id: str) -> str:
+    def _get_keys(self, account_id: str) -> List[str]:
         """
-        Generate Redis key for account labels (internal helper).
+        Generate Redis keys for account labels (internal helper).
         
         Args:
             account_id: Gmail account UUID
         
         Returns:
-            Redis key string
+            [names SET key, index HASH key]
         """
-        return f"labels:account:{account_id}"
+        return [f"labels:account:{account_id}:names", f"labels:account:{account_id}:index"]
     
-    def get_labels(self, account_id: str) -> List[str]:
+    @staticmethod
+    def _normalize(label: str) -> str:
+        """Case-insensitive form of a label name (index field)"""
+        return label.strip().lower()
+    
+    @staticmethod
+    def _queue_invalidation(pipe, *account_ids: str):
+        """Queue the invalidation message for other processes' L1 on a write pipeline"""
+        pipe.publish(INVALIDATION_CHANNEL, LabelL1Cache.encode(account_ids))
+    
+    async def _changed(self, *account_ids: str):
+        """Drop the accounts from the local L1 and tell other processes to do the same"""
+        await self.redis_client.publish(INVALIDATION_CHANNEL, LabelL1Cache.encode(account_ids))
+        self.l1.invalidate(account_ids)
+    
+    async def _load(self, account_id: str) -> List[str]:
+        """Labels from Redis, filling the L1 (with the index) when it is in use"""
+        names_key, index_key = self._get_keys(account_id)
+        if not self.l1.enabled:
+            return sorted(await self.redis_client.smembers(names_key), key=str.lower)
+        
+        generation = self.l1.generation
+        index = await self.redis_client.hgetall(index_key)
+        labels = sorted(index.values(), key=str.lower)
+        self.l1.set(account_id, labels, index, generation)
+        return labels
+    
+    async def get_labels(self, account_id: str) -> List[str]:
         """
         Get cached labels for an account.
         
@@ -86,30 +123,23 @@ class RedisLabelCache:
             account_id: Gmail account UUID (as string)
         
         Returns:
-            List of label names, empty list if not found
+            List of label names (sorted case-insensitively), empty list if not found
         """
         try:
             if not self.redis_client:
                 logger.error("Redis client not initialized")
                 return []
             
-            key = self._get_key(account_id)
-            cached_data = self.redis_client.get(key)
+            cached = self.l1.get(account_id)
+            if cached is not None:
+                return list(cached[0])
             
-            if not cached_data:
+            labels = await self._load(account_id)
+            if not labels:
                 logger.debug(f"No cached labels found for account {account_id}")
-                return []
-            
-            # Parse JSON data
-            data = json.loads(cached_data)
-            labels = data.get("labels", [])
-            
             logger.debug(f"Retrieved {len(labels)} labels from cache for account {account_id}")
             return labels
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse cached labels for account {account_id}: {e}")
-            return []
+        
         except redis.RedisError as e:
             logger.error(f"Redis error getting labels for account {account_id}: {e}")
             return []
@@ -117,18 +147,47 @@ class RedisLabelCache:
             logger.error(f"Unexpected error getting labels for account {account_id}: {e}")
             return []
     
-    def set_labels(
-        self, 
-        account_id: str, 
-        labels: List[str], 
+    async def find_label(self, account_id: str, label: str) -> Optional[str]:
+        """
+        Case-insensitive membership check (one HGET, no list transfer).
+        
+        Args:
+            account_id: Gmail account UUID (as string)
+            label: Label name in any case
+        
+        Returns:
+            The cached display name of the label, None if not cached
+        """
+        try:
+            cached = self.l1.get(account_id)
+            if cached is not None:
+                return cached[1].get(self._normalize(label))
+            if not self.redis_client:
+                return None
+            return await self.redis_client.hget(self._get_keys(account_id)[1], self._normalize(label))
+        
+        except redis.RedisError as e:
+            logger.error(f"Redis error looking up label {label} for account {account_id}: {e}")
+            return None
+    
+    async def has_label(self, account_id: str, label: str) -> bool:
+        """True if the account's cached labels contain `label` (case-insensitive)"""
+        return await self.find_label(account_id, label) is not None
+    
+    async def set_labels(
+        self,
+        account_id: str,
+        labels: Iterable[str],
         ttl: int = 3600
     ) -> bool:
         """
-        Cache labels for an account.
+        Cache labels for an account, replacing what was cached.
+        One MULTI/EXEC pipeline (with the invalidation message), so readers
+        never see a half-written list.
         
         Args:
             account_id: Gmail account UUID (as string)
-            labels: List of label names
+            labels: Label names (case-insensitive duplicates keep the first)
             ttl: Time to live in seconds (default: 1 hour)
         
         Returns:
@@ -139,26 +198,26 @@ class RedisLabelCache:
                 logger.error("Redis client not initialized")
                 return False
             
-            key = self._get_key(account_id)
+            index: Dict[str, str] = {}
+            for label in labels:
+                index.setdefault(self._normalize(label), label)
             
-            # Prepare data structure
-            data = {
-                "labels": labels,
-                "last_synced": datetime.utcnow().isoformat(),
-                "source": "gmail"
-            }
+            names_key, index_key = self._get_keys(account_id)
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(names_key, index_key)
+            if index:
+                pipe.sadd(names_key, *index.values())
+                pipe.hset(index_key, mapping=index)
+                pipe.expire(names_key, ttl)
+                pipe.expire(index_key, ttl)
+            self._queue_invalidation(pipe, account_id)
+            await pipe.execute()
+            self.l1.invalidate([account_id])
             
-            # Store in Redis with TTL
-            self.redis_client.setex(
-                key,
-                ttl,
-                json.dumps(data)
-            )
-            
-            logger.info(f"Cached {len(labels)} labels for account {account_id} (TTL: {ttl}s)")
-            logger.info(f"Labels cached: {labels}") 
+            logger.info(f"Cached {len(index)} labels for account {account_id} (TTL: {ttl}s)")
+            logger.debug(f"Labels cached: {list(index.values())}")
             return True
-            
+        
         except redis.RedisError as e:
             logger.error(f"Redis error setting labels for account {account_id}: {e}")
             return False
@@ -166,38 +225,57 @@ class RedisLabelCache:
             logger.error(f"Unexpected error setting labels for account {account_id}: {e}")
             return False
     
-    def add_label(self, account_id: str, label: str, ttl: int = 3600) -> bool:
+    async def add_labels(self, account_id: str, labels: Iterable[str]) -> bool:
         """
-        Add a single label to cache (or create cache if doesn't exist).
+        Add labels to an account's cached list in one atomic script.
+        The TTL is kept; an account that is not cached is left uncached and
+        picks the labels up on its next full load.
         
         Args:
             account_id: Gmail account UUID
-            label: Label name to add
-            ttl: Time to live in seconds
+            labels: Label names to add
         
         Returns:
             True if successful
         """
+        labels = [label.strip() for label in labels if label and label.strip()]
         try:
-            # Get existing labels
-            existing_labels = self.get_labels(account_id)
-            
-            # Add new label if not already present (case-insensitive)
-            label_lower = label.lower().strip()
-            if label_lower not in [l.lower() for l in existing_labels]:
-                existing_labels.append(label)
-                return self.set_labels(account_id, existing_labels, ttl)
+            if not self.redis_client:
+                logger.error("Redis client not initialized")
+                return False
+            if not labels:
+                return True
             
-            logger.debug(f"Label '{label}' already exists for account {account_id}")
+            pairs = [value for label in labels for value in (self._normalize(label), label)]
+            added = await self.redis_client.eval(_ADD_SCRIPT, 2, *self._get_keys(account_id), *pairs)
+            if added < 0:
+                logger.debug(f"No cached labels to add {labels} to for account {account_id}")
+            elif added < len(labels):
+                logger.debug(f"Added {added}/{len(labels)} labels for account {account_id} (others already cached)")
+            if added > 0:
+                await self._changed(account_id)
             return True
-            
-        except Exception as e:
-            logger.error(f"Error adding label {label} for account {account_id}: {e}")
+        
+        except redis.RedisError as e:
+            logger.error(f"Redis error adding labels {labels} for account {account_id}: {e}")
             return False
     
-    def remove_label(self, account_id: str, label: str) -> bool:
+    async def add_label(self, account_id: str, label: str) -> bool:
         """
-        Remove a label from cache.
+        Add a single label to an account's cached list (see add_labels).
+        
+        Args:
+            account_id: Gmail account UUID
+            label: Label name to add
+        
+        Returns:
+            True if successful
+        """
+        return await self.add_labels(account_id, [label])
+    
+    async def remove_label(self, account_id: str, label: str) -> bool:
+        """
+        Remove a label from cache (case-insensitive, atomic; TTL is kept).
         
         Args:
             account_id: Gmail account UUID
@@ -207,56 +285,57 @@ class RedisLabelCache:
             True if successful
         """
         try:
-            existing_labels = self.get_labels(account_id)
-            
-            # Remove label (case-insensitive)
-            label_lower = label.lower()
-            updated_labels = [l for l in existing_labels if l.lower() != label_lower]
-            
-            if len(updated_labels) != len(existing_labels):
-                # Label was removed, update cache
-                if updated_labels:
-                    return self.set_labels(account_id, updated_labels)
-                else:
-                    # No labels left, invalidate cache
-                    return self.invalidate(account_id)
+            if not self.redis_client:
+                logger.error("Redis client not initialized")
+                return False
             
-            logger.debug(f"Label '{label}' not found for account {account_id}")
+            removed = await self.redis_client.eval(
+                _REMOVE_SCRIPT, 2, *self._get_keys(account_id), self._normalize(label)
+            )
+            if not removed:
+                logger.debug(f"Label '{label}' not found for account {account_id}")
+            else:
+                await self._changed(account_id)
             return True
-            
-        except Exception as e:
-            logger.error(f"Error removing label {label} for account {account_id}: {e}")
+        
+        except redis.RedisError as e:
+            logger.error(f"Redis error removing label {label} for account {account_id}: {e}")
             return False
     
-    def invalidate(self, account_id: str) -> bool:
+    async def invalidate(self, *account_ids: str) -> bool:
         """
-        Remove cached labels for an account.
+        Remove cached labels for one or more accounts (a single DEL).
         Use this when labels are updated in Gmail.
         
         Args:
-            account_id: Gmail account UUID
+            account_ids: Gmail account UUIDs
         
         Returns:
-            True if successful
+            True if anything was removed
         """
         try:
             if not self.redis_client:
                 logger.error("Redis client not initialized")
                 return False
+            if not account_ids:
+                return False
             
-            key = self._get_key(account_id)
-            deleted = self.redis_client.delete(key)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(*[key for a in account_ids for key in self._get_keys(a)])
+            self._queue_invalidation(pipe, *account_ids)
+            deleted = (await pipe.execute())[0]
+            self.l1.invalidate(account_ids)
             
             if deleted:
-                logger.info(f"Invalidated label cache for account {account_id}")
+                logger.info(f"Invalidated label cache for account(s) {', '.join(account_ids)}")
             else:
-                logger.debug(f"No cache to invalidate for account {account_id}")
+                logger.debug(f"No cache to invalidate for account(s) {', '.join(account_ids)}")
             
             return bool(deleted)
-            
+        
         except redis.RedisError as e:
-            logger.error(f"Redis error invalidating cache for account {account_id}: {e}")
+            logger.error(f"Redis error invalidating cache for account(s) {', '.join(account_ids)}: {e}")
             return False
         except Exception as e:
-            logger.error(f"Unexpected error invalidating cache for account {account_id}: {e}")
-            return False
\ No newline at end of file
+            logger.error(f"Unexpected error invalidating cache for account(s) {', '.join(account_ids)}: {e}")
+            return False
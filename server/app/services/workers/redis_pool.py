@@ -0,0 +1,87 @@
+"""
+Redis Pool Service
+One async Redis client (Database 1) per process over a bounded connection
+pool. Opened on the process's event loop - the FastAPI lifespan in the API,
+the task runtime in Celery workers - and shared by every Redis user on that
+loop, so a request borrows a pooled connection instead of opening its own.
+"""
+
+import os
+import logging
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RedisPool:
+    """
+    Holder of the process-wide async client.
+
+    `client` is None until open() runs (or when REDIS_CACHE_URL is not set);
+    users treat that like a Redis outage and fall back to their no-cache path.
+    """
+
+    def __init__(self, max_connections: int = settings.REDIS_POOL_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self.client: Optional[aioredis.Redis] = None
+        # Process that opened the client; a forked child must open its own
+        self._pid: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    async def open(self) -> Optional[aioredis.Redis]:
+        """
+        Create the client on the running loop (idempotent per process).
+
+        Returns:
+            The shared client, or None if Redis is not configured
+        """
+        if self.client is not None and self._pid == os.getpid():
+            return self.client
+
+        if not settings.REDIS_CACHE_URL:
+            logger.warning("Redis pool disabled: REDIS_CACHE_URL not configured")
+            self.client = None
+            return None
+
+        # Blocking pool: past max_connections callers wait for a free connection
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_CACHE_URL,
+            decode_responses=True,
+            max_connections=self.max_connections,
+            timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=1,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        self.client = aioredis.Redis(connection_pool=pool)
+        self._pid = os.getpid()
+
+        try:
+            await self.client.ping()
+            logger.info(f"✓ Redis pool connected (Database 1, up to {self.max_connections} connections)")
+        except redis.RedisError as e:
+            # Connections are retried per command; callers fall back meanwhile
+            logger.warning(f"Redis not reachable at startup: {e}")
+        return self.client
+
+    async def close(self):
+        """Close the client and its pooled connections (shutdown)"""
+        client, self.client = self.client, None
+        if client is None or self._pid != os.getpid():
+            return
+        try:
+            await client.aclose(close_connection_pool=True)
+        except Exception as e:
+            logger.warning(f"Error while closing Redis pool: {e}")
+
+
+# Singleton instance
+redis_pool = RedisPool()
@@ -0,0 +1,184 @@
+"""
+Sync Node Registry Service
+Membership of the Celery worker nodes that run mailbox syncs, kept in Redis
+(Database 1) with heartbeats, and a consistent hash ring over the live nodes
+that assigns every account to one owner node. Adding a node moves only about
+1/N of the accounts; a node that stops heartbeating drops out of the ring and
+its accounts move to the remaining nodes.
+"""
+
+import time
+import bisect
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import redis
+
+from app.config import settings
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+MEMBERS_KEY = "sync_nodes:members"
+
+# Atomically remove and return the members whose heartbeat is older than ARGV[1]
+_POP_DEPARTED_SCRIPT = """
+local departed = redis.call("zrangebyscore", KEYS[1], "-inf", "(" .. ARGV[1])
+if #departed > 0 then
+    redis.call("zrem", KEYS[1], unpack(departed))
+end
+return departed
+"""
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with `replicas` virtual points per node"""
+
+    def __init__(self, nodes: Sequence[str], replicas: int = settings.SYNC_NODE_RING_REPLICAS):
+        self.nodes: Tuple[str, ...] = tuple(sorted(nodes))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node owning `key`: the first point clockwise from the key's hash"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class SyncNodeRegistry:
+    """
+    Sorted set of node id (Celery worker nodename) -> last heartbeat (unix seconds).
+
+    A node is live while its heartbeat is younger than SYNC_NODE_TTL. The ring
+    is rebuilt from the live nodes at most every SYNC_NODE_HEARTBEAT_INTERVAL
+    per process, so membership changes rebalance ownership within one
+    heartbeat. Ownership only routes work: the per-account sync lease still
+    guarantees one IMAP session per account while ownership moves.
+
+    A node that leaves backdates its heartbeat by SYNC_NODE_TTL, so it drops
+    out of the ring at once but stays listed; once a node has been silent for
+    twice SYNC_NODE_TTL (left, or died) the sync dispatcher pops it and
+    requeues what was left on its queues. The extra TTL lets a leaving worker
+    put its unacknowledged tasks back first.
+
+    Ring reads go through the process-wide async pool (they run in API
+    requests and sync tasks). The heartbeat runs in a thread of the worker's
+    main process, outside any event loop, on its own plain client.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.SYNC_NODE_TTL,
+        heartbeat_interval: float = settings.SYNC_NODE_HEARTBEAT_INTERVAL,
+    ):
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self._ring = HashRing([])
+        self._ring_checked = 0.0
+        # Heartbeat of this process's node (worker main process only)
+        self.node_id: Optional[str] = None
+        self.heartbeat_client: Optional[redis.Redis] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Without Redis no node registers and syncs use the shared queues"""
+        return bool(settings.REDIS_CACHE_URL)
+
+    # ------------------------------------------------------------------
+    # Membership
+    # ------------------------------------------------------------------
+
+    async def live_nodes(self) -> List[str]:
+        """Nodes with a recent heartbeat"""
+        return await redis_pool.client.zrangebyscore(MEMBERS_KEY, time.time() - self.ttl, "+inf")
+
+    async def pop_departed(self) -> List[str]:
+        """
+        Remove and return the nodes that left or stopped heartbeating; the
+        caller takes over the tasks still queued for them.
+        """
+        cutoff = time.time() - 2 * self.ttl
+        return list(await redis_pool.client.eval(_POP_DEPARTED_SCRIPT, 1, MEMBERS_KEY, cutoff))
+
+    async def ring(self) -> HashRing:
+        """Hash ring over the live nodes (rebuilt at most once per heartbeat interval)"""
+        now = time.monotonic()
+        if now - self._ring_checked < self.heartbeat_interval or redis_pool.client is None:
+            return self._ring
+        # Claimed before awaiting, so concurrent callers keep the current ring meanwhile
+        self._ring_checked = now
+        try:
+            nodes = await self.live_nodes()
+            if tuple(sorted(nodes)) != self._ring.nodes:
+                logger.info(f"🔁 Sync ring changed: {len(nodes)} node(s) {sorted(nodes)}")
+                self._ring = HashRing(nodes)
+        except redis.RedisError as e:
+            # Keep routing with the last known ring
+            logger.warning(f"Failed to read sync nodes: {e}")
+        return self._ring
+
+    async def owner(self, account_id: str) -> Optional[str]:
+        """Node that owns an account's syncs, or None when no node is registered"""
+        return (await self.ring()).owner(account_id)
+
+    # ------------------------------------------------------------------
+    # Heartbeat (worker main process)
+    # ------------------------------------------------------------------
+
+    def join(self, node_id: str):
+        """Register this process as `node_id` and heartbeat until leave()"""
+        if not self.enabled or self._thread is not None:
+            return
+        self.heartbeat_client = redis.from_url(
+            settings.REDIS_CACHE_URL,
+            decode_responses=True,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+        )
+        self.node_id = node_id
+        self._stop.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name="sync-node-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(f"💓 Joined the sync ring as {node_id}")
+
+    def leave(self):
+        """
+        Stop heartbeating and mark the node departed, so its accounts move right
+        away and the dispatcher requeues its leftover tasks.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.heartbeat_interval)
+        self._thread = None
+        try:
+            self.heartbeat_client.zadd(MEMBERS_KEY, {self.node_id: time.time() - self.ttl})
+            logger.info(f"👋 Left the sync ring ({self.node_id})")
+        except redis.RedisError as e:
+            logger.warning(f"Failed to deregister sync node {self.node_id}: {e}")
+
+    def _beat(self):
+        try:
+            self.heartbeat_client.zadd(MEMBERS_KEY, {self.node_id: time.time()})
+        except redis.RedisError as e:
+            logger.warning(f"Sync node heartbeat failed for {self.node_id}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self._beat()
+
+
+# Singleton instance
+sync_node_registry = SyncNodeRegistry()
@@ -0,0 +1,162 @@
+"""
+Token Refresh Scheduler Service
+Keeps every active Gmail account's next refresh deadline in a Redis sorted set
+(Database 1), so the Celery dispatcher pops only the accounts that are due
+instead of scanning the accounts table on every beat.
+"""
+
+import time
+import uuid
+import random
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import redis
+
+from app.config import settings
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_KEY = "token_refresh:schedule"
+LEASE_KEY = "lease:token_refresh:dispatcher"
+
+# Atomically take up to ARGV[2] members due at or before ARGV[1]
+_POP_DUE_SCRIPT = """
+local due = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[2]))
+if #due > 0 then
+    redis.call("zrem", KEYS[1], unpack(due))
+end
+return due
+"""
+
+# Delete the lease only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class TokenRefreshScheduler:
+    """
+    Sorted set of account id -> refresh deadline (unix seconds).
+
+    The deadline is TOKEN_REFRESH_LEAD_SECONDS before the token expires, minus
+    up to TOKEN_REFRESH_JITTER_SECONDS, so accounts connected at the same time
+    don't all come due on the same beat.
+
+    Goes through the process-wide async pool: the schedule is maintained from
+    API requests (OAuth callback, on-demand refresh) as well as from tasks.
+    """
+
+    def __init__(
+        self,
+        lead_seconds: int = settings.TOKEN_REFRESH_LEAD_SECONDS,
+        jitter_seconds: int = settings.TOKEN_REFRESH_JITTER_SECONDS,
+    ):
+        self.lead_seconds = lead_seconds
+        self.jitter_seconds = jitter_seconds
+
+    @property
+    def enabled(self) -> bool:
+        """Without Redis the dispatcher falls back to a table scan"""
+        return redis_pool.client is not None
+
+    def deadline(self, token_expiry: datetime) -> float:
+        """Jittered refresh deadline for a token expiry"""
+        return token_expiry.timestamp() - self.lead_seconds - random.uniform(0, self.jitter_seconds)
+
+    # ------------------------------------------------------------------
+    # Schedule maintenance (called by GmailAccountRepository)
+    # ------------------------------------------------------------------
+
+    async def schedule(self, account_id: str, token_expiry: datetime):
+        """(Re)schedule an account's next refresh"""
+        await self.schedule_many([(account_id, token_expiry)])
+
+    async def schedule_many(self, accounts: Iterable[Tuple[str, datetime]], only_missing: bool = False) -> int:
+        """
+        Schedule many accounts in one round trip.
+
+        Args:
+            accounts: (account_id, token_expiry) pairs
+            only_missing: Keep the deadline of accounts already scheduled
+
+        Returns:
+            Number of accounts newly added to the schedule
+        """
+        if redis_pool.client is None:
+            return 0
+        mapping: Dict[str, float] = {
+            str(account_id): self.deadline(token_expiry) for account_id, token_expiry in accounts
+        }
+        if not mapping:
+            return 0
+        try:
+            return await redis_pool.client.zadd(SCHEDULE_KEY, mapping, nx=only_missing)
+        except redis.RedisError as e:
+            # The hourly sync re-adds anything missed here
+            logger.warning(f"Failed to schedule token refresh for {len(mapping)} account(s): {e}")
+            return 0
+
+    async def unschedule(self, *account_ids: str):
+        """Stop refreshing accounts (error status, disconnect)"""
+        if redis_pool.client is None or not account_ids:
+            return
+        try:
+            await redis_pool.client.zrem(SCHEDULE_KEY, *[str(account_id) for account_id in account_ids])
+        except redis.RedisError as e:
+            logger.warning(f"Failed to unschedule token refresh for {len(account_ids)} account(s): {e}")
+
+    async def iter_scheduled_ids(self, batch_size: int = 1000) -> AsyncIterator[List[str]]:
+        """Scheduled account ids in batches (ZSCAN; used by the sync task)"""
+        batch: List[str] = []
+        async for account_id, _ in redis_pool.client.zscan_iter(SCHEDULE_KEY, count=batch_size):
+            batch.append(account_id)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def size(self) -> int:
+        return await redis_pool.client.zcard(SCHEDULE_KEY)
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    async def pop_due(self, limit: int, now: Optional[float] = None) -> List[str]:
+        """
+        Remove and return up to `limit` accounts whose deadline has passed.
+
+        Popped accounts are rescheduled when their new token is written.
+        """
+        return list(await redis_pool.client.eval(
+            _POP_DUE_SCRIPT, 1, SCHEDULE_KEY, now if now is not None else time.time(), limit
+        ))
+
+    async def acquire_lease(self, ttl: int = settings.TOKEN_REFRESH_DISPATCH_LEASE) -> Optional[str]:
+        """
+        Take the dispatcher lease so dispatcher runs never overlap.
+
+        Returns:
+            Lease token to pass to release_lease, or None if another run holds it
+        """
+        token = uuid.uuid4().hex
+        if await redis_pool.client.set(LEASE_KEY, token, nx=True, ex=ttl):
+            return token
+        return None
+
+    async def release_lease(self, token: str):
+        try:
+            await redis_pool.client.eval(_RELEASE_SCRIPT, 1, LEASE_KEY, token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release token refresh dispatcher lease: {e}")
+
+
+# Singleton instance
+token_refresh_scheduler = TokenRefreshScheduler()
@@ -0,0 +1,230 @@
+"""
+Token Refresher Service
+Single-flight Gmail access token refresh.
+Concurrent refreshes of one account share a single in-flight future per process,
+and processes (API workers and the Celery refresh task) coordinate through a
+Redis lock (Database 1), so a burst on an expiring account makes one Google call.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis
+
+from app.api.utils.metrics import metrics
+from app.config import settings
+from app.models.gmail_account import GmailAccount
+from app.repository.gmail_account_repository import GmailAccountRepository
+from app.services.default.gmail_oauth_service import gmail_oauth_service
+from app.services.workers.account_cache import account_cache, CachedAccount
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Push the lock's expiry out only if we still own it
+_EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Longest one Google refresh call can take: every attempt timing out, with the
+# longest jittered backoff between attempts
+MAX_REFRESH_CALL_SECONDS = (
+    settings.OAUTH_HTTP_TIMEOUT * (settings.OAUTH_HTTP_RETRIES + 1)
+    + sum(settings.OAUTH_HTTP_BACKOFF * (2 ** attempt) * 1.5 for attempt in range(settings.OAUTH_HTTP_RETRIES))
+)
+
+
+class TokenRefresher:
+    """
+    Coalesces access token refreshes per account.
+
+    - In-process: one detached task per account; every caller awaits it, and a
+      caller that goes away (client disconnect) doesn't cancel it for the others
+    - Cross-process: SET NX lock `lock:token_refresh:{account_id}`; callers that
+      lose the race wait for the winner's token to show up in the account cache.
+      The winner renews the lock while its Google call is in flight (a call
+      with retries can outlast one TTL), and waiters give up only after
+      MAX_REFRESH_CALL_SECONDS on top of the TTL
+    """
+
+    def __init__(self, lock_ttl: int = settings.TOKEN_REFRESH_LOCK_TTL):
+        self.lock_ttl = lock_ttl
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _lock_key(account_id: str) -> str:
+        return f"lock:token_refresh:{account_id}"
+
+    # ------------------------------------------------------------------
+    # Distributed lock (shared with the Celery refresh task)
+    # ------------------------------------------------------------------
+
+    async def acquire_lock(self, account_id: str) -> Optional[str]:
+        """
+        Try to take the refresh lock for an account.
+
+        Returns:
+            Lock token to pass to release_lock, or None if another process holds it
+        """
+        token = uuid.uuid4().hex
+        if redis_pool.client is None:
+            return token
+        try:
+            if await redis_pool.client.set(self._lock_key(account_id), token, nx=True, ex=self.lock_ttl):
+                return token
+            return None
+        except redis.RedisError as e:
+            # Without Redis, fall back to in-process coalescing only
+            logger.warning(f"Token refresh lock unavailable for {account_id}: {e}")
+            return token
+
+    async def release_lock(self, account_id: str, token: str):
+        """Release the refresh lock if we still hold it"""
+        await self.release_locks([(account_id, token)])
+
+    async def release_locks(self, locks: Iterable[Tuple[str, str]]):
+        """Release many (account_id, token) locks in one pipelined round trip"""
+        locks = list(locks)
+        if redis_pool.client is None or not locks:
+            return
+        pipe = redis_pool.client.pipeline(transaction=False)
+        for account_id, token in locks:
+            pipe.eval(_RELEASE_SCRIPT, 1, self._lock_key(account_id), token)
+        try:
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release {len(locks)} token refresh lock(s): {e}")
+
+    async def extend_locks(self, locks: Iterable[Tuple[str, str]]):
+        """
+        Renew many (account_id, token) locks we still own for another lock_ttl
+        (holders that keep them longer than one TTL, like the batched Celery
+        commit, call this periodically).
+        """
+        locks = list(locks)
+        if redis_pool.client is None or not locks:
+            return
+        pipe = redis_pool.client.pipeline(transaction=False)
+        for account_id, token in locks:
+            pipe.eval(_EXTEND_SCRIPT, 1, self._lock_key(account_id), token, self.lock_ttl)
+        try:
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to extend {len(locks)} token refresh lock(s): {e}")
+
+    async def _keep_lock(self, account_id: str, token: str):
+        """Renew a held refresh lock every third of its TTL until cancelled"""
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            await self.extend_locks([(account_id, token)])
+
+    async def _lock_held(self, account_id: str) -> bool:
+        if redis_pool.client is None:
+            return False
+        try:
+            return bool(await redis_pool.client.exists(self._lock_key(account_id)))
+        except redis.RedisError:
+            return False
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    async def refresh(self, account: GmailAccount) -> CachedAccount:
+        """
+        Refresh an account's access token, coalescing concurrent calls.
+
+        Args:
+            account: GmailAccount whose token is expired or about to expire
+
+        Returns:
+            CachedAccount carrying the new access token
+        """
+        account_id = str(account.id)
+        task = self._inflight.get(account_id)
+        if task is not None:
+            metrics.incr("token_refresh.coalesced")
+        else:
+            task = asyncio.create_task(self._refresh(account))
+            self._inflight[account_id] = task
+            task.add_done_callback(lambda done: self._finished(account_id, done))
+        # Shielded: cancelling this caller leaves the refresh running for the rest
+        return await asyncio.shield(task)
+
+    def _finished(self, account_id: str, task: asyncio.Task):
+        if self._inflight.get(account_id) is task:
+            del self._inflight[account_id]
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody awaited anymore isn't logged as never retrieved
+            task.exception()
+
+    async def _refresh(self, account: GmailAccount) -> CachedAccount:
+        account_id = str(account.id)
+        deadline = time.monotonic() + self.lock_ttl + MAX_REFRESH_CALL_SECONDS
+
+        while True:
+            token = await self.acquire_lock(account_id)
+            if token is not None:
+                try:
+                    # Another process may have refreshed while we were waiting
+                    await account.refresh_from_db()
+                    if not (account.is_expired or account.needs_refresh):
+                        return CachedAccount.from_account(account)
+                    keeper = asyncio.create_task(self._keep_lock(account_id, token))
+                    try:
+                        return await self._refresh_with_google(account)
+                    finally:
+                        keeper.cancel()
+                finally:
+                    await self.release_lock(account_id, token)
+
+            # Someone else is refreshing: wait for their token
+            metrics.incr("token_refresh.lock_waits")
+            while await self._lock_held(account_id) and time.monotonic() < deadline:
+                cached = await account_cache.get(account_id, use_local=False)
+                if cached is not None and not cached.needs_refresh:
+                    return cached
+                await asyncio.sleep(settings.TOKEN_REFRESH_POLL_INTERVAL)
+
+            cached = await account_cache.get(account_id, use_local=False)
+            if cached is not None and not cached.needs_refresh:
+                return cached
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for token refresh of account {account_id}")
+
+    @staticmethod
+    async def _refresh_with_google(account: GmailAccount) -> CachedAccount:
+        refresh_token = account.get_refresh_token
+        if not refresh_token:
+            raise ValueError("Token expired and no refresh token available")
+
+        metrics.incr("token_refresh.google_calls")
+        token_data = await gmail_oauth_service.refresh_auth_access_token_async(refresh_token)
+        expires_in = token_data.get('expires_in', 3600)  # Always in SECONDS
+        token_expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+
+        new_meta = account.meta.copy()
+        new_meta['access_token'] = token_data['access_token']
+        # Writes through to the account cache, which is where waiters pick it up
+        await GmailAccountRepository.update_tokens(account, new_meta, token_expiry)
+        logger.info(f"Refreshed access token for account {account.id}")
+        return CachedAccount.from_account(account)
+
+
+# Singleton instance
+token_refresher = TokenRefresher()
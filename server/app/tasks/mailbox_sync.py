@@ -0,0 +1,394 @@
+# app/tasks/mailbox_sync.py
+from app.celery_app import celery_app
+from app.config import settings
+from app.tasks.runtime import run_async
+from app.enums.gmail import GmailAccountStatus
+from app.repository.gmail_account_repository import GmailAccountRepository
+from app.services.default.imap_service import GmailImapService
+from app.services.workers.account_cache import CachedAccount
+from app.services.workers.mailbox_store import mailbox_store
+from app.services.workers.mailbox_sync_scheduler import mailbox_sync_scheduler
+from app.services.workers.sync_nodes import sync_node_registry
+from app.services.workers.folder_cache import folder_cache
+from app.services.workers.token_refresher import token_refresher
+from app.api.utils.metrics import metrics
+from dataclasses import replace
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from celery.signals import beat_init, celeryd_after_setup, worker_shutdown
+from kombu import Queue
+import anyio
+import asyncio
+import logging
+import time
+import redis
+
+logger = logging.getLogger(__name__)
+
+DISPATCHER_LEASE = "dispatcher"
+
+
+async def _sync_folder(
+    imap_service: GmailImapService,
+    account_id: str,
+    folder: str,
+    budget: int
+) -> Tuple[int, bool, int]:
+    """
+    Pull a folder's changes since the last sync into the mailbox store.
+
+    - Unchanged STATUS: nothing to do
+    - UIDVALIDITY changed: start over
+    - New messages: fetched newest first, at most `budget` per run
+    - Expunged messages / messages past the window: dropped
+    - Label changes: FETCH ... CHANGEDSINCE the stored HIGHESTMODSEQ
+
+    Returns:
+        (messages fetched, whether the folder is fully synced,
+         messages that arrived since the last completed sync)
+    """
+    snapshot_at = time.time()
+    remote = await imap_service.get_folder_state(folder)
+    synced = await mailbox_store.get_folder(account_id, folder)
+
+    if synced is not None and not synced.stale and synced.state == remote:
+        await mailbox_store.save_folder_state(account_id, folder, remote, snapshot_at)
+        return 0, True, 0
+
+    arrived = 0
+    if synced is not None and synced.state.uidvalidity == remote.uidvalidity:
+        arrived = max(remote.uidnext - synced.state.uidnext, 0)
+
+    if synced is not None and synced.state.uidvalidity != remote.uidvalidity:
+        logger.info(f"UIDVALIDITY of {folder} changed for account {account_id} - resyncing")
+        await mailbox_store.clear_folder(account_id, folder)
+        synced = None
+
+    # SELECTs the folder; most recent first
+    window = (await imap_service.get_email_uids(folder))[:settings.MAILBOX_SYNC_WINDOW]
+    window_set = set(window)
+    stored = await mailbox_store.get_uids(account_id, folder)
+
+    await mailbox_store.remove_messages(account_id, folder, [uid for uid in stored if uid not in window_set])
+
+    # Labels of messages we already have; without a completed sync (or CONDSTORE)
+    # there is no MODSEQ to diff against, so all of them are re-read
+    kept = [uid for uid in window if uid in stored]
+    if kept:
+        since = None
+        if synced is not None and remote.highestmodseq is not None:
+            since = synced.state.highestmodseq
+        if since is None or since < remote.highestmodseq:
+            labels = await imap_service.get_message_labels(kept, changed_since=since)
+            current = await mailbox_store.get_messages(account_id, folder, list(labels))
+            await mailbox_store.put_messages(account_id, folder, [
+                replace(current[uid], labels=labels[uid])
+                for uid in labels
+                if uid in current and current[uid].labels != labels[uid]
+            ])
+
+    missing = [uid for uid in window if uid not in stored]
+    to_fetch = missing[:budget]
+    async for emails in imap_service.iter_emails_by_uid(to_fetch, settings.EMAIL_STREAM_CHUNK_SIZE):
+        await mailbox_store.put_messages(account_id, folder, emails)
+
+    done = len(missing) <= budget
+    if done:
+        # Only a complete copy is served
+        await mailbox_store.save_folder_state(account_id, folder, remote, snapshot_at)
+    return len(to_fetch), done, arrived
+
+
+async def _keep_lease(account_id: str, lease: str, lost: asyncio.Event):
+    """Renew the sync lease every third of its TTL; set `lost` if another sync took it"""
+    while True:
+        await asyncio.sleep(settings.MAILBOX_SYNC_LEASE / 3)
+        try:
+            if not await mailbox_store.extend_lease(account_id, lease):
+                lost.set()
+                return
+        except redis.RedisError as e:
+            # Two more tries before the lease can lapse
+            logger.warning(f"Could not renew mailbox sync lease for {account_id}: {e}")
+
+
+async def _sync_account(account_id: str, budget: int, lease: str) -> Dict[str, Any]:
+    """
+    Sync the folder list and MAILBOX_SYNC_FOLDERS of one account.
+
+    The lease is renewed before each folder and in the background while the
+    sync runs; if it is lost anyway, the sync stops before its next folder and
+    reports `lease_lost`.
+    """
+    account = await GmailAccountRepository.get_gmail_account_by_id(UUID(account_id))
+    if account is None or account.status != GmailAccountStatus.ACTIVE:
+        await mailbox_store.delete_account(account_id)
+        return {"account_id": account_id, "skipped": "inactive"}
+
+    cached = CachedAccount.from_account(account)
+    if account.is_expired or account.needs_refresh:
+        cached = await token_refresher.refresh(account)
+
+    imap_service = GmailImapService()
+    fetched = 0
+    arrived = 0
+    done = True
+    lost = asyncio.Event()
+    keeper = asyncio.create_task(_keep_lease(account_id, lease, lost))
+    try:
+        await imap_service.connect(cached.access_token, cached.email_address)
+
+        folders = await imap_service.list_folders()
+        await folder_cache.put(account_id, [{"name": f.name, "flags": f.flags} for f in folders])
+
+        for folder in settings.MAILBOX_SYNC_FOLDERS:
+            # Renewed (and ownership checked) at every folder, as IMAP calls hold the loop
+            if lost.is_set() or not await mailbox_store.extend_lease(account_id, lease):
+                logger.warning(f"Lost the mailbox sync lease of account {account_id} - stopping")
+                return {"account_id": account_id, "fetched": fetched, "lease_lost": True}
+            if fetched >= budget:
+                # Remaining folders wait for the next turn
+                done = False
+                break
+            count, folder_done, folder_arrived = await _sync_folder(imap_service, account_id, folder, budget - fetched)
+            fetched += count
+            arrived += folder_arrived
+            done = done and folder_done
+    finally:
+        keeper.cancel()
+        await imap_service.disconnect()
+
+    return {"account_id": account_id, "fetched": fetched, "arrived": arrived, "done": done}
+
+
+def node_queue(queue: str, node_id: str) -> str:
+    """A sync node's own copy of a sync queue"""
+    return f"{queue}.{node_id}"
+
+
+async def enqueue_mailbox_sync(account_id: str, interactive: bool = False, countdown: Optional[float] = None, **kwargs):
+    """
+    Queue a sync of one account on the node that owns it (consistent hashing
+    over the live sync nodes); the shared queues are used while no node is
+    registered. Interactive syncs go to their own queue.
+    """
+    queue = settings.MAILBOX_SYNC_INTERACTIVE_QUEUE if interactive else settings.MAILBOX_SYNC_PERIODIC_QUEUE
+    owner = await sync_node_registry.owner(account_id) if sync_node_registry.enabled else None
+    if owner is not None:
+        queue = node_queue(queue, owner)
+    # Publishing to the broker blocks: keep it off the event loop
+    await anyio.to_thread.run_sync(partial(
+        sync_mailbox.apply_async,
+        args=[account_id], kwargs={"interactive": interactive, **kwargs}, queue=queue, countdown=countdown
+    ))
+
+
+def requeue_node_tasks(node_id: str) -> int:
+    """
+    Move the syncs still queued for a departed node back to the shared queues,
+    where the owner check hands them to the account's new owner.
+
+    Returns:
+        Number of requeued syncs
+    """
+    requeued = 0
+    with celery_app.connection_for_write() as connection:
+        channel = connection.default_channel
+        for queue in (settings.MAILBOX_SYNC_INTERACTIVE_QUEUE, settings.MAILBOX_SYNC_PERIODIC_QUEUE):
+            private = Queue(node_queue(queue, node_id))(channel)
+            while (message := private.get(no_ack=False)) is not None:
+                args, kwargs, _ = message.decode()
+                sync_mailbox.apply_async(args=args, kwargs={**kwargs, "forwarded": False}, queue=queue)
+                message.ack()
+                requeued += 1
+    return requeued
+
+
+async def request_mailbox_sync(account_id: str, force: bool = False):
+    """
+    Ask for a prompt sync after a store miss or an API change to the mailbox.
+    Debounced per account unless `force`, and never fails the calling request.
+    """
+    if not settings.MAILBOX_SYNC_ENABLED or not mailbox_store.enabled:
+        return
+    if not await mailbox_store.claim_sync_request(account_id) and not force:
+        return
+    try:
+        await enqueue_mailbox_sync(account_id, interactive=True)
+        metrics.incr("mailbox_sync.requested")
+    except Exception as e:
+        logger.warning(f"Could not enqueue mailbox sync for {account_id}: {e}")
+
+
+async def _run_sync(account_id: str, hostname: str, interactive: bool, retried: bool, forwarded: bool) -> Dict[str, Any]:
+    """Body of sync_mailbox, run on the worker's event loop"""
+    if not mailbox_store.enabled:
+        return {"account_id": account_id, "skipped": "no store"}
+
+    # Queued before the ring changed: hand it to the current owner (once, in
+    # case this node's view of the ring is behind)
+    owner = await sync_node_registry.owner(account_id) if sync_node_registry.enabled else None
+    if owner is not None and owner != hostname and not forwarded:
+        await enqueue_mailbox_sync(account_id, interactive, retried=retried, forwarded=True)
+        return {"account_id": account_id, "skipped": "forwarded", "owner": owner}
+
+    lease = await mailbox_store.acquire_lease(account_id)
+    if lease is None:
+        if interactive and not retried:
+            # The running sync may predate the change that asked for this one
+            await enqueue_mailbox_sync(account_id, True, countdown=5, retried=True, forwarded=forwarded)
+        logger.info(f"⏭️  Mailbox {account_id} is being synced elsewhere - skipping")
+        return {"account_id": account_id, "skipped": "leased"}
+
+    started = time.monotonic()
+    try:
+        result = await _sync_account(account_id, settings.MAILBOX_SYNC_BATCH, lease)
+    except Exception as e:
+        logger.error(f"❌ Mailbox sync failed for account {account_id}: {e}")
+        await mailbox_sync_scheduler.reschedule(account_id)
+        return {"account_id": account_id, "error": str(e)}
+    finally:
+        await mailbox_store.release_lease(account_id, lease)
+
+    if result.get("skipped"):
+        # Inactive account
+        await mailbox_sync_scheduler.unschedule(account_id)
+        return result
+
+    if result.get("lease_lost"):
+        # The sync that holds the lease now finishes (and reschedules) the account
+        return result
+
+    if not result["done"]:
+        # Round-robin: continue behind the accounts already queued
+        await enqueue_mailbox_sync(account_id, interactive)
+    else:
+        result["next_sync_seconds"] = round(await mailbox_sync_scheduler.record_sync(account_id, result["arrived"]), 1)
+
+    result["duration_seconds"] = round(time.monotonic() - started, 3)
+    if result.get("fetched"):
+        logger.info(
+            f"📥 Synced {result['fetched']} message(s) for account {account_id} "
+            f"in {result['duration_seconds']}s" + ("" if result["done"] else " (more pending)")
+        )
+    return result
+
+
+@celery_app.task(name="app.tasks.mailbox_sync.sync_mailbox")
+def sync_mailbox(account_id: str, interactive: bool = False, retried: bool = False, forwarded: bool = False):
+    """
+    Celery task to pull one account's mailbox changes into the mailbox store.
+
+    Holds a per-account lease, renewed while the sync runs, so the same mailbox
+    is never synced twice at once.
+    Each run fetches at most MAILBOX_SYNC_BATCH messages; if more are pending the
+    account is re-queued at the back of its queue, so a huge mailbox takes turns
+    with the others instead of occupying a worker until it is done. A completed
+    sync schedules the account's next one on its adaptive interval.
+    """
+    return run_async(_run_sync(account_id, sync_mailbox.request.hostname, interactive, retried, forwarded))
+
+
+@celery_app.task(name="app.tasks.mailbox_sync.dispatch_mailbox_syncs")
+def dispatch_mailbox_syncs():
+    """
+    Celery Beat task: queue a periodic sync for every account whose adaptive
+    sync time has come.
+
+    Pops due accounts from the Redis schedule (no DB query), and requeues the
+    syncs stranded on departed nodes' queues; runs under a lease so dispatches
+    never overlap.
+    """
+    async def dispatch_async():
+        if not settings.MAILBOX_SYNC_ENABLED or not mailbox_store.enabled or not mailbox_sync_scheduler.enabled:
+            return {"dispatched": 0}
+
+        lease = await mailbox_store.acquire_lease(DISPATCHER_LEASE, ttl=settings.MAILBOX_SYNC_DISPATCH_LEASE)
+        if lease is None:
+            logger.info("⏭️  Mailbox sync dispatch already running - skipping")
+            return {"dispatched": 0}
+
+        dispatched = 0
+        try:
+            # Nodes that left or died may leave syncs on their own queues
+            for node_id in await sync_node_registry.pop_departed() if sync_node_registry.enabled else []:
+                requeued = await anyio.to_thread.run_sync(requeue_node_tasks, node_id)
+                logger.info(f"♻️  Sync node {node_id} departed - requeued {requeued} sync(s)")
+
+            due = await mailbox_sync_scheduler.pop_due(settings.MAILBOX_SYNC_DISPATCH_BATCH)
+            for account_id in due:
+                await enqueue_mailbox_sync(account_id)
+            dispatched = len(due)
+        finally:
+            await mailbox_store.release_lease(DISPATCHER_LEASE, lease)
+
+        if dispatched:
+            logger.info(f"📤 Queued periodic mailbox sync for {dispatched} account(s)")
+        return {"dispatched": dispatched}
+
+    return run_async(dispatch_async())
+
+
+@celery_app.task(name="app.tasks.mailbox_sync.reconcile_mailbox_sync_schedule")
+def reconcile_mailbox_sync_schedule():
+    """
+    Celery Beat task: reconcile the Redis sync schedule with the accounts table.
+
+    Adds active accounts missing from the schedule (new Redis, lost tasks)
+    without moving existing sync times, and drops ids that are no longer active.
+    """
+    async def reconcile_async():
+        if not settings.MAILBOX_SYNC_ENABLED or not mailbox_sync_scheduler.enabled:
+            return {"added": 0, "removed": 0}
+
+        active_count = 0
+        added = 0
+        removed = 0
+
+        async for rows in GmailAccountRepository.iter_account_values("id"):
+            active_count += len(rows)
+            added += await mailbox_sync_scheduler.schedule_many((str(row["id"]) for row in rows), only_missing=True)
+
+        async for scheduled in mailbox_sync_scheduler.iter_scheduled_ids():
+            active_ids = await GmailAccountRepository.get_active_ids([UUID(account_id) for account_id in scheduled])
+            stale = [account_id for account_id in scheduled if UUID(account_id) not in active_ids]
+            await mailbox_sync_scheduler.unschedule(*stale)
+            removed += len(stale)
+
+        logger.info(
+            f"🗓️  Mailbox sync schedule reconciled: {active_count} active, "
+            f"{added} added, {removed} removed"
+        )
+        return {"added": added, "removed": removed}
+
+    return run_async(reconcile_async())
+
+
+@beat_init.connect
+def _reconcile_schedule_on_beat_start(sender=None, **kwargs):
+    """Populate the sync schedule as soon as beat starts (first deploy, flushed Redis)"""
+    reconcile_mailbox_sync_schedule.delay()
+
+
+@celeryd_after_setup.connect
+def _join_sync_ring(sender, instance, **kwargs):
+    """
+    Workers consuming the periodic sync queue become sync nodes: they consume
+    their own copies of the sync queues and heartbeat into the ring.
+    """
+    if not settings.MAILBOX_SYNC_ENABLED or not sync_node_registry.enabled:
+        return
+    queues = instance.app.amqp.queues
+    if settings.MAILBOX_SYNC_PERIODIC_QUEUE not in queues.consume_from:
+        return
+    for queue in (settings.MAILBOX_SYNC_INTERACTIVE_QUEUE, settings.MAILBOX_SYNC_PERIODIC_QUEUE):
+        queues.select_add(node_queue(queue, sender))
+    sync_node_registry.join(sender)
+
+
+@worker_shutdown.connect
+def _leave_sync_ring(**kwargs):
+    # Leave right away so this node's accounts move without waiting for SYNC_NODE_TTL;
+    # the dispatcher later requeues whatever is left on its queues
+    sync_node_registry.leave()
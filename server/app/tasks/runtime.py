@@ -0,0 +1,92 @@
+# app/tasks/runtime.py
+"""
+Worker-lifetime async runtime for Celery tasks.
+Each worker process gets one event loop with Tortoise and the Redis pool
+initialized once at `worker_process_init`; tasks run their coroutines on it
+through run_async, so the DB pool, the Redis pool and the shared HTTP clients
+(bound to that loop) are reused across tasks instead of being rebuilt on every
+invocation.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Optional
+
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from tortoise import Tortoise
+
+from app.config import TORTOISE_ORM
+from app.services.default.gmail_oauth_service import gmail_oauth_service
+from app.services.default.gmail_rest_service import gmail_rest_service
+from app.services.workers.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# Process that created _loop; a forked child must build its own
+_loop_pid: Optional[int] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """The process's runtime loop, created (with Tortoise and Redis initialized) on first use"""
+    global _loop, _loop_pid
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+        asyncio.set_event_loop(_loop)
+        _loop.run_until_complete(Tortoise.init(config=TORTOISE_ORM))
+        _loop.run_until_complete(redis_pool.open())
+        logger.info(f"Initialized task runtime (event loop + ORM + Redis) in worker process {_loop_pid}")
+    return _loop
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine on the worker's long-lived event loop.
+
+    Args:
+        coro: Coroutine to run to completion
+
+    Returns:
+        The coroutine's result
+    """
+    return _get_loop().run_until_complete(coro)
+
+
+async def _close_connections():
+    await gmail_oauth_service.aclose()
+    await gmail_rest_service.aclose()
+    await redis_pool.close()
+    await Tortoise.close_connections()
+
+
+def shutdown_runtime():
+    """Close ORM, Redis and HTTP connections and the loop (worker shutdown)"""
+    global _loop, _loop_pid
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        return
+    try:
+        _loop.run_until_complete(_close_connections())
+    except Exception as e:
+        logger.warning(f"Error while closing task runtime connections: {e}")
+    finally:
+        _loop.close()
+        _loop = None
+        _loop_pid = None
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    _get_loop()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    shutdown_runtime()
+
+
+@worker_shutdown.connect
+def _shutdown_worker(**kwargs):
+    # Solo/threads pools run tasks in the main process (no worker_process_* signals)
+    shutdown_runtime()
@@ -1,142 +1,342 @@
 # app/tasks/token_refresh.py
 from app.celery_app import celery_app
+from app.tasks.runtime import run_async
+from app.config import settings
 from app.repository.gmail_account_repository import GmailAccountRepository
 from app.services.default.gmail_oauth_service import gmail_oauth_service
-from app.enums.gmail import GmailAccountStatus
+from app.services.workers.account_cache import account_cache
+from app.services.workers.token_refresher import token_refresher
+from app.services.workers.token_refresh_scheduler import token_refresh_scheduler
+from app.models.gmail_account import GmailAccount
 from datetime import datetime, timedelta, timezone  # Add timezone import
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+from celery.signals import beat_init
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(name="app.tasks.token_refresh.refresh_expiring_gmail_tokens")
-def refresh_expiring_gmail_tokens():
+def _new_token_expiry(expires_in) -> datetime:
+    """Token expiry from a token response's expires_in (seconds, or a timestamp)"""
+    if isinstance(expires_in, (int, float)) and expires_in > 1000000000:
+        # It's a timestamp - make it timezone-aware (UTC)
+        return datetime.fromtimestamp(expires_in, tz=timezone.utc)
+    # It's seconds from now - use timezone-aware datetime
+    return datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+
+
+async def _refresh_accounts(accounts: List[GmailAccount]) -> Dict[str, Any]:
     """
-    Celery task to refresh Gmail access tokens before they expire.
-    
-    This task:
-    1. Finds all Gmail accounts with tokens expiring within 15 minutes
-    2. Refreshes their access tokens using the refresh_token from meta
-    3. Updates the account with new token and expiry
-    4. Marks accounts as ERROR if refresh fails
+    Refresh the given accounts' access tokens.
+
+    - TOKEN_REFRESH_CONCURRENCY Google calls at a time
+    - New tokens committed in batches of TOKEN_REFRESH_DB_BATCH_SIZE
+    - Failed accounts marked as ERROR with one UPDATE
+
+    Returns:
+        Counts and throughput of the run
     """
-    logger.info("🔄 Starting scheduled Gmail token refresh task")
-    
-    try:
-        # Import Tortoise to ensure DB connection
-        from tortoise import Tortoise
-        import asyncio
-        
-        # Initialize Tortoise if not already initialized
-        async def refresh_tokens_async():
-            # Check if Tortoise is already initialized
-            try:
-                await Tortoise.get_connection("default")
-            except Exception:
-                # Initialize Tortoise for this task
-                from app.config import TORTOISE_ORM
-                await Tortoise.init(config=TORTOISE_ORM)
-            
+    started = time.monotonic()
+
+    semaphore = asyncio.Semaphore(settings.TOKEN_REFRESH_CONCURRENCY)
+    commit_lock = asyncio.Lock()
+    # Refreshed accounts (and their refresh lock tokens) waiting to be committed
+    pending: List[Tuple[GmailAccount, str]] = []
+    # Every refresh lock this run holds (account id -> lock token), renewed by keep_locks
+    held: Dict[str, str] = {}
+    error_accounts: List[GmailAccount] = []
+    counts = {"refreshed": 0, "failed": 0, "skipped": 0}
+
+    async def commit_pending():
+        async with commit_lock:
+            batch = pending[:]
+            pending.clear()
+            if not batch:
+                return
             try:
-                # Get accounts expiring within 15 minutes
-                expiring_accounts = await GmailAccountRepository.get_expiring_accounts(minutes=15)
-                
-                if not expiring_accounts:
-                    logger.info("✅ No Gmail accounts need token refresh")
-                    return {"refreshed": 0, "failed": 0, "skipped": 0}
-                
-                logger.info(f"📧 Found {len(expiring_accounts)} Gmail account(s) needing token refresh")
-                
-                refreshed_count = 0
-                failed_count = 0
-                skipped_count = 0
-                
-                for account in expiring_accounts:
-                    try:
-                        # Get refresh token from meta
-                        refresh_token = account.get_refresh_token
-                        
-                        if not refresh_token:
-                            logger.warning(
-                                f"⚠️  Account {account.email_address} (ID: {account.id}) "
-                                "has no refresh token - skipping"
-                            )
-                            skipped_count += 1
-                            # Mark as error since we can't refresh
-                            await GmailAccountRepository.mark_as_error(account)
-                            continue
-                        
-                        logger.info(
-                            f"🔄 Refreshing token for account: {account.email_address} "
-                            f"(expires: {account.token_expiry})"
-                        )
-                        
-                        # Refresh the access token
-                        token_data = gmail_oauth_service.refresh_auth_access_token(refresh_token)
-                        
-                        # Calculate new expiry - use timezone-aware datetime
-                        expires_in = token_data.get('expires_in', 3600)
-                        # Handle both timestamp and seconds format
-                        if isinstance(expires_in, (int, float)) and expires_in > 1000000000:
-                            # It's a timestamp - make it timezone-aware (UTC)
-                            new_token_expiry = datetime.fromtimestamp(expires_in, tz=timezone.utc)
-                        else:
-                            # It's seconds from now - use timezone-aware datetime
-                            new_token_expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-                        
-                        # Update meta with new access token (keep refresh_token)
-                        new_meta = account.meta.copy()
-                        new_meta['access_token'] = token_data['access_token']
-                        new_meta['scope'] = token_data.get('scope', new_meta.get('scope', ''))
-                        new_meta['token_type'] = token_data.get('token_type', 'Bearer')
-                        
-                        # Update account
-                        await GmailAccountRepository.update_tokens(
-                            account=account,
-                            new_meta=new_meta,
-                            token_expiry=new_token_expiry
-                        )
-                        
-                        refreshed_count += 1
-                        logger.info(
-                            f"✅ Successfully refreshed token for {account.email_address} "
-                            f"(new expiry: {new_token_expiry})"
-                        )
-                        
-                    except Exception as e:
-                        logger.error(
-                            f"❌ Failed to refresh token for account {account.email_address} "
-                            f"(ID: {account.id}): {e}",
-                            exc_info=True
-                        )
-                        failed_count += 1
-                        # Mark account as error
-                        try:
-                            await GmailAccountRepository.mark_as_error(account)
-                        except Exception as mark_error:
-                            logger.error(f"Failed to mark account as error: {mark_error}")
-                
-                result = {
-                    "refreshed": refreshed_count,
-                    "failed": failed_count,
-                    "skipped": skipped_count,
-                    "total": len(expiring_accounts)
-                }
-                
-                logger.info(
-                    f"✅ Token refresh task completed: "
-                    f"{refreshed_count} refreshed, {failed_count} failed, "
-                    f"{skipped_count} skipped"
+                await GmailAccountRepository.bulk_update_tokens(
+                    [account for account, _ in batch],
+                    batch_size=settings.TOKEN_REFRESH_DB_BATCH_SIZE
+                )
+                counts["refreshed"] += len(batch)
+            except Exception as e:
+                # Accounts stay ACTIVE with their old expiry: put them back on the schedule
+                logger.error(f"❌ Failed to commit {len(batch)} refreshed token(s): {e}", exc_info=True)
+                counts["failed"] += len(batch)
+                await token_refresh_scheduler.schedule_many(
+                    (str(account.id), datetime.now(timezone.utc)) for account, _ in batch
                 )
-                
-                return result
-                
             finally:
-                # Close Tortoise connections
-                await Tortoise.close_connections()
-        
-        return asyncio.run(refresh_tokens_async())
-            
+                # Locks are held until the new tokens are visible to API workers
+                for account, _ in batch:
+                    held.pop(str(account.id), None)
+                await token_refresher.release_locks((str(account.id), lock_token) for account, lock_token in batch)
+
+    async def keep_locks():
+        # A batch can take longer than one lock TTL to fill and commit
+        while True:
+            await asyncio.sleep(token_refresher.lock_ttl / 3)
+            await token_refresher.extend_locks(list(held.items()))
+
+    async def release(account: GmailAccount, lock_token: str):
+        held.pop(str(account.id), None)
+        await token_refresher.release_lock(str(account.id), lock_token)
+
+    async def refresh_with_google(account: GmailAccount, refresh_token: str):
+        # Shared with on-demand refreshes in the API: skip accounts being refreshed there
+        lock_token = await token_refresher.acquire_lock(str(account.id))
+        if lock_token is None:
+            logger.info(f"⏭️  Token for {account.email_address} is being refreshed elsewhere - skipping")
+            counts["skipped"] += 1
+            return
+        held[str(account.id)] = lock_token
+
+        # Skip if it was refreshed since we loaded it (every refresh writes through the cache)
+        cached = await account_cache.get(str(account.id), use_local=False)
+        if cached is not None and cached.token_expiry > account.token_expiry:
+            await release(account, lock_token)
+            counts["skipped"] += 1
+            return
+
+        try:
+            token_data = await gmail_oauth_service.refresh_auth_access_token_async(refresh_token)
+        except Exception as e:
+            await release(account, lock_token)
+            logger.error(
+                f"❌ Failed to refresh token for account {account.email_address} "
+                f"(ID: {account.id}): {e}"
+            )
+            counts["failed"] += 1
+            # Mark account as error
+            error_accounts.append(account)
+            return
+
+        # Update meta with new access token (keep refresh_token)
+        new_meta = account.meta.copy()
+        new_meta['access_token'] = token_data['access_token']
+        new_meta['scope'] = token_data.get('scope', new_meta.get('scope', ''))
+        new_meta['token_type'] = token_data.get('token_type', 'Bearer')
+        account.meta = new_meta
+        account.token_expiry = _new_token_expiry(token_data.get('expires_in', 3600))
+        pending.append((account, lock_token))
+
+    async def refresh_account(account: GmailAccount):
+        # Get refresh token from meta
+        refresh_token = account.get_refresh_token
+
+        if not refresh_token:
+            logger.warning(
+                f"⚠️  Account {account.email_address} (ID: {account.id}) "
+                "has no refresh token - skipping"
+            )
+            counts["skipped"] += 1
+            # Mark as error since we can't refresh
+            error_accounts.append(account)
+            return
+
+        async with semaphore:
+            await refresh_with_google(account, refresh_token)
+
+        if len(pending) >= settings.TOKEN_REFRESH_DB_BATCH_SIZE:
+            await commit_pending()
+
+    keeper = asyncio.create_task(keep_locks())
+    try:
+        await asyncio.gather(*(refresh_account(account) for account in accounts))
+        await commit_pending()
+    finally:
+        keeper.cancel()
+
+    if error_accounts:
+        try:
+            await GmailAccountRepository.bulk_mark_as_error([account.id for account in error_accounts])
+        except Exception as mark_error:
+            logger.error(f"Failed to mark accounts as error: {mark_error}")
+
+    duration = time.monotonic() - started
+    result = {
+        **counts,
+        "total": len(accounts),
+        "duration_seconds": round(duration, 3),
+        "accounts_per_second": round(len(accounts) / duration, 1) if duration > 0 else None
+    }
+
+    logger.info(
+        f"✅ Token refresh task completed in {duration:.2f}s "
+        f"({result['accounts_per_second']} accounts/s): "
+        f"{counts['refreshed']} refreshed, {counts['failed']} failed, "
+        f"{counts['skipped']} skipped"
+    )
+
+    return result
+
+
+@celery_app.task(name="app.tasks.token_refresh.refresh_expiring_gmail_tokens")
+def refresh_expiring_gmail_tokens():
+    """
+    Celery task to refresh every Gmail access token expiring within 15 minutes.
+
+    Full table scan: the beat schedule uses dispatch_token_refreshes instead, and
+    only falls back to this when the Redis refresh schedule is unavailable.
+    """
+    logger.info("🔄 Starting Gmail token refresh scan")
+
+    async def refresh_tokens_async():
+        totals = {"refreshed": 0, "failed": 0, "skipped": 0, "total": 0}
+        started = time.monotonic()
+
+        # Accounts expiring within 15 minutes, one batch in memory at a time
+        async for batch in GmailAccountRepository.iter_expiring_accounts(
+            minutes=15, batch_size=settings.TOKEN_REFRESH_DB_BATCH_SIZE
+        ):
+            logger.info(f"📧 Refreshing a batch of {len(batch)} Gmail account(s)")
+            result = await _refresh_accounts(batch)
+            for key in totals:
+                totals[key] += result[key]
+
+        if not totals["total"]:
+            logger.info("✅ No Gmail accounts need token refresh")
+            return totals
+
+        duration = time.monotonic() - started
+        totals["duration_seconds"] = round(duration, 3)
+        totals["accounts_per_second"] = round(totals["total"] / duration, 1) if duration > 0 else None
+        logger.info(
+            f"✅ Token refresh scan completed in {duration:.2f}s: {totals['refreshed']} refreshed, "
+            f"{totals['failed']} failed, {totals['skipped']} skipped"
+        )
+        return totals
+
+    try:
+        return run_async(refresh_tokens_async())
     except Exception as e:
         logger.error(f"❌ Token refresh task failed with error: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+
+@celery_app.task(name="app.tasks.token_refresh.refresh_gmail_tokens")
+def refresh_gmail_tokens(account_ids: List[str]):
+    """
+    Celery task to refresh the access tokens of accounts popped from the refresh schedule.
+
+    Accounts that no longer need a refresh (refreshed on demand in the meantime)
+    are put back on the schedule.
+    """
+    async def refresh_tokens_async():
+        ids = [UUID(account_id) for account_id in account_ids]
+        accounts = await GmailAccountRepository.get_expiring_accounts_by_ids(ids, minutes=15)
+
+        due_ids = {account.id for account in accounts}
+        not_due = [account_id for account_id in ids if account_id not in due_ids]
+        if not_due:
+            # Still-active accounts keep their place on the schedule
+            await token_refresh_scheduler.schedule_many(
+                await GmailAccountRepository.get_active_token_expiries(not_due)
+            )
+
+        if not accounts:
+            return {"refreshed": 0, "failed": 0, "skipped": len(ids)}
+        result = await _refresh_accounts(accounts)
+        result["skipped"] += len(not_due)
+        result["total"] = len(ids)
+        return result
+
+    try:
+        return run_async(refresh_tokens_async())
+    except Exception as e:
+        logger.error(f"❌ Token refresh of {len(account_ids)} account(s) failed: {e}", exc_info=True)
+        # Put them back so the next dispatch retries them
+        run_async(token_refresh_scheduler.schedule_many(
+            (account_id, datetime.now(timezone.utc)) for account_id in account_ids
+        ))
+        raise
+
+
+@celery_app.task(name="app.tasks.token_refresh.dispatch_token_refreshes")
+def dispatch_token_refreshes():
+    """
+    Celery Beat task: enqueue refreshes for accounts whose deadline has passed.
+
+    Pops due entries from the Redis refresh schedule under a lease (so runs
+    never overlap) and enqueues refresh_gmail_tokens per TOKEN_REFRESH_DISPATCH_BATCH
+    accounts. Doesn't touch the database.
+    """
+    async def dispatch_async():
+        if not token_refresh_scheduler.enabled:
+            return None
+
+        lease = await token_refresh_scheduler.acquire_lease()
+        if lease is None:
+            logger.info("⏭️  Token refresh dispatch already running - skipping")
+            return {"dispatched": 0, "tasks": 0}
+
+        dispatched = 0
+        tasks = 0
+        try:
+            while True:
+                due = await token_refresh_scheduler.pop_due(settings.TOKEN_REFRESH_DISPATCH_BATCH)
+                if not due:
+                    break
+                refresh_gmail_tokens.delay(due)
+                dispatched += len(due)
+                tasks += 1
+        finally:
+            await token_refresh_scheduler.release_lease(lease)
+
+        if dispatched:
+            logger.info(f"📤 Dispatched token refresh for {dispatched} account(s) in {tasks} task(s)")
+        return {"dispatched": dispatched, "tasks": tasks}
+
+    result = run_async(dispatch_async())
+    if result is None:
+        logger.warning("Token refresh schedule unavailable - falling back to a table scan")
+        return refresh_expiring_gmail_tokens()
+    return result
+
+
+@celery_app.task(name="app.tasks.token_refresh.sync_token_refresh_schedule")
+def sync_token_refresh_schedule():
+    """
+    Celery Beat task: reconcile the Redis refresh schedule with the accounts table.
+
+    Adds active accounts missing from the schedule (new Redis, lost dispatches)
+    without moving existing deadlines, and drops ids that are no longer active.
+    """
+    async def sync_async():
+        if not token_refresh_scheduler.enabled:
+            return {"added": 0, "removed": 0}
+
+        active_count = 0
+        added = 0
+        removed = 0
+
+        # Add active accounts that are missing, keeping existing deadlines
+        async for rows in GmailAccountRepository.iter_account_values("id", "token_expiry"):
+            active_count += len(rows)
+            added += await token_refresh_scheduler.schedule_many(
+                ((str(row["id"]), row["token_expiry"]) for row in rows), only_missing=True
+            )
+
+        # Drop scheduled ids that are no longer active
+        async for scheduled in token_refresh_scheduler.iter_scheduled_ids():
+            active_ids = await GmailAccountRepository.get_active_ids([UUID(account_id) for account_id in scheduled])
+            stale = [account_id for account_id in scheduled if UUID(account_id) not in active_ids]
+            await token_refresh_scheduler.unschedule(*stale)
+            removed += len(stale)
+
+        logger.info(
+            f"🗓️  Token refresh schedule synced: {active_count} active, "
+            f"{added} added, {removed} removed"
+        )
+        return {"added": added, "removed": removed}
+
+    return run_async(sync_async())
+
+
+@beat_init.connect
+def _sync_schedule_on_beat_start(sender=None, **kwargs):
+    """Populate the refresh schedule as soon as beat starts (first deploy, flushed Redis)"""
+    sync_token_refresh_schedule.delay()
@@ -0,0 +1,54 @@
+"""
+Benchmark: compressing an HTML-heavy email list page.
+
+Reports size, ratio and CPU time per codec and level for the orjson-encoded
+page the list endpoints send, to tune COMPRESSION_* settings.
+
+Usage (from server/):
+    python -m benchmarks.compression
+"""
+
+import time
+import zlib
+
+import orjson
+
+from app.api.router.imap import email_to_dict
+from app.api.utils.compression import brotli, zstandard
+from benchmarks.response_encoding import build_page
+
+
+REPEAT = 5
+
+
+def _cases():
+    yield "gzip -1", lambda body: zlib.compress(body, 1, wbits=31)
+    yield "gzip -6", lambda body: zlib.compress(body, 6, wbits=31)
+    if brotli is not None:
+        yield "brotli q4", lambda body: brotli.compress(body, quality=4)
+        yield "brotli q5", lambda body: brotli.compress(body, quality=5)
+    if zstandard is not None:
+        yield "zstd 1", zstandard.ZstdCompressor(level=1).compress
+        yield "zstd 3", zstandard.ZstdCompressor(level=3).compress
+
+
+def _cpu_time(func, body) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.thread_time()
+        func(body)
+        best = min(best, time.thread_time() - started)
+    return best
+
+
+def main():
+    body = orjson.dumps([email_to_dict(e) for e in build_page()])
+    print(f"page body {len(body) / 1024:.1f} KiB")
+    for name, func in _cases():
+        size = len(func(body))
+        elapsed = _cpu_time(func, body)
+        print(f"  {name:<12} {size / 1024:9.1f} KiB  ratio {len(body) / size:6.1f}x  {elapsed * 1000:8.2f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Microbenchmark: per-message header cleaning vs HeaderBatchCleaner.
+
+Builds a realistic fetch page (200 messages, a few dozen distinct senders,
+mostly plain ASCII headers with some RFC 2047 encoded names and subjects)
+and times both paths.
+
+Usage (from server/):
+    python -m benchmarks.header_cleaning
+"""
+
+import base64
+import email
+import random
+import timeit
+from email.message import Message
+from typing import List
+
+from app.api.utils.email_cleaner import EmailCleaner
+
+
+PAGE_SIZE = 200
+REPEAT = 20
+
+
+def _encoded(text: str) -> str:
+    return f"=?UTF-8?B?{base64.b64encode(text.encode('utf-8')).decode('ascii')}?="
+
+
+def build_page(seed: int = 42) -> List[Message]:
+    """Build a fetch page with repeating senders and recipients"""
+    rng = random.Random(seed)
+
+    senders = [f"Sender {i} <news{i}@shop{i % 7}.example.com>" for i in range(30)]
+    senders += [f"{_encoded(f'Société {i}')} <hello@brand{i}.example.fr>" for i in range(5)]
+    senders += ["notifications@github.com", '"Calendar" <calendar-notification@google.com>']
+    recipients = ["Me <me@example.com>", "team-list@lists.example.com"]
+
+    messages = []
+    for i in range(PAGE_SIZE):
+        if rng.random() < 0.1:
+            subject = _encoded(f"Réduction {i}% — offre spéciale")
+        else:
+            subject = rng.choice(["Your weekly digest", "Order shipped", "Re: meeting notes", f"Invoice #{i}"])
+        raw = (
+            f"From: {rng.choice(senders)}\r\n"
+            f"To: {rng.choice(recipients)}\r\n"
+            f"Subject: {subject}\r\n"
+            f"Date: Mon, {1 + i % 28} Sep 2025 10:{i % 60:02d}:00 +0000\r\n"
+            f"Message-ID: <{i}@example.com>\r\n"
+            "\r\n"
+            "body\r\n"
+        )
+        messages.append(email.message_from_string(raw))
+    return messages
+
+
+def clean_per_message(messages: List[Message]):
+    """Previous path: full RFC 2047 decode and parse for every header of every message"""
+    results = []
+    for msg in messages:
+        subject = EmailCleaner.clean_subject(_legacy_decode(msg.get('Subject', '')))
+        from_addr = EmailCleaner.extract_email_address(_legacy_decode(msg.get('From', '')))
+        to_addrs = [EmailCleaner.extract_email_address(_legacy_decode(a)) for a in msg.get_all('To', [])]
+        date = EmailCleaner.clean_date(msg.get('Date', ''))
+        results.append((subject, from_addr, to_addrs, date))
+    return results
+
+
+def _legacy_decode(header) -> str:
+    from email.header import decode_header
+    if not header:
+        return ''
+    decoded_str = ''
+    for part, encoding in decode_header(header):
+        if isinstance(part, bytes):
+            decoded_str += part.decode(encoding or 'utf-8', errors='ignore')
+        else:
+            decoded_str += part
+    return decoded_str
+
+
+def clean_batch(messages: List[Message]):
+    """New path: one HeaderBatchCleaner per page"""
+    return EmailCleaner.clean_headers_batch(messages)
+
+
+def main():
+    messages = build_page()
+
+    # Both paths must agree
+    legacy = clean_per_message(messages)
+    batch = clean_batch(messages)
+    for old, new in zip(legacy, batch):
+        assert old == (new.subject, new.from_address, new.to_addresses, new.date), (old, new)
+
+    per_message = min(timeit.repeat(lambda: clean_per_message(messages), number=1, repeat=REPEAT))
+    batched = min(timeit.repeat(lambda: clean_batch(messages), number=1, repeat=REPEAT))
+
+    print(f"page of {len(messages)} messages")
+    print(f"  per-message: {per_message * 1000:8.2f} ms")
+    print(f"  batch:       {batched * 1000:8.2f} ms")
+    print(f"  speedup:     {per_message / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
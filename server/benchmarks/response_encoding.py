@@ -0,0 +1,99 @@
+"""
+Benchmark: per-page serialisation cost of the email list endpoints.
+
+Compares the previous path (build EmailResponse models, let FastAPI re-validate
+them against response_model, jsonable_encoder + json.dumps) with the current
+one (server-built dicts encoded directly by orjson / MessagePack).
+
+Usage (from server/):
+    python -m benchmarks.response_encoding
+"""
+
+import json
+import random
+import timeit
+from typing import List
+
+import msgpack
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.api.router.imap import EmailResponse, email_to_dict, parse_email_fields
+from app.services.base.imap_service import EmailMessage
+
+
+PAGE_SIZE = 200
+REPEAT = 10
+LIST_FIELDS = "uid,subject,from,date,labels,preview"
+
+
+def build_page(seed: int = 7) -> List[EmailMessage]:
+    """Build a page of parsed messages with HTML-heavy bodies"""
+    rng = random.Random(seed)
+    html_block = '<tr><td class="cell" style="padding:4px">Offer item &amp; details</td></tr>'
+    page = []
+    for i in range(PAGE_SIZE):
+        body_html = "<table>" + html_block * rng.randint(50, 400) + "</table>"
+        page.append(EmailMessage(
+            uid=10_000 + i,
+            subject=f"Weekly deals #{i}",
+            from_address=f"news{i % 20}@shop.example.com",
+            to_addresses=["me@example.com"],
+            date="2025-09-01T10:00:00+00:00",
+            body_text="Offer item details " * rng.randint(20, 200),
+            body_html=body_html,
+            labels=["Promotions"],
+            attachments=[],
+            message_id=f"<{i}@example.com>",
+            preview="Offer item details " * 10,
+        ))
+    return page
+
+
+# Mirrors FastAPI's serialize_response for a List[EmailResponse] response_model
+_response_adapter = TypeAdapter(List[EmailResponse])
+
+
+def encode_previous(page: List[EmailMessage]) -> bytes:
+    models = [EmailResponse(**email_to_dict(e)) for e in page]
+    validated = _response_adapter.validate_python(models, from_attributes=True)
+    content = jsonable_encoder(_response_adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_orjson(page: List[EmailMessage], fields=None) -> bytes:
+    return orjson.dumps([email_to_dict(e, fields) for e in page])
+
+
+def encode_msgpack(page: List[EmailMessage], fields=None) -> bytes:
+    return msgpack.packb([email_to_dict(e, fields) for e in page], use_bin_type=True)
+
+
+def _time(func) -> float:
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    page = build_page()
+    fields = parse_email_fields(LIST_FIELDS)
+
+    cases = [
+        ("pydantic + json (previous)", lambda: encode_previous(page)),
+        ("orjson, full", lambda: encode_orjson(page)),
+        ("msgpack, full", lambda: encode_msgpack(page)),
+        (f"orjson, fields={LIST_FIELDS}", lambda: encode_orjson(page, fields)),
+        (f"msgpack, fields={LIST_FIELDS}", lambda: encode_msgpack(page, fields)),
+    ]
+
+    baseline = None
+    print(f"page of {len(page)} messages")
+    for name, func in cases:
+        size = len(func())
+        elapsed = _time(func)
+        baseline = baseline or elapsed
+        print(f"  {name:<52} {elapsed * 1000:8.2f} ms  {size / 1024:9.1f} KiB  {baseline / elapsed:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
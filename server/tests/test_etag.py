@@ -0,0 +1,28 @@
+from fastapi.responses import Response, StreamingResponse
+
+from app.api.utils.etag import add_vary, not_modified, set_etag
+
+
+def _vary(response: Response):
+    return [v.strip() for v in response.headers["vary"].split(",")]
+
+
+def test_streamed_response_varies_on_negotiated_headers():
+    response = set_etag(StreamingResponse(iter([b"{}\n"]), media_type="application/x-ndjson"), 'W/"1"')
+    assert response.headers["etag"] == 'W/"1"'
+    assert _vary(response) == ["Accept", "Accept-Encoding"]
+
+
+def test_vary_is_merged_without_duplicates():
+    response = Response(headers={"Vary": "accept, Origin"})
+    set_etag(response, 'W/"1"')
+    add_vary(response.headers, "Accept-Encoding")
+    assert _vary(response) == ["accept", "Origin", "Accept-Encoding"]
+
+
+def test_not_modified_carries_the_same_vary():
+    assert _vary(not_modified('W/"1"')) == ["Accept", "Accept-Encoding"]
+
+
+def test_no_etag_leaves_headers_alone():
+    assert "vary" not in set_etag(Response(), None).headers
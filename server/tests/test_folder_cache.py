@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from app.services.base.imap_service import FolderInfo
+from app.services.workers import folder_cache as folder_cache_module
+from app.services.workers.account_cache import CachedAccount
+from app.services.workers.folder_cache import FolderCache
+
+
+class FakeImapService:
+    """Blocking IMAP stand-in that records the thread each call runs on"""
+
+    threads = []
+
+    def __init__(self):
+        self.client = None
+
+    async def connect(self, access_token, email_address):
+        self.threads.append(threading.get_ident())
+        self.client = object()
+        return True
+
+    async def list_folders(self):
+        self.threads.append(threading.get_ident())
+        return [FolderInfo(name="INBOX", flags=["\\HasNoChildren"], delimiter="/")]
+
+    async def disconnect(self):
+        self.threads.append(threading.get_ident())
+        self.client = None
+
+
+class FakeLabelCache:
+    def __init__(self):
+        self.labels = {}
+
+    async def set_labels(self, account_id, labels):
+        self.labels[account_id] = list(labels)
+        return True
+
+
+def test_listing_runs_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(folder_cache_module, "GmailImapService", FakeImapService)
+    account = CachedAccount(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        email_address="alice@example.com",
+        access_token="token",
+        token_expiry=datetime.now(timezone.utc),
+        status=None,
+    )
+    label_cache = FakeLabelCache()
+
+    async def run():
+        return threading.get_ident(), await FolderCache().get_folders(account, label_cache)
+
+    loop_thread, folders = asyncio.run(run())
+
+    assert folders == [{"name": "INBOX", "flags": ["\\HasNoChildren"]}]
+    assert len(FakeImapService.threads) == 3
+    assert loop_thread not in FakeImapService.threads
+    assert label_cache.labels == {str(account.id): ["INBOX"]}
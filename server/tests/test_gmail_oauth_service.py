@@ -0,0 +1,86 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app.api.utils.http_client import PooledHttpClient
+from app.services.default.gmail_oauth_service import GmailOAuthService
+
+
+class FakeTokenEndpoint:
+    """Stand-in for Google's token endpoint: replays `responses`, records requests"""
+
+    def __init__(self, *responses: httpx.Response):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append({k: v[0] for k, v in parse_qs(request.content.decode()).items()})
+        return self.responses.pop(0)
+
+
+def _service(endpoint: FakeTokenEndpoint) -> GmailOAuthService:
+    service = GmailOAuthService()
+    service.client_id, service.client_secret = "client-id", "client-secret"
+    service.redirect_uri = "https://app.example/callback"
+    service.token_uri = "https://oauth2.example/token"
+    service.http = PooledHttpClient(timeout=5, retries=2, backoff=0, transport=httpx.MockTransport(endpoint))
+    return service
+
+
+def test_refresh_posts_refresh_grant():
+    endpoint = FakeTokenEndpoint(httpx.Response(200, json={"access_token": "new", "expires_in": 3599, "scope": "mail"}))
+    token = asyncio.run(_service(endpoint).refresh_auth_access_token_async("refresh-1"))
+
+    assert token == {"access_token": "new", "expires_in": 3599, "scope": "mail", "token_type": "Bearer"}
+    assert endpoint.requests == [{
+        "grant_type": "refresh_token",
+        "refresh_token": "refresh-1",
+        "client_id": "client-id",
+        "client_secret": "client-secret",
+    }]
+
+
+def test_refresh_retries_server_errors():
+    endpoint = FakeTokenEndpoint(
+        httpx.Response(503),
+        httpx.Response(429, json={"error": "rate_limited"}),
+        httpx.Response(200, json={"access_token": "new"}),
+    )
+    token = asyncio.run(_service(endpoint).refresh_auth_access_token_async("refresh-1"))
+
+    assert token["access_token"] == "new"
+    assert token["expires_in"] == 3600
+    assert len(endpoint.requests) == 3
+
+
+def test_refresh_error_is_reported_without_retry():
+    endpoint = FakeTokenEndpoint(
+        httpx.Response(400, json={"error": "invalid_grant", "error_description": "Token has been revoked."})
+    )
+    with pytest.raises(ValueError, match="invalid_grant: Token has been revoked."):
+        asyncio.run(_service(endpoint).refresh_auth_access_token_async("revoked"))
+    assert len(endpoint.requests) == 1
+
+
+def test_exchange_posts_authorization_code_grant():
+    endpoint = FakeTokenEndpoint(httpx.Response(200, json={
+        "access_token": "access", "refresh_token": "refresh", "expires_in": 3599, "scope": "mail",
+    }))
+    token = asyncio.run(_service(endpoint).exchange_tokens_async("code-1"))
+
+    assert token == {
+        "access_token": "access", "refresh_token": "refresh", "expires_in": 3599,
+        "scope": "mail", "token_type": "Bearer",
+    }
+    assert endpoint.requests[0]["grant_type"] == "authorization_code"
+    assert endpoint.requests[0]["code"] == "code-1"
+    assert endpoint.requests[0]["redirect_uri"] == "https://app.example/callback"
+
+
+def test_exchange_never_resends_the_single_use_code():
+    endpoint = FakeTokenEndpoint(httpx.Response(503), httpx.Response(200, json={"access_token": "late"}))
+    with pytest.raises(ValueError, match="Failed to exchange authorization code"):
+        asyncio.run(_service(endpoint).exchange_tokens_async("code-1"))
+    assert len(endpoint.requests) == 1
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import random
+import re
+
+import httpx
+import pytest
+
+from app.api.utils.http_client import PooledHttpClient
+from app.services.base.gmail_rest_service import BatchRequest
+from app.services.default.gmail_rest_service import GmailRestService
+
+BASE_URL = "https://gmail.example"
+
+
+class FakeGmail:
+    """
+    Stand-in for the Gmail API: parses multipart /batch calls like Gmail does
+    and answers every sub-request through `handle(method, path, body)`, with the
+    parts in shuffled order (clients must match them by Content-ID).
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.batches = []
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"] == "Bearer token"
+        if request.url.path == "/batch/gmail/v1":
+            return self._batch(request)
+        body = json.loads(request.content) if request.content else None
+        self.calls.append((request.method, request.url.path, body))
+        status, payload = self.handle(request.method, request.url.path, body)
+        return httpx.Response(status, json=payload)
+
+    def _batch(self, request: httpx.Request) -> httpx.Response:
+        boundary = re.search(r"boundary=(\S+)", request.headers["content-type"]).group(1)
+        parts = request.content.decode().split(f"--{boundary}")
+        assert parts[-1].strip() == "--"
+
+        sub_requests = []
+        for part in parts[1:-1]:
+            outer, inner = part.strip("\r\n").split("\r\n\r\n", 1)
+            content_id = re.search(r"Content-ID: <item(\d+)>", outer).group(1)
+            request_line, _, rest = inner.partition("\r\n")
+            method, path, _ = request_line.split(" ")
+            body = rest.split("\r\n\r\n", 1)[1] if "Content-Type: application/json" in rest else ""
+            sub_requests.append((content_id, method, path, json.loads(body) if body.strip() else None))
+        self.batches.append(sub_requests)
+
+        shuffled = list(sub_requests)
+        random.Random(len(self.batches)).shuffle(shuffled)
+        out = []
+        for content_id, method, path, body in shuffled:
+            status, payload = self.handle(method, path, body)
+            out.append("\r\n".join([
+                "--batch_response",
+                "Content-Type: application/http",
+                f"Content-ID: <response-item{content_id}>",
+                "",
+                f"HTTP/1.1 {status} X",
+                "Content-Type: application/json; charset=UTF-8",
+                "",
+                json.dumps(payload) if payload is not None else "",
+            ]))
+        out.append("--batch_response--")
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "multipart/mixed; boundary=batch_response"},
+            content="\r\n".join(out).encode(),
+        )
+
+
+def _service(gmail: FakeGmail, batch_size: int = 100) -> GmailRestService:
+    service = GmailRestService()
+    service.base_url = BASE_URL
+    service.batch_size = batch_size
+    service.http = PooledHttpClient(timeout=5, retries=2, backoff=0, transport=httpx.MockTransport(gmail))
+    return service
+
+
+def _labels_create(method, path, body):
+    assert (method, path) == ("POST", "/gmail/v1/users/me/labels")
+    if body["name"].startswith("taken"):
+        return 409, {"error": {"code": 409, "message": "Label name exists or conflicts"}}
+    return 200, {"id": f"Label_{body['name']}", "name": body["name"]}
+
+
+def test_batch_encodes_sub_requests_and_matches_responses_by_content_id():
+    gmail = FakeGmail(_labels_create)
+    labels = [{"name": f"label-{i}"} for i in range(5)] + [{"name": "taken"}]
+
+    results = asyncio.run(_service(gmail).create_labels("token", labels))
+
+    assert [(method, path, body) for _, method, path, body in gmail.batches[0]] == [
+        ("POST", "/gmail/v1/users/me/labels", label) for label in labels
+    ]
+    assert [result.body["name"] for result in results[:5]] == [f"label-{i}" for i in range(5)]
+    assert all(result.ok and result.status == 200 for result in results[:5])
+    assert results[5].status == 409 and not results[5].ok
+    assert results[5].body["error"]["message"] == "Label name exists or conflicts"
+
+
+def test_body_less_sub_requests_and_empty_responses():
+    gmail = FakeGmail(lambda method, path, body: (204, None))
+    requests = [BatchRequest(method="DELETE", path=f"/labels/Label_{i}") for i in range(3)]
+
+    results = asyncio.run(_service(gmail).batch("token", requests))
+
+    assert [body for _, _, _, body in gmail.batches[0]] == [None, None, None]
+    assert [(result.status, result.body) for result in results] == [(204, None)] * 3
+
+
+def test_batch_splits_into_calls_of_batch_size():
+    gmail = FakeGmail(_labels_create)
+    labels = [{"name": f"label-{i}"} for i in range(250)]
+
+    results = asyncio.run(_service(gmail).create_labels("token", labels))
+
+    assert [len(batch) for batch in gmail.batches] == [100, 100, 50]
+    assert [result.body["name"] for result in results] == [label["name"] for label in labels]
+
+
+def test_rate_limited_sub_requests_are_retried_alone():
+    attempts = {}
+
+    def flaky(method, path, body):
+        attempts[body["name"]] = attempts.get(body["name"], 0) + 1
+        if body["name"] == "busy" and attempts["busy"] == 1:
+            return 429, {"error": {"code": 429, "message": "Too many concurrent requests"}}
+        return _labels_create(method, path, body)
+
+    gmail = FakeGmail(flaky)
+    results = asyncio.run(_service(gmail).create_labels("token", [{"name": "a"}, {"name": "busy"}, {"name": "b"}]))
+
+    assert [len(batch) for batch in gmail.batches] == [3, 1]
+    assert gmail.batches[1][0][3] == {"name": "busy"}
+    assert [result.status for result in results] == [200, 200, 200]
+
+
+def test_missing_sub_response_is_reported_per_request():
+    gmail = FakeGmail(_labels_create)
+    service = _service(gmail)
+    response = httpx.Response(
+        200,
+        headers={"Content-Type": 'multipart/mixed; boundary="b"'},
+        content=(
+            b"--b\r\nContent-Type: application/http\r\nContent-ID: <response-item1>\r\n\r\n"
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{\"id\": \"1\"}\r\n--b--"
+        ),
+    )
+
+    results = service._decode_batch(response, 2)
+
+    assert results[0].status == 500
+    assert (results[1].status, results[1].body) == (200, {"id": "1"})
+
+
+def test_failed_batch_call_raises():
+    def handler(request):
+        return httpx.Response(401, json={"error": {"message": "Invalid Credentials"}})
+
+    service = GmailRestService()
+    service.base_url = BASE_URL
+    service.http = PooledHttpClient(timeout=5, retries=0, transport=httpx.MockTransport(handler))
+
+    with pytest.raises(ValueError, match="Invalid Credentials"):
+        asyncio.run(service.batch("token", [BatchRequest(method="GET", path="/labels")]))
+
+
+@pytest.mark.parametrize("operation, path", [
+    ("batch_modify", "/gmail/v1/users/me/messages/batchModify"),
+    ("batch_delete", "/gmail/v1/users/me/messages/batchDelete"),
+])
+def test_message_batches_send_at_most_1000_ids_per_call(operation, path):
+    gmail = FakeGmail(lambda method, path, body: (204, None))
+    ids = [f"m{i}" for i in range(2500)]
+    service = _service(gmail)
+
+    if operation == "batch_modify":
+        asyncio.run(service.batch_modify("token", ids, add_label_ids=["L1"], remove_label_ids=["INBOX"]))
+    else:
+        asyncio.run(service.batch_delete("token", ids))
+
+    assert [(method, called) for method, called, _ in gmail.calls] == [("POST", path)] * 3
+    assert [len(body["ids"]) for _, _, body in gmail.calls] == [1000, 1000, 500]
+    assert [i for _, _, body in gmail.calls for i in body["ids"]] == ids
+    if operation == "batch_modify":
+        assert all(body["addLabelIds"] == ["L1"] and body["removeLabelIds"] == ["INBOX"] for _, _, body in gmail.calls)
@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+
+from app.api.utils.http_client import PooledHttpClient
+from app.config import settings
+from app.services.workers.google_cert_cache import GoogleCertCache
+
+
+def test_max_age_within_the_refresh_margin_does_not_spin(monkeypatch):
+    monkeypatch.setattr(settings, "GOOGLE_CERTS_REFRESH_MARGIN", 300)
+    monkeypatch.setattr(settings, "GOOGLE_CERTS_MIN_REFRESH_INTERVAL", 0.05)
+    fetches = []
+
+    def handler(request):
+        fetches.append(request.url)
+        return httpx.Response(200, headers={"Cache-Control": "public, max-age=10"}, json={"kid": "pem"})
+
+    cache = GoogleCertCache("https://certs.example/oauth2/v1/certs")
+    cache.http = PooledHttpClient(timeout=5, retries=0, transport=httpx.MockTransport(handler))
+
+    async def run():
+        cache.start()
+        await asyncio.sleep(0.22)
+        await cache.stop()
+
+    asyncio.run(run())
+
+    assert 2 <= len(fetches) <= 6
+    assert cache._certs == {"kid": "pem"}
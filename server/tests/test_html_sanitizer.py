@@ -0,0 +1,94 @@
+from html.parser import HTMLParser
+
+import pytest
+
+from app.api.utils.html_sanitizer import sanitize_html
+
+
+class _AttrCollector(HTMLParser):
+    """Attribute names as a browser-like parser sees them"""
+
+    def __init__(self):
+        super().__init__()
+        self.attrs = []
+
+    def handle_starttag(self, tag, attrs):
+        self.attrs.extend(name for name, _ in attrs)
+
+    handle_startendtag = handle_starttag
+
+
+def _attribute_names(markup: str):
+    parser = _AttrCollector()
+    parser.feed(markup)
+    parser.close()
+    return parser.attrs
+
+
+@pytest.mark.parametrize("markup", [
+    '<img src=x onerror=alert(1)>',
+    '<svg/onload=alert(1)>',
+    '<img/src=x/onerror=alert(1)>',
+    '<img src="x"onerror="alert(1)">',
+    "<img src='x'onerror='alert(1)'>",
+    '<body\tonload=alert(1)>',
+    '<a href="#" ONCLICK = "alert(1)">x</a>',
+])
+def test_event_handlers_are_removed(markup):
+    cleaned = sanitize_html(markup)
+    assert not [name for name in _attribute_names(cleaned) if name.startswith("on")], cleaned
+
+
+def test_srcdoc_is_removed():
+    cleaned = sanitize_html('<iframe srcdoc="&lt;script&gt;alert(1)&lt;/script&gt;"></iframe>')
+    assert "srcdoc" not in _attribute_names(cleaned)
+    assert "script" not in cleaned
+
+
+@pytest.mark.parametrize("markup", [
+    '<a href="javascript:alert(1)">x</a>',
+    '<a href="java&#x09;script:alert(1)">x</a>',
+    '<img src="data:image/png;base64,AAAA">',
+])
+def test_unsafe_urls_are_removed(markup):
+    cleaned = sanitize_html(markup)
+    assert "href" not in _attribute_names(cleaned)
+    assert "src" not in _attribute_names(cleaned)
+
+
+@pytest.mark.parametrize("markup", [
+    '<b title=x"><script>alert(1)</script>">hi',
+    "<b title=x'><script>alert(1)</script>'>hi",
+])
+def test_quote_in_unquoted_value_does_not_hide_markup(markup):
+    assert "<script" not in sanitize_html(markup)
+
+
+def test_unterminated_quote_does_not_swallow_the_next_tag():
+    cleaned = sanitize_html("<a title=\"x><b title='y\" onmouseover=alert(1) z='>hi")
+    assert not [name for name in _attribute_names(cleaned) if name.startswith("on")], cleaned
+
+
+def test_quoted_values_may_contain_markup_characters():
+    markup = '<a href="https://example.com/?q=a>b" title=\'say "hi"\'>x</a>'
+    assert sanitize_html(markup) == markup
+
+
+def test_scripts_and_comments_are_dropped():
+    cleaned = sanitize_html("<p>a</p><script>alert(1)</script><!-- hidden --><p>b</p>")
+    assert cleaned == "<p>a</p><p>b</p>"
+
+
+def test_safe_markup_is_kept():
+    markup = '<p class="x"><a href="https://example.com/?a=1&amp;b=2">link</a></p>'
+    assert sanitize_html(markup) == markup
+
+
+def test_whitespace_is_collapsed():
+    assert sanitize_html("<p>  a \n\n b  </p>") == "<p> a b </p>"
+
+
+def test_output_limit_never_splits_a_tag():
+    cleaned = sanitize_html("<p>" + "word " * 100 + '</p><a href="https://example.com">x</a>', max_chars=50)
+    assert len(cleaned) <= 50
+    assert cleaned.count("<") == cleaned.count(">")
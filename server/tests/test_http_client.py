@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.api.utils.http_client import PooledHttpClient
+
+
+def _client() -> PooledHttpClient:
+    return PooledHttpClient(timeout=5, transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+
+def test_client_of_a_finished_loop_is_closed_when_replaced():
+    http = _client()
+
+    async def get():
+        client = http.get()
+        await asyncio.sleep(0)
+        return client
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+
+    assert first is not second
+    assert first.is_closed
+    assert not second.is_closed
+
+
+def test_client_of_a_running_loop_is_closed_on_that_loop():
+    http = _client()
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever)
+    thread.start()
+    try:
+        async def create():
+            return http.get()
+
+        first = asyncio.run_coroutine_threadsafe(create(), other).result()
+
+        async def replace():
+            return http.get()
+
+        second = asyncio.run(replace())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other).result()
+
+        assert first is not second
+        assert first.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join()
+        other.close()
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.api.router.imap import ImapStreamingResponse, stream_email_page
+
+
+class FakeImapService:
+    def __init__(self):
+        self.disconnects = 0
+
+    async def iter_emails_by_uid(self, uids, chunk_size):
+        yield []
+
+    async def disconnect(self):
+        self.disconnects += 1
+
+
+def _scope():
+    return {"type": "http", "asgi": {"spec_version": "2.4"}}
+
+
+async def _receive():
+    return {"type": "http.disconnect"}
+
+
+def test_streamed_page_disconnects_after_the_body():
+    imap_service = FakeImapService()
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    response = ImapStreamingResponse(stream_email_page(imap_service, [], 0, 0), imap_service)
+    asyncio.run(response(_scope(), _receive, send))
+
+    assert b'"cursor"' in b"".join(m.get("body", b"") for m in sent)
+    assert imap_service.disconnects == 1
+
+
+def test_client_gone_before_the_body_starts_still_disconnects():
+    imap_service = FakeImapService()
+
+    async def send(message):
+        raise OSError("connection reset")
+
+    response = ImapStreamingResponse(stream_email_page(imap_service, [], 0, 0), imap_service)
+    with pytest.raises(Exception):
+        asyncio.run(response(_scope(), _receive, send))
+
+    assert imap_service.disconnects == 1
@@ -0,0 +1,65 @@
+import asyncio
+
+from app.services.default.imap_service import GmailImapService
+
+RAW = (
+    b"From: Alice <alice@example.com>\r\n"
+    b"To: bob@example.com\r\n"
+    b"Subject: Hello\r\n"
+    b"Date: Mon, 06 Oct 2025 10:00:00 +0000\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"\r\n"
+    b"Hi Bob\r\n"
+)
+
+
+class FakeIMAPClient:
+    """Records how folders are selected and what is fetched"""
+
+    def __init__(self):
+        self.selected = []
+        self.fetched = []
+
+    def select_folder(self, folder, readonly=False):
+        self.selected.append((folder, readonly))
+
+    def search(self, criteria):
+        return [1, 2]
+
+    def fetch(self, uids, items, modifiers=None):
+        self.fetched.append(list(items))
+        return {uid: {b"BODY[]": RAW, b"FLAGS": (), b"X-GM-LABELS": (b"\\Inbox",)} for uid in uids}
+
+
+def _service() -> GmailImapService:
+    service = GmailImapService()
+    service.client = FakeIMAPClient()
+    return service
+
+
+def test_listing_and_syncing_never_mark_messages_read():
+    service = _service()
+
+    async def run():
+        emails = await service.fetch_emails("INBOX", limit=2)
+        async for _ in service.iter_emails_by_uid(await service.get_email_uids("INBOX")):
+            pass
+        await service.search_emails("from:alice")
+        return emails
+
+    emails = asyncio.run(run())
+
+    assert all(readonly for _, readonly in service.client.selected)
+    assert all("BODY.PEEK[]" in items and "RFC822" not in items for items in service.client.fetched)
+    assert [email.subject for email in emails] == ["Hello", "Hello"]
+    assert emails[0].body_text.strip() == "Hi Bob"
+
+
+def test_fetching_one_email_leaves_it_unread():
+    service = _service()
+
+    email_message = asyncio.run(service.fetch_email(7, "INBOX"))
+
+    assert service.client.selected == [("INBOX", True)]
+    assert service.client.fetched == [["BODY.PEEK[]", "FLAGS", "ENVELOPE", "X-GM-LABELS"]]
+    assert (email_message.uid, email_message.body_text.strip()) == (7, "Hi Bob")
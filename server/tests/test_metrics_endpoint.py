@@ -0,0 +1,27 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import require_internal_client
+from app.config import settings
+
+app = FastAPI()
+
+
+@app.get("/metrics", dependencies=[Depends(require_internal_client)])
+async def get_metrics():
+    return {"ok": True}
+
+
+@pytest.mark.parametrize("enabled, allowed_ips, status", [
+    (False, ["testclient"], 404),
+    (True, ["127.0.0.1", "::1"], 404),
+    (True, ["testclient"], 200),
+])
+def test_metrics_are_internal_only(monkeypatch, enabled, allowed_ips, status):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", enabled)
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_IPS", allowed_ips)
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == status
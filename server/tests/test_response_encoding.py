@@ -0,0 +1,36 @@
+import pytest
+from starlette.requests import Request
+
+from app.api.utils.response_encoding import accept_qualities, response_kind
+
+
+def _request(accept: str) -> Request:
+    return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+
+@pytest.mark.parametrize("accept, kind", [
+    ("", "json"),
+    ("*/*", "json"),
+    ("application/json", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-msgpack, */*;q=0.1", "msgpack"),
+    ("application/msgpack, */*", "msgpack"),
+    ("application/msgpack;q=0", "json"),
+    ("application/json, application/msgpack;q=0", "json"),
+    ("application/msgpack;q=0.5, application/json", "json"),
+    ("application/json;q=0.5, application/msgpack;q=0.8", "msgpack"),
+    ("Application/MsgPack", "msgpack"),
+    ("application/msgpack;q=abc", "json"),
+    ("application/x-ndjson", "ndjson"),
+    ("application/x-ndjson;q=0, application/msgpack", "msgpack"),
+    ("application/x-ndjson;q=0.0", "json"),
+])
+def test_negotiation_honours_q_values(accept, kind):
+    assert response_kind(_request(accept)) == kind
+
+
+def test_accept_qualities():
+    assert accept_qualities("text/html, application/msgpack;q=0.3;level=1, text/html;q=0.2") == {
+        "text/html": 1.0,
+        "application/msgpack": 0.3,
+    }